@@ -0,0 +1,125 @@
+"""
+Microbenchmark for decoding message payloads.
+
+Compares the previous decode path (fresh dataclass instances with a __dict__
+each and an eager strptime per message) against `decode_message`.
+
+Run from python/sdk with: python benchmarks/decode.py
+"""
+
+from dataclasses import dataclass
+from datetime import datetime, timezone
+import timeit
+import tracemalloc
+
+from corvy_sdk.messages import decode_message
+from corvy_sdk.state import ConnectionState
+
+MESSAGES = 10_000
+
+
+@dataclass
+class LegacyUser:
+    id: int
+    username: str
+    is_bot: bool
+    avatar_url: str | None
+
+    def attach_state(self, state):
+        self._connection_state = state
+        return self
+
+
+@dataclass
+class LegacyFlock:
+    id: int
+
+    def attach_state(self, state):
+        self._connection_state = state
+        return self
+
+
+@dataclass
+class LegacyNest:
+    id: int
+    flock: LegacyFlock
+
+    def attach_state(self, state):
+        self._connection_state = state
+        return self
+
+
+@dataclass
+class LegacyMessage:
+    id: int
+    content: str
+    flock: LegacyFlock
+    nest: LegacyNest
+    created_at: datetime
+    user: LegacyUser
+
+    def attach_state(self, state):
+        self._connection_state = state
+        return self
+
+
+def legacy_decode(message: dict, state) -> LegacyMessage:
+    user = LegacyUser(
+        message["user"]["id"],
+        message["user"]["username"],
+        message["user"]["is_bot"],
+        message["user"].get("photo_url", None),
+    ).attach_state(state)
+    flock = LegacyFlock(message["flock_id"]).attach_state(state)
+    nest = LegacyNest(message["nest_id"], flock).attach_state(state)
+    return LegacyMessage(
+        message["id"],
+        message["content"],
+        flock,
+        nest,
+        datetime.strptime(message["created_at"], "%Y-%m-%dT%H:%M:%SZ").replace(
+            tzinfo=timezone.utc
+        ),
+        user,
+    ).attach_state(state)
+
+
+def make_payloads(count: int) -> list[dict]:
+    return [
+        {
+            "id": i,
+            "content": f"message number {i}",
+            "flock_id": i % 5,
+            "nest_id": i % 20,
+            "created_at": f"2025-01-01T12:{i // 60 % 60:02d}:{i % 60:02d}Z",
+            "user": {"id": i % 50, "username": f"user{i % 50}", "is_bot": False},
+        }
+        for i in range(count)
+    ]
+
+
+def measure(name: str, decode, payloads: list[dict], state):
+    seconds = min(
+        timeit.repeat(lambda: [decode(p, state) for p in payloads], number=1, repeat=5)
+    )
+    tracemalloc.start()
+    kept = [decode(p, state) for p in payloads]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    print(
+        f"{name:<10} {seconds / len(payloads) * 1e6:8.2f} us/msg"
+        f"  {size / len(payloads):8.1f} bytes/msg retained"
+    )
+
+
+def main():
+    payloads = make_payloads(MESSAGES)
+    state = ConnectionState(None, None, "bench", "/api/v2")
+    print(f"Decoding {MESSAGES} messages")
+    measure("legacy", legacy_decode, payloads, state)
+    measure("slotted", decode_message, payloads, state)
+
+
+if __name__ == "__main__":
+    main()
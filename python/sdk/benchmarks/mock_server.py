@@ -0,0 +1,253 @@
+"""
+A local stand-in for the Corvy API, for benchmarks.
+
+Serves the REST endpoints the SDK uses under /api/v2 and a Phoenix-style
+websocket at /socket. Messages are pushed to connected bots with
+`push_message`, and everything bots send is recorded in `sent`.
+"""
+
+import asyncio
+import itertools
+import json
+import time
+
+from aiohttp import WSMsgType, web
+
+API_PATH = "/api/v2"
+CHANNEL = "bot:bench"
+CREATED_AT = "2025-01-01T12:00:00Z"
+
+
+class MockCorvyServer:
+    def __init__(
+        self,
+        flocks: int = 2,
+        nests_per_flock: int = 3,
+        users: int = 50,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.host = host
+        self.port = port
+        self.flocks = {
+            flock_id: {
+                "id": flock_id,
+                "name": f"flock{flock_id}",
+                "icon": None,
+                "members_count": users,
+                "nests_count": nests_per_flock,
+                "created_at": CREATED_AT,
+            }
+            for flock_id in range(1, flocks + 1)
+        }
+        self.nests = {
+            flock_id * 100
+            + n: {
+                "id": flock_id * 100 + n,
+                "flock_id": flock_id,
+                "name": f"nest{n}",
+                "position": n,
+                "created_at": CREATED_AT,
+            }
+            for flock_id in self.flocks
+            for n in range(nests_per_flock)
+        }
+        self.users = {
+            user_id: {
+                "id": user_id,
+                "username": f"user{user_id}",
+                "is_bot": False,
+                "available_badges": [],
+                "photo_url": None,
+            }
+            for user_id in range(1, users + 1)
+        }
+        self.bot_user = {"id": 0, "username": "benchbot", "is_bot": True}
+        self.history: dict[int, list[dict]] = {nest_id: [] for nest_id in self.nests}
+        self.sent: list[tuple[float, dict]] = []  # (perf_counter, payload)
+        self.joins = 0
+        self.joined = asyncio.Event()
+        self.rest_requests = 0
+        self._ids = itertools.count(1)
+        self._sockets: set[web.WebSocketResponse] = set()
+        self._runner: web.AppRunner | None = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post(f"{API_PATH}/auth", self._auth)
+        app.router.add_get(f"{API_PATH}/flocks", self._get_flocks)
+        app.router.add_get(f"{API_PATH}/flocks/{{flock_id}}", self._get_flock)
+        app.router.add_get(f"{API_PATH}/flocks/{{flock_id}}/nests", self._get_nests)
+        app.router.add_get(
+            f"{API_PATH}/flocks/{{flock_id}}/nests/{{nest_id}}", self._get_nest
+        )
+        app.router.add_get(
+            f"{API_PATH}/flocks/{{flock_id}}/nests/{{nest_id}}/messages",
+            self._get_messages,
+        )
+        app.router.add_post(
+            f"{API_PATH}/flocks/{{flock_id}}/nests/{{nest_id}}/messages",
+            self._post_message,
+        )
+        app.router.add_get(f"{API_PATH}/users/{{user_id}}", self._get_user)
+        app.router.add_get(
+            f"{API_PATH}/users/by-username/{{username}}", self._get_user_by_name
+        )
+        app.router.add_get("/socket", self._socket)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        await self.drop_connections()
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    async def wait_for_join(self, timeout: float = 30):
+        await asyncio.wait_for(self.joined.wait(), timeout)
+
+    async def drop_connections(self):
+        """Close every bot websocket, as if the server restarted."""
+        self.joined.clear()
+        for ws in list(self._sockets):
+            await ws.close()
+
+    def make_message(self, content: str, nest_id: int, user_id: int) -> dict:
+        message = {
+            "id": next(self._ids),
+            "content": content,
+            "flock_id": self.nests[nest_id]["flock_id"],
+            "nest_id": nest_id,
+            "created_at": CREATED_AT,
+            "user": self.users[user_id],
+        }
+        self.history[nest_id].append(message)
+        return message
+
+    async def push_message(self, content: str, nest_id: int, user_id: int) -> dict:
+        """Store a message and send it to every connected bot."""
+        message = self.make_message(content, nest_id, user_id)
+        frame = json.dumps(
+            {
+                "topic": CHANNEL,
+                "event": "message",
+                "payload": {"message": message},
+                "ref": None,
+            }
+        )
+        for ws in list(self._sockets):
+            await ws.send_str(frame)
+        return message
+
+    # REST
+
+    async def _auth(self, request: web.Request) -> web.Response:
+        return web.json_response(
+            {
+                "success": True,
+                "bot": {"id": 0, "name": "benchbot"},
+                "websocket": {
+                    "url": f"ws://{self.host}:{self.port}/socket",
+                    "channel": CHANNEL,
+                },
+            }
+        )
+
+    async def _get_flocks(self, request: web.Request) -> web.Response:
+        self.rest_requests += 1
+        return web.json_response(
+            {"success": True, "flocks": list(self.flocks.values())}
+        )
+
+    async def _get_flock(self, request: web.Request) -> web.Response:
+        self.rest_requests += 1
+        flock = self.flocks.get(int(request.match_info["flock_id"]))
+        if flock is None:
+            return web.json_response({"error": "Flock not found"}, status=404)
+        return web.json_response({"success": True, "flock": flock})
+
+    async def _get_nests(self, request: web.Request) -> web.Response:
+        self.rest_requests += 1
+        flock_id = int(request.match_info["flock_id"])
+        nests = [nest for nest in self.nests.values() if nest["flock_id"] == flock_id]
+        return web.json_response({"success": True, "nests": nests})
+
+    async def _get_nest(self, request: web.Request) -> web.Response:
+        self.rest_requests += 1
+        nest = self.nests.get(int(request.match_info["nest_id"]))
+        if nest is None:
+            return web.json_response({"error": "Nest not found"}, status=404)
+        return web.json_response({"success": True, "nest": nest})
+
+    async def _get_messages(self, request: web.Request) -> web.Response:
+        self.rest_requests += 1
+        history = self.history.get(int(request.match_info["nest_id"]), [])
+        limit = min(int(request.query.get("limit", 50)), 50)
+        before_id = request.query.get("before_id")
+        messages = [
+            message
+            for message in reversed(history)
+            if before_id is None or message["id"] < int(before_id)
+        ][:limit]
+        return web.json_response({"success": True, "messages": messages})
+
+    async def _post_message(self, request: web.Request) -> web.Response:
+        self.rest_requests += 1
+        body = await request.json()
+        self.sent.append((time.perf_counter(), body))
+        return web.json_response({"success": True})
+
+    async def _get_user(self, request: web.Request) -> web.Response:
+        self.rest_requests += 1
+        user = self.users.get(int(request.match_info["user_id"]))
+        if user is None:
+            return web.json_response({"error": "User not found"}, status=404)
+        return web.json_response({"success": True, "user": user})
+
+    async def _get_user_by_name(self, request: web.Request) -> web.Response:
+        self.rest_requests += 1
+        username = request.match_info["username"]
+        for user in self.users.values():
+            if user["username"] == username:
+                return web.json_response({"success": True, "user": user})
+        return web.json_response({"error": "User not found"}, status=404)
+
+    # Websocket
+
+    async def _socket(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        async for msg in ws:
+            if msg.type != WSMsgType.TEXT:
+                continue
+            frame = json.loads(msg.data)
+            event = frame.get("event")
+            response = {}
+            if event == "phx_join":
+                self._sockets.add(ws)
+                self.joins += 1
+                self.joined.set()
+            elif event == "send_message":
+                payload = frame["payload"]
+                self.sent.append((time.perf_counter(), payload))
+                message = self.make_message(payload["content"], payload["nest_id"], 1)
+                message["user"] = self.bot_user
+                response = {"message": message}
+            await ws.send_str(
+                json.dumps(
+                    {
+                        "topic": frame.get("topic"),
+                        "event": "phx_reply",
+                        "payload": {"status": "ok", "response": response},
+                        "ref": frame.get("ref"),
+                    }
+                )
+            )
+        self._sockets.discard(ws)
+        return ws
@@ -0,0 +1,279 @@
+"""
+End-to-end benchmark of the message pipeline against a local mock Corvy server.
+
+Pushes messages over the websocket at a configurable rate and command mix, and
+reports throughput, dispatch latency (push to handler start), reply latency
+(push to the reply reaching the server), memory per message, and how long the
+bot takes to recover from a dropped connection.
+
+Run from python/sdk with, for example:
+    python benchmarks/pipeline.py --messages 5000 --mix ping=2,echo=1,chat=1
+    python benchmarks/pipeline.py --rate 500 --handler-latency 5 --workers 8
+"""
+
+import argparse
+import asyncio
+import logging
+import random
+import time
+import tracemalloc
+from typing import Annotated
+
+from corvy_sdk import CorvyBot, Greedy, Message
+
+from mock_server import API_PATH, MockCorvyServer
+
+COMMANDS = {
+    "ping": lambda i: f"!ping {i}",
+    "echo": lambda i: f"!echo {i} some text to send back to the nest",
+    "add": lambda i: f"!add {i} {i * 2}",
+    "chat": lambda i: f"{i} just chatting, not a command",
+}
+
+
+def parse_mix(mix: str) -> list[tuple[str, float]]:
+    weights = []
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        if name not in COMMANDS:
+            raise SystemExit(
+                f"Unknown message kind {name!r}, pick from {list(COMMANDS)}"
+            )
+        weights.append((name, float(weight or 1)))
+    return weights
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def build_bot(server: MockCorvyServer, args, handled: dict[int, float]) -> CorvyBot:
+    bot = CorvyBot(
+        "bench-token",
+        api_base_url=server.url,
+        api_path=API_PATH,
+        workers=args.workers,
+        heartbeat_interval=5,
+        reconnect_backoff_max=1,
+        loop_lag_interval=None,
+        metrics=not args.no_metrics,
+    )
+    latency = args.handler_latency / 1000
+
+    async def _work(message: Message):
+        handled[message.id] = time.perf_counter()
+        if latency:
+            await asyncio.sleep(latency)
+
+    # Replies start with the id of the message they answer, to time them
+    @bot.command()
+    async def ping(message: Message, n: int):
+        await _work(message)
+        return f"{message.id} pong {n}"
+
+    @bot.command()
+    async def echo(message: Message, n: int, text: Annotated[str, Greedy]):
+        await _work(message)
+        return f"{message.id} {n} {text}"
+
+    @bot.command()
+    async def add(message: Message, a: int, b: int):
+        await _work(message)
+        return f"{message.id} {a + b}"
+
+    @bot.event()
+    async def on_message(message: Message):
+        await _work(message)
+
+    return bot
+
+
+async def stop_bot(bot: CorvyBot, task: asyncio.Task):
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    if bot.worker_pool is not None:
+        await bot.worker_pool.stop()
+    if bot.send_scheduler is not None:
+        await bot.send_scheduler.stop()
+    state = bot.connection_state
+    if state is not None:
+        await state.client_session.close()
+        await state.websocket.close()
+
+
+async def push(server: MockCorvyServer, args, kinds, weights, count: int, pushed):
+    nests = list(server.nests)
+    started = time.perf_counter()
+    for i in range(count):
+        if args.rate:
+            delay = started + i / args.rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        kind = random.choices(kinds, weights)[0]
+        content = COMMANDS[kind](i)
+        message = await server.push_message(
+            content, random.choice(nests), random.randint(1, len(server.users))
+        )
+        pushed[message["id"]] = (time.perf_counter(), content)
+        if not args.rate and i % 100 == 99:
+            await asyncio.sleep(0)  # Let the bot keep up with an unthrottled push
+
+
+async def wait_for(condition, timeout: float) -> bool:
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > deadline:
+            return False
+        await asyncio.sleep(0.005)
+    return True
+
+
+async def run(args):
+    random.seed(args.seed)
+    weights = parse_mix(args.mix)
+    kinds = [name for name, _ in weights]
+    server = MockCorvyServer(args.flocks, args.nests, args.users)
+    await server.start()
+
+    handled: dict[int, float] = {}
+    pushed: dict[int, tuple[float, str]] = {}
+    bot = build_bot(server, args, handled)
+    task = asyncio.create_task(bot._start_async())
+    await server.wait_for_join()
+    await asyncio.sleep(0.1)  # Let the bot finish starting up
+
+    # Warm up caches and code paths
+    await push(server, args, kinds, [w for _, w in weights], args.warmup, pushed)
+    await wait_for(lambda: len(handled) >= len(pushed), args.timeout)
+    handled.clear()
+    pushed.clear()
+    server.sent.clear()
+
+    if args.memory:
+        tracemalloc.start()
+        baseline, _ = tracemalloc.get_traced_memory()
+    started = time.perf_counter()
+    await push(server, args, kinds, [w for _, w in weights], args.messages, pushed)
+    done = await wait_for(lambda: len(handled) >= len(pushed), args.timeout)
+    finished = max(handled.values(), default=time.perf_counter())
+    if args.memory:
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    await wait_for(
+        lambda: len(server.sent) >= sum(1 for _, c in pushed.values() if c[0] == "!"),
+        args.timeout,
+    )
+
+    elapsed = finished - started
+    dispatch = [
+        (handled[message_id] - pushed_at) * 1000
+        for message_id, (pushed_at, _) in pushed.items()
+        if message_id in handled
+    ]
+    replies = []
+    for sent_at, payload in server.sent:
+        answered = pushed.get(int(payload["content"].split(" ", 1)[0]))
+        if answered is not None:  # Not a late reply to a warmup message
+            replies.append((sent_at - answered[0]) * 1000)
+
+    print(
+        f"Messages:        {len(handled)}/{len(pushed)} handled{'' if done else ' (timed out)'}"
+    )
+    print(f"Throughput:      {len(handled) / elapsed:,.0f} msg/s over {elapsed:.2f}s")
+    print(
+        f"Dispatch (ms):   p50 {percentile(dispatch, 50):.2f}  p99 {percentile(dispatch, 99):.2f}"
+        f"  max {max(dispatch, default=float('nan')):.2f}"
+    )
+    if replies:
+        print(
+            f"Reply (ms):      p50 {percentile(replies, 50):.2f}  p99 {percentile(replies, 99):.2f}"
+            f"  ({len(replies)} replies)"
+        )
+    if args.memory:
+        print(
+            f"Memory:          {(current - baseline) / max(1, len(pushed)):,.0f} bytes/msg retained,"
+            f" {(peak - baseline) / max(1, len(pushed)):,.0f} bytes/msg peak"
+        )
+    print(f"REST requests:   {server.rest_requests}")
+
+    if args.reconnect:
+        # Drop the connection, send messages while the bot is away and time how
+        # long it takes to reconnect and catch up on them
+        handled.clear()
+        pushed.clear()
+        dropped = time.perf_counter()
+        await server.drop_connections()
+        for i in range(args.reconnect):
+            nest_id = random.choice(list(server.nests))
+            message = server.make_message(COMMANDS["chat"](i), nest_id, 1)
+            pushed[message["id"]] = (dropped, message["content"])
+        await server.wait_for_join(args.timeout)
+        rejoined = time.perf_counter()
+        recovered = await wait_for(lambda: len(handled) >= len(pushed), args.timeout)
+        caught_up = time.perf_counter()
+        print(
+            f"Reconnect:       rejoined after {(rejoined - dropped) * 1000:.0f} ms,"
+            f" caught up on {len(handled)}/{len(pushed)} missed messages after"
+            f" {(caught_up - dropped) * 1000:.0f} ms{'' if recovered else ' (timed out)'}"
+        )
+
+    if bot.metrics is not None and args.verbose:
+        print(bot.metrics.render_prometheus())
+    await stop_bot(bot, task)
+    await server.stop()
+
+
+def main():
+    logging.getLogger("corvy_sdk").setLevel(logging.WARNING)
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=0,
+        help="Messages per second. 0 pushes as fast as possible.",
+    )
+    parser.add_argument(
+        "--mix",
+        default="ping=1,echo=1,add=1,chat=1",
+        help="Weighted message kinds: ping, echo, add, chat.",
+    )
+    parser.add_argument(
+        "--handler-latency",
+        type=float,
+        default=0,
+        help="Milliseconds each handler sleeps for.",
+    )
+    parser.add_argument("--workers", type=int, default=0)
+    parser.add_argument("--flocks", type=int, default=2)
+    parser.add_argument("--nests", type=int, default=3, help="Nests per flock.")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument(
+        "--memory",
+        action="store_true",
+        help="Measure memory with tracemalloc (slows the run down).",
+    )
+    parser.add_argument(
+        "--reconnect",
+        type=int,
+        default=0,
+        metavar="N",
+        help="Measure recovery from a dropped connection with N missed messages.",
+    )
+    parser.add_argument(
+        "--no-metrics", action="store_true", help="Turn the bot's metrics off."
+    )
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--verbose", action="store_true", help="Print the bot's metrics at the end."
+    )
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Microbenchmark for tokenizing command arguments.
+
+Compares the previous character-by-character tokenizer, and the " ".join it
+used to rebuild greedy arguments, against the current tokenizer and the way
+ArgBinder gets the text of a greedy last argument, on plain, quoted and
+escaped inputs.
+
+Run from python/sdk with: python benchmarks/tokenizer.py
+"""
+
+import timeit
+from typing import Annotated
+
+from corvy_sdk.command_parsing import (
+    Greedy,
+    compile_args,
+    simple_tokenize,
+)
+
+REPEAT = 2_000
+
+INPUTS = {
+    "short": "42 hello",
+    "words": "add 1 2 3 4 5 6 7 8 9 10",
+    "quoted": 'say "hello there" to "everyone" in "the nest"',
+    "escaped": 'say "hello there" to \\"everyone\\" in "the nest"',
+    "spaced": 'say  "hello\tthere"  to \\"everyone\\"\n in "the nest"',
+    "long greedy": "note " + "some words to keep   as they are " * 60,
+    "long quoted": 'note "' + 'a quoted \\"note\\" with spaces ' * 60 + '"',
+}
+
+
+def legacy_tokenize(text: str) -> list[str]:
+    tokens = []
+    current = []
+    in_quotes = False
+    escape = False
+
+    for char in text:
+        if escape:
+            current.append(char)
+            escape = False
+        elif char == "\\":
+            escape = True
+        elif char == '"':
+            in_quotes = not in_quotes
+        elif char.isspace() and not in_quotes:
+            if current:
+                tokens.append("".join(current))
+                current = []
+        else:
+            current.append(char)
+
+    if current:
+        tokens.append("".join(current))
+
+    return tokens
+
+
+def legacy_greedy(text: str) -> str:
+    # First token, then everything after it as one greedy argument
+    return " ".join(legacy_tokenize(text)[1:])
+
+
+async def _note(first: str, rest: Annotated[str, Greedy]):
+    pass
+
+
+_NOTE = compile_args(_note)
+
+
+def current_greedy(text: str) -> str:
+    # What ArgBinder.bind does for _note, short of parsing the values
+    tokens, spans, greedy_raw = _NOTE._tokenize(text)
+    if greedy_raw is not None:
+        return greedy_raw
+    return _NOTE._greedy_text(text, tokens, spans, 1, max(0, len(tokens) - 1))
+
+
+def measure(func, text: str) -> float:
+    seconds = min(timeit.repeat(lambda: func(text), number=REPEAT, repeat=5))
+    return seconds / REPEAT * 1e6
+
+
+def main():
+    print(f"{'input':<12} {'chars':>6} {'legacy':>10} {'current':>10} {'speedup':>8}")
+    for label, funcs in (
+        ("tokenize", (legacy_tokenize, simple_tokenize)),
+        ("greedy", (legacy_greedy, current_greedy)),
+    ):
+        print(label)
+        for name, text in INPUTS.items():
+            legacy, current = (measure(func, text) for func in funcs)
+            print(
+                f"{name:<12} {len(text):>6} {legacy:>7.2f} us {current:>7.2f} us"
+                f" {legacy / current:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,13 @@ from .user import User
 from .flock import Flock
 from .nest import Nest
 from .command_parsing import Parser
+from .outbound import SendPriority
+from .topology import Topology
+from .sharding import run_sharded
+from .command_index import CommandOnCooldown, CommandTimeoutError
+from .metrics import Metrics, OpenTelemetrySink
+from .profiling import HandlerTiming
+from .events import Event
 
 __version__ = "2.3.1"
 __all__ = [
@@ -16,4 +23,13 @@ __all__ = [
     "Flock",
     "Nest",
     "Parser",
+    "SendPriority",
+    "Topology",
+    "run_sharded",
+    "CommandOnCooldown",
+    "CommandTimeoutError",
+    "Metrics",
+    "OpenTelemetrySink",
+    "HandlerTiming",
+    "Event",
 ]
@@ -0,0 +1,112 @@
+from collections import OrderedDict
+import time
+from typing import Any, Hashable
+
+
+class TTLCache:
+    """
+    A bounded least-recently-used mapping whose entries expire after a time-to-live.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float | None = 300):
+        """
+        Args:
+            max_size: The most entries to keep. 0 disables the cache.
+            ttl: Seconds an entry stays valid for. None keeps entries until they're evicted.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, tuple[float | None, Any]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Any | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires, value = entry
+        if expires is not None and expires < time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any):
+        if self.max_size <= 0:
+            return
+        expires = None if self.ttl is None else time.monotonic() + self.ttl
+        self._entries[key] = (expires, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> Any | None:
+        """Drop an entry, returning its value if it was cached."""
+        entry = self._entries.pop(key, None)
+        return None if entry is None else entry[1]
+
+    def clear(self):
+        self._entries.clear()
+
+
+class EntityCache:
+    """
+    Per-bot identity map for users, flocks and nests.
+
+    Fetched entities (User, Flock, Nest) expire after `ttl` seconds. Partial
+    entities built from incoming messages carry no data that can go stale, so
+    they're only bounded by size and reused for as long as they stay cached.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float | None = 300):
+        self.users = TTLCache(max_size, ttl)
+        self.users_by_username = TTLCache(max_size, ttl)
+        self.flocks = TTLCache(max_size, ttl)
+        self.nests = TTLCache(max_size, ttl)
+        self.message_users = TTLCache(max_size, None)
+        self.partial_flocks = TTLCache(max_size, None)
+        self.partial_nests = TTLCache(max_size, None)
+
+    def _caches(self) -> dict[str, TTLCache]:
+        return {
+            "users": self.users,
+            "users_by_username": self.users_by_username,
+            "flocks": self.flocks,
+            "nests": self.nests,
+            "message_users": self.message_users,
+            "partial_flocks": self.partial_flocks,
+            "partial_nests": self.partial_nests,
+        }
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        """Get the size, hit and miss counts of every cache."""
+        return {
+            name: {"size": len(cache), "hits": cache.hits, "misses": cache.misses}
+            for name, cache in self._caches().items()
+        }
+
+    def store_user(self, user):
+        self.users.set(user.id, user)
+        self.users_by_username.set(user.username, user)
+
+    def invalidate_user(self, user_id: int):
+        user = self.users.invalidate(user_id)
+        if user is not None:
+            self.users_by_username.invalidate(user.username)
+        self.message_users.invalidate(user_id)
+
+    def invalidate_flock(self, flock_id: int):
+        self.flocks.invalidate(flock_id)
+
+    def invalidate_nest(self, nest_id: int):
+        self.nests.invalidate(nest_id)
+
+    def clear(self):
+        for cache in self._caches().values():
+            cache.clear()
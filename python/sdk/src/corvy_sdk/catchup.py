@@ -0,0 +1,88 @@
+import asyncio
+from typing import Awaitable, Callable
+from .cache import TTLCache
+from .default_logger import get_pretty_logger
+from .flock import PartialFlock
+from .nest import PartialNest
+from .state import ConnectionState
+
+logger = get_pretty_logger("corvy_sdk")
+
+
+class MessageTracker:
+    """
+    Remembers which messages the bot has processed.
+
+    The highest message id processed in each nest marks where to resume after a
+    disconnect, and a bounded window of recent ids lets messages that arrive twice
+    (once from the websocket, once from a catch-up replay) be dropped.
+    """
+
+    def __init__(self, window: int = 4096):
+        self.last_ids: dict[int, tuple[int, int]] = (
+            {}
+        )  # nest id -> (flock id, message id)
+        self.duplicates = 0
+        self._recent = TTLCache(window, None)
+
+    def seen(self, message: dict) -> bool:
+        """Record a raw message payload, returning whether it was already processed."""
+        message_id = message["id"]
+        if self._recent.get(message_id) is not None:
+            self.duplicates += 1
+            return True
+        self._recent.set(message_id, True)
+        nest_id = message["nest_id"]
+        last = self.last_ids.get(nest_id)
+        if last is None or last[1] < message_id:
+            self.last_ids[nest_id] = (message["flock_id"], message_id)
+        return False
+
+    async def catch_up(
+        self,
+        state: ConnectionState,
+        process: Callable[[dict], Awaitable],
+        last_ids: dict[int, tuple[int, int]] | None = None,
+        concurrency: int = 4,
+    ) -> int:
+        """Replay every message sent after the last one processed in each nest.
+
+        Nests are caught up concurrently; within a nest, messages are replayed
+        oldest first.
+
+        Args:
+            state: The connection state to fetch with.
+            process: Called with each missed raw message payload.
+            last_ids: Where to resume from in each nest. Defaults to the current high water marks; take a copy before resuming the websocket so live messages don't move them past the gap.
+            concurrency: How many nests to fetch at once.
+
+        Returns:
+            int: How many messages were replayed.
+        """
+        if last_ids is None:
+            last_ids = dict(self.last_ids)
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def _catch_up_nest(nest_id: int, flock_id: int, last_id: int) -> int:
+            nest = PartialNest(nest_id, PartialFlock(flock_id).attach_state(state))
+            nest.attach_state(state)
+            async with semaphore:
+                payloads = await nest._get_payloads_after(last_id)
+            for payload in payloads:
+                await process(payload)
+            return len(payloads)
+
+        counts = await asyncio.gather(
+            *(
+                _catch_up_nest(nest_id, flock_id, last_id)
+                for nest_id, (flock_id, last_id) in last_ids.items()
+            ),
+            return_exceptions=True,
+        )
+        replayed = 0
+        for count in counts:
+            if isinstance(count, BaseException):
+                logger.warning(f"Failed to catch up on a nest: {count}")
+            else:
+                replayed += count
+        return replayed
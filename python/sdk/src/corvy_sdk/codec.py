@@ -0,0 +1,96 @@
+import json
+from typing import Any
+
+
+class JSONCodec:
+    """JSON encoding using the standard library."""
+
+    name = "json"
+
+    def dumps(self, obj: Any) -> str | bytes:
+        """Encode to whatever the codec produces natively; bytes are UTF-8 JSON text."""
+        return json.dumps(obj)
+
+    def dumps_str(self, obj: Any) -> str:
+        return json.dumps(obj)
+
+    def loads(self, data: str | bytes) -> Any:
+        return json.loads(data)
+
+    async def send_frame(self, websocket, frame: Any):
+        """Encode a frame and send it over a websocket as text."""
+        data = self.dumps(frame)
+        if isinstance(data, bytes):
+            # Already UTF-8, so skip decoding it just to have websockets encode it again
+            await websocket.send(data, text=True)
+        else:
+            await websocket.send(data)
+
+
+class OrjsonCodec(JSONCodec):
+    """JSON encoding using orjson."""
+
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+
+        self._orjson = orjson
+
+    def dumps(self, obj: Any) -> bytes:
+        return self._orjson.dumps(obj)
+
+    def dumps_str(self, obj: Any) -> str:
+        return self._orjson.dumps(obj).decode()
+
+    def loads(self, data: str | bytes) -> Any:
+        return self._orjson.loads(data)
+
+
+class MsgspecCodec(JSONCodec):
+    """JSON encoding using msgspec."""
+
+    name = "msgspec"
+
+    def __init__(self):
+        import msgspec
+
+        self._encoder = msgspec.json.Encoder()
+        self._decoder = msgspec.json.Decoder()
+
+    def dumps(self, obj: Any) -> bytes:
+        return self._encoder.encode(obj)
+
+    def dumps_str(self, obj: Any) -> str:
+        return self._encoder.encode(obj).decode()
+
+    def loads(self, data: str | bytes) -> Any:
+        return self._decoder.decode(data)
+
+
+CODECS: dict[str, type[JSONCodec]] = {
+    "orjson": OrjsonCodec,
+    "msgspec": MsgspecCodec,
+    "json": JSONCodec,
+}
+
+
+def get_codec(name: str = "json") -> JSONCodec:
+    """Get a JSON codec by name.
+
+    Args:
+        name: "json", "orjson", "msgspec", or "auto" for the fastest one installed.
+
+    Raises:
+        ValueError: If the codec is unknown.
+        ImportError: If the codec's library isn't installed.
+    """
+    if name == "auto":
+        for codec in CODECS.values():
+            try:
+                return codec()
+            except ImportError:
+                continue
+    if name not in CODECS:
+        raise ValueError(f"Unknown JSON codec: {name!r}")
+    return CODECS[name]()
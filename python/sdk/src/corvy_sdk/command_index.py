@@ -0,0 +1,113 @@
+import asyncio
+from dataclasses import dataclass
+import re
+import time
+from typing import Callable
+from .cache import TTLCache
+from .command_parsing import ArgBinder
+
+EXECUTION_MODES = ("async", "thread", "process")
+
+
+class CommandTimeoutError(TimeoutError):
+    """A command handler ran for longer than its timeout and was cancelled."""
+
+    def __init__(self, command: str, timeout: float):
+        super().__init__(f"Command {command} timed out after {timeout}s")
+        self.command = command
+        self.timeout = timeout
+
+
+class CommandOnCooldown(Exception):
+    """A command was invoked again before its cooldown ran out."""
+
+    def __init__(self, command: str, retry_after: float):
+        super().__init__(f"Command {command} is on cooldown for {retry_after:.1f}s")
+        self.command = command
+        self.retry_after = retry_after
+
+
+@dataclass
+class CommandSpec:
+    """Everything compiled for a command handler when it's registered."""
+
+    binder: ArgBinder
+    execution: str = "async"
+    timeout: float | None = None
+    limiter: asyncio.Semaphore | None = None
+    user_cooldowns: TTLCache | None = None
+    nest_cooldowns: TTLCache | None = None
+
+    def check_cooldowns(self, command: str, user_id: int, nest_id: int):
+        """Start the user and nest cooldowns, or raise CommandOnCooldown if either is running."""
+        now = time.monotonic()
+        for cooldowns, key in (
+            (self.user_cooldowns, user_id),
+            (self.nest_cooldowns, nest_id),
+        ):
+            if cooldowns is None:
+                continue
+            expires = cooldowns.get(key)
+            if expires is not None:
+                raise CommandOnCooldown(command, expires - now)
+        # Only start them once both checks passed
+        for cooldowns, key in (
+            (self.user_cooldowns, user_id),
+            (self.nest_cooldowns, nest_id),
+        ):
+            if cooldowns is not None:
+                cooldowns.set(key, now + cooldowns.ttl)
+
+
+class CommandIndex:
+    """
+    Lookup table used to dispatch messages to commands.
+
+    Commands are bucketed by the case-folded first whitespace-separated token of
+    their prefix, so a message is matched with a single hash lookup regardless of
+    how many commands are registered. Within a bucket, prefixes are kept longest
+    first so the most specific command wins. Prefixes are matched against the
+    message with a case-insensitive regex rather than by lowercasing it, since
+    lowercasing can change the length of non-ASCII text and throw the argument
+    offset off.
+    """
+
+    def __init__(self):
+        self._buckets: dict[str, list[tuple[str, str, Callable, re.Pattern]]] = {}
+
+    @staticmethod
+    def _first_token(text: str) -> str:
+        parts = text.split(None, 1)
+        return parts[0] if parts else ""
+
+    def add(self, prefix: str, handler: Callable):
+        """Add (or replace) a command prefix in the index."""
+        folded = prefix.lower()
+        bucket = self._buckets.setdefault(self._first_token(folded), [])
+        bucket[:] = [entry for entry in bucket if entry[0] != folded]
+        bucket.append(
+            (folded, prefix, handler, re.compile(re.escape(prefix), re.IGNORECASE))
+        )
+        bucket.sort(key=lambda entry: len(entry[0]), reverse=True)
+
+    def match(self, content: str) -> tuple[str, Callable, str] | None:
+        """Find the command a message invokes.
+
+        Args:
+            content: The raw message content.
+
+        Returns:
+            A tuple of (prefix, handler, argument string), or None if the message isn't a command.
+        """
+        bucket = self._buckets.get(self._first_token(content).lower())
+        if bucket is None:
+            return None
+        for _, prefix, handler, pattern in bucket:
+            found = pattern.match(content)
+            if found is None:
+                continue
+            args = content[found.end() :]
+            if args != "" and not args[0].isspace():
+                continue  # We don't say there's a command to be ran if there's no space between the command name and args
+            return prefix, handler, args
+        return None
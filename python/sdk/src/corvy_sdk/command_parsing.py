@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from dataclasses import dataclass
 import inspect
 import re
 import shlex
@@ -56,31 +57,226 @@ async def cast_type(typ: Type[Any], raw: str, connection_state: ConnectionState)
     raise ValueError(f"No parser for type: {typ!r}")
 
 
-def simple_tokenize(text: str) -> list[str]:
+# A run of escaped characters, quoted sections and plain characters. A backslash
+# escapes the next character, even inside quotes, and an unclosed quote runs to the end.
+_TOKEN = re.compile(r'(?:[^\s"\\]+|"(?:[^"\\]+|\\.|\\\Z)*"?|\\.|\\\Z)+', re.DOTALL)
+_QUOTING = re.compile(r'\\(.)|"|\\\Z', re.DOTALL)
+_ESCAPED_SPACE = re.compile(r"\\\s")
+
+# Input shorter than these (in characters) is walked one character at a time, which
+# beats the setup of splitting it on quotes. Measured with benchmarks/tokenizer.py.
+_QUOTED_WALK_CUTOFF = 32
+_ESCAPED_WALK_CUTOFF = 60  # Escapes have to be hidden before splitting, too
+# Greedy input shorter than this is walked, and if its tokens are single spaces
+# apart the greedy text is joined back together instead of sliced out of the input
+_GREEDY_WALK_CUTOFF = 24
+
+
+def _resolve_quoting(match: re.Match) -> str:
+    return match.group(1) or ""  # The escaped character, or nothing for a quote
+
+
+def unquote(text: str) -> str:
+    """Resolve the quotes and backslash escapes in a piece of command input."""
+    if "\\" not in text:
+        return text.replace('"', "")
+    hidden = _hide_escapes(text)
+    if hidden is None:
+        return _QUOTING.sub(_resolve_quoting, text)
+    return _reveal_escapes(hidden.replace('"', ""))
+
+
+def _walk_tokens(text: str) -> tuple[list[str], bool]:
+    """Tokenize one character at a time, which has the least setup for short input.
+
+    Returns:
+        tuple[list[str], bool]: The tokens, and whether each one was a single space
+            from the next, so joining them with spaces gives back the text between them.
+    """
     tokens = []
     current = []
-    in_quotes = False
-    escape = False
-
+    add = current.append
+    in_quotes = escape = False
+    spaced = True
     for char in text:
         if escape:
-            current.append(char)
+            add(char)
             escape = False
         elif char == "\\":
             escape = True
         elif char == '"':
             in_quotes = not in_quotes
-        elif char.isspace() and not in_quotes:
+        elif in_quotes or not char.isspace():
+            add(char)
+        elif current and char == " ":
+            tokens.append("".join(current))
+            current.clear()
+        else:
+            spaced = False  # Other whitespace, a run of it, or an empty token before it
             if current:
                 tokens.append("".join(current))
-                current = []
-        else:
-            current.append(char)
-
+                current.clear()
     if current:
         tokens.append("".join(current))
+    return tokens, spaced
+
+
+def _hide_escapes(text: str) -> str | None:
+    """Replace each escape with a two-character marker, so the input can be split
+    like input without backslashes and offsets into it still line up.
+
+    Escaped quotes become "\0\0", escaped backslashes "\0\1" and any other escaped
+    character is kept behind a "\0". Returns None if that can't be done, when the
+    input escapes whitespace or already has those control characters in it.
+    """
+    if "\0" in text or "\1" in text:
+        return None
+    # Runs of backslashes pair up from the left, the same way str.replace scans
+    text = text.replace("\\\\", "\0\1")
+    if text.endswith("\\"):
+        text = text[:-1]  # A lone backslash at the end escapes nothing
+    if _ESCAPED_SPACE.search(text):
+        return None
+    return text.replace('\\"', "\0\0").replace("\\", "\0")
+
+
+def _reveal_escapes(token: str) -> str:
+    return token.replace("\0\0", '"').replace("\0\1", "\\").replace("\0", "")
+
+
+def _word_spans(text: str) -> list[tuple[str, int, int]]:
+    words = text.split()
+    spans = []
+    if " ".join(words) == text:
+        # Words one space apart, so each one starts just after the last
+        end = -1
+        for word in words:
+            start = end + 1
+            end = start + len(word)
+            spans.append((word, start, end))
+        return spans
+    end = 0
+    for word in words:
+        # Only whitespace comes before the word, so the first match is the word itself
+        start = text.find(word, end)
+        end = start + len(word)
+        spans.append((word, start, end))
+    return spans
+
+
+def _quoted_spans(text: str) -> list[tuple[str, int, int]]:
+    # Without backslashes, the pieces between quotes alternate between outside and
+    # inside a quoted section, so only the outside pieces need splitting
+    spans = []
+    value = None
+    start = end = pos = 0
+    for i, piece in enumerate(text.split('"')):
+        if i & 1:
+            if value is None:
+                value, start = piece, pos - 1
+            else:
+                value += piece
+            pos += len(piece) + 1
+            end = pos  # Just past the closing quote
+            continue
+        offset = pos
+        for word in piece.split():
+            word_start = text.find(word, offset)
+            offset = word_start + len(word)
+            if value is not None and word_start == pos:
+                value += word
+            else:
+                if value:
+                    spans.append((value, start, end))
+                value, start = word, word_start
+            end = offset
+        if piece and piece[-1].isspace() and value is not None:
+            if value:
+                spans.append((value, start, end))
+            value = None
+        pos += len(piece) + 1
+    if value:
+        spans.append((value, start, min(end, len(text))))
+    return spans
+
+
+def _escaped_spans(text: str) -> list[tuple[str, int, int]]:
+    spans = []
+    for m in _TOKEN.finditer(text):
+        value = m.group()
+        if '"' in value or "\\" in value:
+            value = unquote(value)
+            if not value:
+                continue
+        spans.append((value, *m.span()))
+    return spans
 
-    return tokens
+
+def tokenize_spans(text: str) -> list[tuple[str, int, int]]:
+    """Split command input into tokens, keeping where each one came from.
+
+    Tokens are separated by whitespace, except inside double quotes or when
+    escaped with a backslash. Empty tokens (like "") are dropped.
+
+    Returns:
+        list[tuple[str, int, int]]: (value, start, end) for each token, where the
+            value has its quotes and escapes resolved and text[start:end] is the
+            token as it was typed.
+    """
+    if "\\" in text:
+        hidden = _hide_escapes(text)
+        if hidden is None:
+            return _escaped_spans(text)
+        return [
+            (_reveal_escapes(span[0]), span[1], span[2]) if "\0" in span[0] else span
+            for span in _quoted_spans(hidden)
+        ]
+    if '"' in text:
+        return _quoted_spans(text)
+    return _word_spans(text)
+
+
+def _greedy_tail(text: str) -> str | None:
+    """Resolve the quotes and escapes in the rest of the input from the start of a
+    token, leaving out the whitespace after its last token.
+
+    Returns None if there could be an empty token ("") at either end, which would be
+    dropped when tokenizing, so the tokens have to be found one by one instead.
+    """
+    escaped = "\\" in text
+    if escaped:
+        text = _hide_escapes(text)
+        if not text:
+            return None
+    if text.count('"') & 1:
+        # The last quote isn't closed, so the last token runs to the end
+        if text.endswith('"'):
+            return None
+    else:
+        text = text.rstrip()
+        if not text.rsplit(None, 1)[-1].strip('"'):
+            return None
+    if not text.split(None, 1)[0].strip('"'):
+        return None
+    text = text.replace('"', "")
+    return _reveal_escapes(text) if escaped else text
+
+
+def simple_tokenize(text: str) -> list[str]:
+    if '"' not in text and "\\" not in text:
+        return text.split()
+    escaped = "\\" in text
+    if len(text) < (_ESCAPED_WALK_CUTOFF if escaped else _QUOTED_WALK_CUTOFF):
+        return _walk_tokens(text)[0]
+    if not escaped:
+        return [value for value, _, _ in _quoted_spans(text)]
+    hidden = _hide_escapes(text)
+    if hidden is None:
+        return _walk_tokens(text)[0]
+    return [
+        _reveal_escapes(value) if "\0" in value else value
+        for value, _, _ in _quoted_spans(hidden)
+    ]
 
 
 class Greedy:
@@ -117,98 +313,276 @@ def get_annotated_base(ann):
     return ann
 
 
-async def parse_args(
-    func: Callable, input_str: str, message: Message, connection_state: ConnectionState
-) -> list:
-    """Parses the arguments for a command.
+SLOT_MESSAGE = "message"
+SLOT_NONE = "none"
+SLOT_GREEDY = "greedy"
+SLOT_LIST = "list"
+SLOT_OPTIONAL = "optional"
+SLOT_SCALAR = "scalar"
+
+
+@dataclass
+class ArgSlot:
+    """A single precompiled parameter of a command handler."""
+
+    kind: str
+    name: str
+    type: Any = None
+    parser: Parser[Any] | None = None
+    default: Any = inspect.Parameter.empty
+    remaining: int = 0  # How many parameters come after this one
+
+    async def cast(self, raw: str, connection_state: ConnectionState) -> Any:
+        # Parsers may be registered after the command, so fall back to the registry
+        parser = self.parser or PARSERS_BY_TYPE.get(self.type)
+        if parser:
+            return await parser.parse_token(raw, connection_state)
+        raise ValueError(f"No parser for type: {self.type!r}")
+
+
+class ArgBinder:
+    """A handler signature compiled into a flat list of argument slots."""
+
+    def __init__(self, slots: list[ArgSlot]):
+        self.slots = slots
+        self.needs_tokens = any(
+            slot.kind not in (SLOT_MESSAGE, SLOT_NONE) for slot in slots
+        )
+        self.has_greedy = any(slot.kind == SLOT_GREEDY for slot in slots)
+        # A greedy last parameter that only has single words before it can be sliced
+        # off the end of the input without tokenizing it
+        self.greedy_at = None
+        takes_tokens = [
+            slot for slot in slots if slot.kind not in (SLOT_MESSAGE, SLOT_NONE)
+        ]
+        if (
+            takes_tokens
+            and takes_tokens[-1].kind == SLOT_GREEDY
+            and takes_tokens[-1].remaining == 0
+            and all(
+                slot.kind in (SLOT_SCALAR, SLOT_OPTIONAL) for slot in takes_tokens[:-1]
+            )
+        ):
+            self.greedy_at = len(takes_tokens) - 1
+
+    def _split_greedy_tail(self, input_str: str) -> tuple[list[str], str] | None:
+        """Split off the words before a greedy last parameter and resolve the rest of the
+        input as its text, or return None if the input has to be tokenized."""
+        if self.greedy_at is None:
+            return None
+        words = input_str.split(None, self.greedy_at)
+        if len(words) <= self.greedy_at:
+            return None
+        head = input_str[: len(input_str) - len(words[-1])]
+        if '"' in head or "\\" in head:
+            return None  # The words before it are quoted or escaped
+        raw = _greedy_tail(words[-1])
+        if raw is None:
+            return None
+        return words[:-1], raw
+
+    def _tokenize(
+        self, input_str: str
+    ) -> tuple[list[str], list[tuple[str, int, int]] | None, str | None]:
+        """Split the input into tokens, along with what a greedy slot needs to get its text.
+
+        Returns:
+            The tokens, their spans if greedy text has to be sliced out of the input, and the
+            greedy text if it was split off the end of the input already.
+        """
+        if '"' not in input_str and "\\" not in input_str:
+            return input_str.split(), None, None
+        if not self.has_greedy:
+            return simple_tokenize(input_str), None, None
+        if len(input_str) < _GREEDY_WALK_CUTOFF:
+            tokens, spaced = _walk_tokens(input_str)
+            if spaced:
+                return tokens, None, None  # Greedy text can be joined back together
+        split = self._split_greedy_tail(input_str)
+        if split is not None:
+            return split[0], None, split[1]
+        # Greedy text is sliced out of the input, which needs to know where tokens are
+        spans = tokenize_spans(input_str)
+        return [value for value, _, _ in spans], spans, None
+
+    @staticmethod
+    def _greedy_text(
+        input_str: str,
+        tokens: list[str],
+        spans: list[tuple[str, int, int]] | None,
+        start: int,
+        count: int,
+    ) -> str:
+        """Get the text of `count` tokens from `start` on, as typed in the input."""
+        if not count:
+            return ""
+        if spans is not None:
+            # Slice the input so the text between tokens is kept as typed
+            raw = input_str[spans[start][1] : spans[start + count - 1][2]]
+            return unquote(raw)
+        if '"' in input_str or "\\" in input_str:
+            return " ".join(tokens[start : start + count])
+        raw = input_str.split(None, start)[-1]
+        return raw.rsplit(None, len(tokens) - start - count)[0]
+
+    async def bind(
+        self, input_str: str, message: Message, connection_state: ConnectionState
+    ) -> list:
+        """Builds the argument list for one invocation of the handler.
+
+        Args:
+            input_str (str): The list of arguments in string form, e.g. "1 2 3".
+            message (Message): A message object.
+            connection_state (ConnectionState): The connection state used by parsers.
+
+        Raises:
+            ValueError: If a required parameter is not defined.
+
+        Returns:
+            list: A list of arguments to be provided to the function.
+        """
+        if not self.needs_tokens:
+            return [
+                message if slot.kind == SLOT_MESSAGE else None for slot in self.slots
+            ]
+
+        tokens, spans, greedy_raw = self._tokenize(input_str)
+        out_args = []
+        idx = 0
+
+        for slot in self.slots:
+            kind = slot.kind
+
+            if kind == SLOT_MESSAGE:
+                out_args.append(message)
+                continue
+
+            if kind == SLOT_NONE:
+                out_args.append(None)
+                continue
+
+            if kind == SLOT_GREEDY:
+                if greedy_raw is not None:
+                    raw = greedy_raw
+                else:
+                    take = max(0, len(tokens) - idx - slot.remaining)
+                    raw = self._greedy_text(input_str, tokens, spans, idx, take)
+                    idx += take
+                out_args.append(await slot.cast(raw, connection_state))
+                continue
+
+            if kind == SLOT_LIST:
+                take = max(0, len(tokens) - idx - slot.remaining)
+                items = tokens[idx : idx + take]
+                idx += take
+                out_args.append(
+                    [await slot.cast(item, connection_state) for item in items]
+                )
+                continue
+
+            if idx >= len(tokens):
+                if slot.default is not inspect.Parameter.empty:
+                    out_args.append(slot.default)
+                    continue
+                if kind == SLOT_OPTIONAL:
+                    out_args.append(None)
+                    continue
+                raise ValueError(f"Missing value for parameter '{slot.name}'")
+
+            raw = tokens[idx]
+            idx += 1
+
+            if kind == SLOT_OPTIONAL and raw.lower() == "none":
+                out_args.append(None)
+            else:
+                out_args.append(await slot.cast(raw, connection_state))
+
+        return out_args
+
+
+def compile_args(func: Callable) -> ArgBinder:
+    """Compiles the signature of a command into an argument binder.
 
     Args:
-        func (Callable): The function to parse the args for.
-        input_str (str): The list of arguments in string form, e.g. "1 2 3".
-        message (Message): A message object.
+        func (Callable): The function to compile the signature of.
 
     Raises:
         SyntaxError: If two message parameters are requested.
-        ValueError: If a required parameter is not defined.
 
     Returns:
-        list: A list of arguments to be provided to the function.
+        ArgBinder: A binder that can build the arguments for the function.
     """
 
-    sig = inspect.signature(func)
-    params = list(sig.parameters.values())
-    # Bypasses for simple functions so it doesn't always need to pass the whole thing in
-    if len(params) == 0:
-        return []
-    if len(params) == 1:
-        ann = get_args(params[0].annotation)
-        if ann is Message or (is_union_type(ann) and Message in args):
-            return [message]
-    tokens = simple_tokenize(input_str)
-    out_args = []
-    idx = 0
+    params = list(inspect.signature(func).parameters.values())
+    slots: list[ArgSlot] = []
     message_injected = False
 
     for p_i, param in enumerate(params):
         ann = param.annotation
-        origin = get_origin(ann)
         args = get_args(ann)
+        remaining = len(params) - (p_i + 1)
+        optional = is_union_type(ann) and type(None) in args
 
         if ann is Message or (is_union_type(ann) and Message in args):
             if message_injected:
                 # Second message not allowed unless it's optional [in which case we just give None instead]
-                if origin is Union and type(None) in args:
-                    out_args.append(None)
+                if optional:
+                    slots.append(ArgSlot(SLOT_NONE, param.name))
                     continue
                 raise SyntaxError(
                     f"Multiple Message parameters not allowed: {param.name}"
                 )
-            out_args.append(message)
+            slots.append(ArgSlot(SLOT_MESSAGE, param.name))
             message_injected = True
             continue
 
         if is_annotated_greedy(ann):
-            base_type = get_annotated_base(ann)
-            needed_for_rest = len(params) - (p_i + 1)
-            take = max(0, len(tokens) - idx - needed_for_rest)
-            raw = " ".join(tokens[idx : idx + take])
-            idx += take
-            out_args.append(await cast_type(base_type, raw, connection_state))
-            continue
-
-        if is_list_type(ann):
-            elem_type = get_list_arg_type(ann)
-            needed_for_rest = len(params) - (p_i + 1)
-            take = max(0, len(tokens) - idx - needed_for_rest)
-            items = tokens[idx : idx + take]
-            idx += take
-            out_args.append(
-                [await cast_type(elem_type, item, connection_state) for item in items]
+            typ = get_annotated_base(ann)
+            kind = SLOT_GREEDY
+        elif is_list_type(ann):
+            typ = get_list_arg_type(ann)
+            kind = SLOT_LIST
+        elif optional:
+            typ = next(t for t in args if t is not type(None))
+            kind = SLOT_OPTIONAL
+        else:
+            typ = ann
+            kind = SLOT_SCALAR
+
+        slots.append(
+            ArgSlot(
+                kind,
+                param.name,
+                typ,
+                PARSERS_BY_TYPE.get(typ),
+                param.default,
+                remaining,
             )
-            continue
+        )
 
-        if idx >= len(tokens):
-            if param.default is not inspect.Parameter.empty:
-                out_args.append(param.default)
-                continue
-            if is_union_type(ann) and type(None) in args:
-                out_args.append(None)
-                continue
-            raise ValueError(f"Missing value for parameter '{param.name}'")
+    return ArgBinder(slots)
 
-        raw = tokens[idx]
-        idx += 1
 
-        if is_union_type(ann) and type(None) in args:
-            if raw.lower() == "none":
-                out_args.append(None)
-            else:
-                non_none = next(t for t in args if t is not type(None))
-                out_args.append(await cast_type(non_none, raw, connection_state))
-        else:
-            out_args.append(await cast_type(ann, raw, connection_state))
+async def parse_args(
+    func: Callable, input_str: str, message: Message, connection_state: ConnectionState
+) -> list:
+    """Parses the arguments for a command.
+
+    Prefer compiling the function once with `compile_args` and reusing the binder.
+
+    Args:
+        func (Callable): The function to parse the args for.
+        input_str (str): The list of arguments in string form, e.g. "1 2 3".
+        message (Message): A message object.
 
-    return out_args
+    Raises:
+        SyntaxError: If two message parameters are requested.
+        ValueError: If a required parameter is not defined.
+
+    Returns:
+        list: A list of arguments to be provided to the function.
+    """
+    return await compile_args(func).bind(input_str, message, connection_state)
 
 
 ## Parsers for default supported Types
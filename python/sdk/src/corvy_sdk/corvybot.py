@@ -1,19 +1,44 @@
 import asyncio
-from datetime import datetime, timezone
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+import functools
+import inspect
 import signal
 import sys
-from typing import Awaitable, Callable
+import time
+import re
+from types import MappingProxyType
+from typing import Awaitable, Callable, Iterable, Mapping
 import logging
 import aiohttp
-import json
 from websockets import ConnectionClosed
 from websockets.asyncio.client import connect
-from .messages import Message, MessageUser
-from .nest import PartialNest
-from .flock import PartialFlock, Flock
-from .command_parsing import parse_args
+from .messages import Message, decode_message
+from .flock import Flock
+from .command_parsing import compile_args
+from .command_index import (
+    EXECUTION_MODES,
+    CommandIndex,
+    CommandOnCooldown,
+    CommandSpec,
+    CommandTimeoutError,
+)
 from .default_logger import get_pretty_logger
 from .state import ConnectionState
+from .cache import EntityCache, TTLCache
+from .worker_pool import MessageWorkerPool
+from .sharding import ProcessShardPool, in_shard
+from .outbound import SendPriority, SendScheduler
+from .replies import ReplyTracker
+from .codec import get_codec
+from .topology import Topology
+from .store import MessageStore
+from .catchup import MessageTracker
+from .health import ConnectionHealth
+from .loop_lag import LoopLagMonitor
+from .metrics import Metrics, MetricsSink
+from .profiling import HandlerProfiler, HandlerTiming
+from .events import Event, EventBus, Listener, MessageFilter
+from .triggers import TriggerRegistry
 
 logger = get_pretty_logger("corvy_sdk")
 
@@ -29,6 +54,38 @@ class CorvyBot:
         global_prefix: str = "!",
         api_base_url: str = "https://corvy.chat",
         api_path: str = "/api/v2",
+        workers: int = 0,
+        message_ordering: str | None = "nest",
+        max_queued_messages: int = 1000,
+        cache_size: int = 1024,
+        cache_ttl: float | None = 300,
+        send_rate: float | None = None,
+        send_burst: int = 1,
+        nest_send_rate: float | None = None,
+        nest_send_burst: int = 1,
+        coalesce_messages: bool = False,
+        reply_timeout: float = 10,
+        json_codec: str = "json",
+        store_path: str | None = None,
+        catch_up_on_reconnect: bool = True,
+        heartbeat_interval: float = 30,
+        heartbeat_timeout: float = 10,
+        max_missed_heartbeats: int = 2,
+        reconnect_backoff_max: float = 60,
+        thread_workers: int | None = None,
+        process_workers: int | None = None,
+        executor_timeout: float | None = None,
+        loop_lag_interval: float | None = 0.5,
+        loop_lag_threshold: float = 0.1,
+        metrics: bool = True,
+        metrics_sinks: list[MetricsSink] | None = None,
+        metrics_port: int | None = None,
+        metrics_host: str = "127.0.0.1",
+        profiling: bool = False,
+        slow_handler_threshold: float = 0.5,
+        slowest_handlers: int = 20,
+        profile_slow_handlers: bool = False,
+        profile_dir: str | None = None,
     ):
         """
         Create a new bot instance
@@ -37,8 +94,45 @@ class CorvyBot:
             token: Token for the Corvy API.
             global_prefix: The prefix for all commands. Defaults to an exclamation mark.
             api_base_url: The URL for the Corvy API.
+            workers: How many messages to process concurrently. 0 (the default) processes them one at a time, inside the receive loop.
+            message_ordering: Keep messages in the same "nest" or from the same "user" in order when using workers. None allows any order.
+            max_queued_messages: How many received messages may wait for a worker before the bot stops reading the websocket.
+            cache_size: How many users, flocks and nests of each kind to keep cached. 0 disables caching.
+            cache_ttl: Seconds a fetched user, flock or nest stays cached. None keeps them until evicted.
+            send_rate: The most messages per second to send across all nests. None means unlimited.
+            send_burst: How many messages may be sent at once before send_rate applies.
+            nest_send_rate: The most messages per second to send to a single nest. None means unlimited.
+            nest_send_burst: How many messages may be sent to a nest at once before nest_send_rate applies.
+            coalesce_messages: Join consecutive queued messages to the same nest into one message.
+            reply_timeout: Seconds to wait for the server to acknowledge a sent message.
+            json_codec: The JSON library to use: "json", "orjson", "msgspec", or "auto" for the fastest one installed.
+            store_path: A SQLite file to keep messages, users, flocks and nests in between restarts. None disables the store.
+            catch_up_on_reconnect: After the websocket reconnects, fetch and process the messages that were missed while it was down.
+            heartbeat_interval: Seconds between websocket heartbeats.
+            heartbeat_timeout: Seconds to wait for the server to answer a heartbeat.
+            max_missed_heartbeats: How many unanswered heartbeats in a row mark the connection as dead.
+            reconnect_backoff_max: The longest to wait, in seconds, between reconnect attempts.
+            thread_workers: How many threads run "thread" commands. None lets Python pick.
+            process_workers: How many processes run "process" commands. None uses the CPU count.
+            executor_timeout: Seconds a "thread" or "process" command may run before it fails with a TimeoutError. None waits forever.
+            loop_lag_interval: Seconds between event loop lag measurements. None disables the measurements.
+            loop_lag_threshold: Warn when the event loop is blocked for this many seconds or more.
+            metrics: Record counters and latency histograms for the message pipeline, available from bot.metrics.
+            metrics_sinks: Extra places to send metrics to as they're recorded, like an OpenTelemetrySink.
+            metrics_port: Serve the metrics for Prometheus at /metrics on this port. None doesn't serve them. Under run_sharded only the supervisor's metrics are served; the shards' command and handler metrics stay in their own processes.
+            metrics_host: The interface to serve the metrics on. Only this machine can scrape them by default; use "0.0.0.0" for every interface.
+            profiling: Time every command and event handler, keeping the slowest ones in bot.profiler and firing on_slow_handler for slow ones.
+            slow_handler_threshold: Seconds after which a handler counts as slow when profiling.
+            slowest_handlers: How many of the slowest handler invocations to keep when profiling.
+            profile_slow_handlers: Run async handlers under cProfile when profiling, and attach the profile of slow ones to on_slow_handler.
+            profile_dir: A directory to dump the cProfile profiles of slow handlers to.
         """
-        self.commands: dict[str, Callable] = {}
+        self._commands: dict[str, Callable] = {}
+        self._command_index = CommandIndex()
+        self._command_specs: dict[Callable, CommandSpec] = {}
+        self._executors: dict[str, Executor] = {}
+        self.executor_sizes = {"thread": thread_workers, "process": process_workers}
+        self.executor_timeout = executor_timeout
         self.token = token
         self.global_prefix = global_prefix
         self.api_base_url = api_base_url
@@ -49,55 +143,214 @@ class CorvyBot:
             "Content-Type": "application/json",
         }
         self.connection_state: ConnectionState | None = None
-        self.events: dict[str, list[Awaitable]] = {}
+        self.cache = EntityCache(cache_size, cache_ttl)
+        self.events = EventBus(self._on_event_error)
+        self.triggers = TriggerRegistry()
         self.auth_details: dict | None = None
         self.ws_keepalive_id: int = 0
-        # Setup signal handler for graceful shutdown
-        signal.signal(signal.SIGINT, self._handle_shutdown_stub)
+        self.worker_pool: MessageWorkerPool | ProcessShardPool | None = None
+        if workers > 0:
+            self.worker_pool = MessageWorkerPool(
+                self._process_message_raw,
+                workers,
+                max_queued_messages,
+                message_ordering,
+            )
+        self.send_scheduler: SendScheduler | None = None
+        if send_rate or nest_send_rate or coalesce_messages:
+            self.send_scheduler = SendScheduler(
+                send_rate,
+                send_burst,
+                nest_send_rate,
+                nest_send_burst,
+                coalesce_messages,
+            )
+        self.replies = ReplyTracker(reply_timeout)
+        self.codec = get_codec(json_codec)
+        self.store: MessageStore | None = None
+        if store_path is not None and not in_shard():  # Shards use the supervisor's
+            self.store = MessageStore(store_path)
+        self.catch_up_on_reconnect = catch_up_on_reconnect
+        self.message_tracker = MessageTracker()
+        self.health = ConnectionHealth(
+            heartbeat_interval,
+            heartbeat_timeout,
+            max_missed_heartbeats,
+            backoff_max=reconnect_backoff_max,
+        )
+        self.loop_lag: LoopLagMonitor | None = None
+        if loop_lag_interval is not None:
+            self.loop_lag = LoopLagMonitor(loop_lag_interval, loop_lag_threshold)
+        self.metrics: Metrics | None = None
+        if metrics:
+            self.metrics = Metrics(metrics_sinks)
+        self.metrics_port = metrics_port
+        self.metrics_host = metrics_host
+        self.profiler: HandlerProfiler | None = None
+        if profiling:
+            self.profiler = HandlerProfiler(
+                slow_handler_threshold,
+                slowest_handlers,
+                profile_slow_handlers,
+                profile_dir,
+                self._on_slow_handler,
+            )
+        # Setup signal handler for graceful shutdown (the supervisor's, in a shard)
+        if not in_shard():
+            signal.signal(signal.SIGINT, self._handle_shutdown_stub)
+
+    @property
+    def commands(self) -> Mapping[str, Callable]:
+        """The registered commands by prefix, aliases included.
+
+        This is read-only: commands are dispatched through an index built as they're
+        registered, so `command()` is the only way to add one.
+        """
+        return MappingProxyType(self._commands)
 
     def command(
         self,
         name: str | None = None,
         include_global_prefix: bool = True,
         aliases: list[str] | None = None,
+        execution: str = "async",
+        timeout: float | None = None,
+        max_concurrency: int | None = None,
+        user_cooldown: float | None = None,
+        nest_cooldown: float | None = None,
+        max_cooldown_entries: int = 4096,
     ):
         """Register a command.
 
         Args:
             name: The name of the command. Defaults to the name of the function.
             include_global_prefix: Notes if the global prefix should be included in the command name. True by default.
-            aliases: A list of aliases for the command."""
+            aliases: A list of aliases for the command.
+            execution: How to run the command: "async" awaits it on the event loop, "thread" and "process" run a plain (non-async) function in a thread or process pool. Process commands must be module-level functions, and their Message has no connection state.
+            timeout: Seconds the command may run before it's cancelled and on_command_exception gets a CommandTimeoutError. None uses the bot's executor_timeout for thread and process commands, and no timeout for async ones.
+            max_concurrency: The most invocations of the command that may run at once. Further ones wait their turn. None means unlimited.
+            user_cooldown: Seconds a user must wait between invocations. Invocations during the cooldown raise CommandOnCooldown.
+            nest_cooldown: Seconds between invocations in the same nest.
+            max_cooldown_entries: How many users (and nests) to track cooldowns for. The least recently used ones are forgotten first.
+
+        Concurrency limits and cooldowns are kept by the bot running the command. Under
+        run_sharded each shard process has its own, so max_concurrency applies per process
+        and a user whose messages land on different shards has a cooldown on each. Nest
+        cooldowns are unaffected, since a nest's messages always go to the same shard.
+        """
+
+        if execution not in EXECUTION_MODES:
+            raise ValueError(f"Unknown execution mode: {execution!r}")
+        if max_concurrency is not None and max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
 
         def _decorator_inst(func: Awaitable):
+            if execution != "async" and inspect.iscoroutinefunction(func):
+                raise TypeError(
+                    f"Commands using {execution} execution must be plain functions, not async ones"
+                )
             if name is None:
                 prefix = getattr(func, "__name__", "")
             else:
                 prefix = name
             if include_global_prefix:
                 prefix = f"{self.global_prefix}{prefix}"
-            self.commands[prefix] = func
+            # Compile the signature now so errors surface at startup
+            self._command_specs[func] = CommandSpec(
+                compile_args(func),
+                execution,
+                timeout,
+                None if max_concurrency is None else asyncio.Semaphore(max_concurrency),
+                (
+                    None
+                    if not user_cooldown
+                    else TTLCache(max_cooldown_entries, user_cooldown)
+                ),
+                (
+                    None
+                    if not nest_cooldown
+                    else TTLCache(max_cooldown_entries, nest_cooldown)
+                ),
+            )
+            self._register_command(prefix, func)
             if aliases:
                 for alias in aliases:
                     if include_global_prefix:
-                        self.commands[f"{self.global_prefix}{alias}"] = func
+                        self._register_command(f"{self.global_prefix}{alias}", func)
                     else:
-                        self.commands[alias] = func
+                        self._register_command(alias, func)
             return func  # We don't wrap the function itself yet
 
         return _decorator_inst
 
-    def event(self, event: str | None = None):
+    def trigger(
+        self,
+        *keywords: str,
+        pattern: str | re.Pattern | None = None,
+        case_sensitive: bool = False,
+        whole_word: bool = True,
+    ):
+        """Register a trigger: a handler called when a message contains a keyword or matches a pattern.
+
+        All triggers are compiled into a few combined matchers that check each message in one pass, so
+        thousands of them cost about as much as one. They run on messages that aren't from bots and
+        aren't commands, before on_message. A handler is called at most once per message, with the
+        Message and the keyword it matched (or the re.Match for a pattern).
+
+        Args:
+            keywords: Literal words or phrases to look for.
+            pattern: A regex to search messages for.
+            case_sensitive: Match the keywords' case exactly.
+            whole_word: Only match keywords that aren't part of a longer word.
+        """
+        if not keywords and pattern is None:
+            raise ValueError("A trigger needs at least one keyword or a pattern")
+
+        def _decorator_inst(func: Awaitable):
+            if keywords:
+                self.triggers.add_keywords(keywords, func, case_sensitive, whole_word)
+            if pattern is not None:
+                self.triggers.add_pattern(pattern, func)
+            return func  # We don't wrap the function itself
+
+        return _decorator_inst
+
+    def _register_command(self, prefix: str, func: Callable):
+        self._commands[prefix] = func
+        self._command_index.add(prefix, func)
+
+    def event(
+        self,
+        event: str | Event | None = None,
+        ordered: bool = False,
+        *,
+        nests: int | Iterable[int] | None = None,
+        flocks: int | Iterable[int] | None = None,
+        users: int | Iterable[int] | None = None,
+        prefix: str | None = None,
+        pattern: str | re.Pattern | None = None,
+    ):
         """Register an event.
 
+        Listeners for the same event run concurrently, and one raising doesn't stop the others.
+        Message events (on_message_raw, on_message, on_command_exception) can be filtered, so the
+        listener is only called for matching messages. Filters are indexed, so listeners that don't
+        match a message cost next to nothing.
+
         Args:
-            event: The event to register to. Defaults to the name of the function."""
+            event: The event to register to. Defaults to the name of the function.
+            ordered: Run this listener before the concurrent ones, one at a time in the order they were registered.
+            nests: Only call the listener for messages in these nest ids.
+            flocks: Only call the listener for messages in these flock ids.
+            users: Only call the listener for messages from these user ids.
+            prefix: Only call the listener for messages starting with this text.
+            pattern: Only call the listener for messages matching this regex (anywhere in the content).
+        """
+        message_filter = MessageFilter.build(nests, flocks, users, prefix, pattern)
 
         def _decorator_inst(func: Awaitable):
             event_name = event or getattr(func, "__name__", None)
-            # If the event key doesn't yet exist, create it
-            if not self.events.get(event_name, False):
-                self.events[event_name] = []
-            self.events[event_name].append(func)
+            self.events.add(event_name, func, ordered, message_filter)
             return func  # We don't wrap the function itself
 
         return _decorator_inst
@@ -117,54 +370,81 @@ class CorvyBot:
             logger.debug("Running prestart events...")
 
             # Run prestart events
-            events = self.events.get("prestart", [])
-            for event in events:
-                await event(self)
+            await self._dispatch_event(Event.PRESTART, self)
 
             logger.debug("Starting bot...")
             client_session = aiohttp.ClientSession(
-                self.api_base_url, headers=self.headers
+                self.api_base_url,
+                headers=self.headers,
+                json_serialize=self.codec.dumps_str,
             )
             response_data = {}
 
             async with client_session.post(f"{self.api_path}/auth") as response:
-                response_data = await response.json()
+                response_data = await response.json(loads=self.codec.loads)
                 logger.info(f"Bot authenticated: {response_data['bot']['name']}")
+            await client_session.close()
 
             self.auth_details = response_data
 
             # Connect to websocket
             websocket = await connect(response_data["websocket"]["url"])
-            await websocket.send(
-                json.dumps(
-                    {
-                        "topic": response_data["websocket"]["channel"],
-                        "event": "phx_join",
-                        "payload": {"token": self.token},
-                        "ref": "1",
-                    }
-                )
+            await self.codec.send_frame(
+                websocket,
+                {
+                    "topic": response_data["websocket"]["channel"],
+                    "event": "phx_join",
+                    "payload": {"token": self.token},
+                    "ref": "1",
+                },
             )
             self.connection_state = ConnectionState(
-                aiohttp.ClientSession(self.api_base_url, headers=self.headers),
+                aiohttp.ClientSession(
+                    self.api_base_url,
+                    headers=self.headers,
+                    json_serialize=self.codec.dumps_str,
+                ),
                 websocket,
                 response_data["websocket"]["channel"],
                 self.api_path,
+                self.cache,
+                sender=self.send_scheduler,
+                replies=self.replies,
+                codec=self.codec,
+                store=self.store,
+                metrics=self.metrics,
             )
+            if self.metrics is not None and self.metrics_port is not None:
+                await self.metrics.serve_prometheus(
+                    self.metrics_port, self.metrics_host
+                )
+            if self.store is not None:
+                # Catch up on what was sent while the bot was offline
+                synced = await self.store.sync(self.connection_state)
+                logger.debug(f"Synced {synced} messages into the store.")
+                self.message_tracker.last_ids.update(
+                    await self.store.last_message_ids()
+                )
+                self.store.start()
+            if self.send_scheduler is not None:
+                self.send_scheduler.start()
             asyncio.create_task(self._keepalive())
+            if self.loop_lag is not None:
+                self.loop_lag.start()
             # Log command prefixes
-            command_prefixes = [cmd for cmd in self.commands.keys()]
+            command_prefixes = [cmd for cmd in self._commands.keys()]
             logger.debug(f"Listening for commands: {', '.join(command_prefixes)}")
 
             logger.debug("Running start events...")
 
             # Runstart events
-            events = self.events.get("start", [])
-            for event in events:
-                await event(self)
+            await self._dispatch_event(Event.START, self)
 
             logger.debug("Running message loop...")
 
+            if self.worker_pool is not None:
+                self.worker_pool.start()
+
             await self._process_websocket_loop()
 
         except Exception as e:
@@ -179,57 +459,70 @@ class CorvyBot:
                     raise TypeError(
                         "The object recieved in the WebSocket was a binary object and not in text form!"
                     )
-                recieved = json.loads(recieved)
+                if self.metrics is None:
+                    recieved = self.codec.loads(recieved)
+                else:
+                    started = time.perf_counter()
+                    recieved = self.codec.loads(recieved)
+                    self.metrics.observe(
+                        "corvy_frame_decode_seconds", time.perf_counter() - started
+                    )
+                    self.metrics.inc(
+                        "corvy_frames_received_total",
+                        labels=(("event", recieved["event"]),),
+                    )
                 match recieved["event"]:
                     case "message":
-                        await self._process_message_raw(recieved["payload"]["message"])
+                        await self._dispatch_message(recieved["payload"]["message"])
                     case "phx_reply":
-                        pass
+                        if self.replies.resolve(recieved):
+                            pass
+                        elif self.health.heartbeats.resolve(recieved):
+                            pass
+                        elif self.worker_pool is not None:
+                            self.worker_pool.route_reply(recieved)
                     case _:
                         logger.warning(
-                            f"Websocket event {recieved["event"]} not handled!"
+                            f"Websocket event {recieved['event']} not handled!"
                         )
                         print(recieved)
 
                 await asyncio.sleep(0)  # Let other tasks run
 
             except ConnectionClosed as e:
-                await asyncio.sleep(5)
                 await self._try_reconnect()
+                if self.catch_up_on_reconnect:
+                    # Snapshot before any live message can move the marks past the gap
+                    last_ids = dict(self.message_tracker.last_ids)
+                    asyncio.create_task(self._catch_up(last_ids))
 
             except Exception as e:
                 logger.exception(f"Error fetching messages: {str(e)}")
                 await asyncio.sleep(0)  # Let other tasks run
 
-    async def _process_message_raw(self, message: dict):
-        msg_user = MessageUser(
-            message["user"]["id"],
-            message["user"]["username"],
-            message["user"]["is_bot"],
-            message["user"].get("photo_url", None),
-        ).attach_state(self.connection_state)
-        msg_flock = PartialFlock(message["flock_id"]).attach_state(
-            self.connection_state
-        )
-        msg_nest = PartialNest(message["nest_id"], msg_flock).attach_state(
-            self.connection_state
+    async def _catch_up(self, last_ids: dict[int, tuple[int, int]]):
+        """Replay the messages missed while the websocket was disconnected."""
+        replayed = await self.message_tracker.catch_up(
+            self.connection_state, self._dispatch_message, last_ids
         )
+        logger.info(f"Caught up on {replayed} missed messages.")
+
+    async def _dispatch_message(self, message: dict):
+        """Hand a raw message to the worker pool, or process it right away."""
+        if self.message_tracker.seen(message):
+            return  # Already processed, e.g. replayed after a reconnect
+        if self.worker_pool is not None:
+            await self.worker_pool.submit(message)
+        else:
+            await self._process_message_raw(message)
 
-        message = Message(
-            message["id"],
-            message["content"],
-            msg_flock,
-            msg_nest,
-            datetime.strptime(message["created_at"], "%Y-%m-%dT%H:%M:%SZ").replace(
-                tzinfo=timezone.utc
-            ),
-            msg_user,
-        ).attach_state(self.connection_state)
+    async def _process_message_raw(self, message: dict):
+        if self.store is not None:
+            self.store.save_message(message)
+        message = decode_message(message, self.connection_state)
 
         # Run on_message_raw events
-        events = self.events.get("on_message_raw", [])
-        for event in events:
-            await event(message)
+        await self._dispatch_event(Event.ON_MESSAGE_RAW, message)
 
         # Skip bot messages
         if message.user.is_bot:
@@ -246,56 +539,149 @@ class CorvyBot:
         if was_command:
             return
 
+        # Run the triggers the message matches
+        if len(self.triggers):
+            await self._run_triggers(message)
+
         # Run on_message events
-        events = self.events.get("on_message", [])
-        for event in events:
-            await event(message)
+        await self._dispatch_event(Event.ON_MESSAGE, message)
+
+    async def _dispatch_event(self, event_name: str, *args):
+        """Run every listener registered for an event."""
+        if event_name not in self.events:
+            return
+        # Slow on_slow_handler listeners aren't reported, or they'd report themselves
+        if self.profiler is None or event_name == Event.ON_SLOW_HANDLER:
+            runner = None
+        else:
+            runner = self._profile_listener
+        if self.metrics is None:
+            await self.events.dispatch(event_name, args, runner)
+            return
+        started = time.perf_counter()
+        try:
+            await self.events.dispatch(event_name, args, runner)
+        finally:
+            self.metrics.observe(
+                "corvy_event_dispatch_seconds",
+                time.perf_counter() - started,
+                (("event", event_name),),
+            )
+
+    async def _run_triggers(self, message: Message):
+        try:
+            triggered = self.triggers.match(message.content)
+        except Exception as e:
+            logger.exception(f"Error matching triggers: {str(e)}")
+            return
+        if not triggered:
+            return
+        await asyncio.gather(
+            *(
+                self._run_trigger(handler, message, match)
+                for handler, match in triggered
+            )
+        )
+
+    async def _run_trigger(self, handler: Callable, message: Message, match):
+        try:
+            if self.profiler is None:
+                await handler(message, match)
+            else:
+                name = getattr(handler, "__name__", repr(handler))
+                await self.profiler.run(
+                    "trigger", name, (message, match), handler(message, match)
+                )
+        except Exception as e:
+            logger.exception(f"Error in trigger {handler}: {str(e)}")
+            await self._dispatch_event(Event.ON_EVENT_EXCEPTION, "trigger", handler, e)
+
+    def _profile_listener(self, event_name: str, listener: Listener, args: tuple):
+        return self.profiler.run(
+            "event", f"{event_name}:{listener.name}", args, listener.func(*args)
+        )
+
+    async def _on_event_error(
+        self, event_name: str, listener: Listener, error: Exception
+    ):
+        if event_name != Event.ON_EVENT_EXCEPTION:
+            await self._dispatch_event(
+                Event.ON_EVENT_EXCEPTION, event_name, listener.func, error
+            )
+
+    def _on_slow_handler(self, timing: HandlerTiming):
+        task = asyncio.create_task(self._dispatch_event(Event.ON_SLOW_HANDLER, timing))
+        task.add_done_callback(
+            lambda t: t.cancelled()
+            or t.exception() is None
+            or logger.error(f"Error in on_slow_handler: {t.exception()}")
+        )
 
     async def _try_reconnect(self):
-        """Try to reconnect the WebSocket."""
+        """Try to reconnect the WebSocket, backing off exponentially between attempts."""
+        started = time.monotonic()
+        attempt = 0
         while True:
             try:
                 websocket = await connect(self.auth_details["websocket"]["url"])
-                await websocket.send(
-                    json.dumps(
-                        {
-                            "topic": self.auth_details["websocket"]["channel"],
-                            "event": "phx_join",
-                            "payload": {"token": self.token},
-                            "ref": "_py_reconnect_attempt",
-                        }
-                    )
+                await self.codec.send_frame(
+                    websocket,
+                    {
+                        "topic": self.auth_details["websocket"]["channel"],
+                        "event": "phx_join",
+                        "payload": {"token": self.token},
+                        "ref": "_py_reconnect_attempt",
+                    },
                 )
                 recieve_success = await websocket.recv()
-                recieved = json.loads(recieve_success)
+                recieved = self.codec.loads(recieve_success)
                 if recieved["ref"] == "_py_reconnect_attempt":
                     self.connection_state.websocket = websocket
+                    self.health.reconnected(time.monotonic() - started)
+                    if self.metrics is not None:
+                        self.metrics.inc("corvy_reconnects_total")
                     logger.info("Reconnected to WebSocket.")
                     break
-            except Exception:
-                pass
-            await asyncio.sleep(5)
+            except Exception as e:
+                logger.warning(f"Reconnect attempt {attempt + 1} failed: {str(e)}")
+            self.health.failed_reconnects += 1
+            if self.metrics is not None:
+                self.metrics.inc("corvy_reconnect_failures_total")
+            await asyncio.sleep(self.health.backoff(attempt))
+            attempt += 1
 
     async def _keepalive(self):
-        """Keeps the WebSocket alive."""
+        """Keeps the WebSocket alive, and closes it if the server stops answering."""
         while True:
+            sent_at = time.monotonic()
             try:
-                await self.connection_state.websocket.send(
-                    json.dumps(
-                        {
-                            "topic": "phoenix",
-                            "event": "heartbeat",
-                            "payload": {},
-                            "ref": f"_py_keepalive_{self.ws_keepalive_id}",
-                        }
-                    )
+                ref = f"_py_keepalive_{self.ws_keepalive_id}"
+                reply = self.health.heartbeats.expect(ref)
+                await self.connection_state.send_frame(
+                    {
+                        "topic": "phoenix",
+                        "event": "heartbeat",
+                        "payload": {},
+                        "ref": ref,
+                    }
                 )
                 logger.debug(f"Keepalive #{self.ws_keepalive_id} sent.")
                 self.ws_keepalive_id += 1
-                # Wait 30 seconds before the next keepalive
-                await asyncio.sleep(30)
+                try:
+                    await reply
+                    self.health.heartbeat_replied(time.monotonic() - sent_at)
+                except (TimeoutError, ValueError):
+                    self.health.heartbeat_missed()
+                    logger.warning(f"Keepalive {ref} went unanswered.")
+                    if self.health.dead:
+                        logger.warning("WebSocket is unresponsive, reconnecting...")
+                        # The receive loop sees the close and reconnects
+                        await self.connection_state.websocket.close()
             except ConnectionClosed:
-                pass  # should reconnect soon
+                self.health.heartbeats.discard(ref)  # should reconnect soon
+            # Wait until the next keepalive is due
+            elapsed = time.monotonic() - sent_at
+            await asyncio.sleep(max(0, self.health.heartbeat_interval - elapsed))
 
     async def _handle_command(self, message: Message) -> bool:
         """
@@ -304,47 +690,151 @@ class CorvyBot:
         Args:
             message: Message object
         """
-        message_content: str = message.content.lower()
-        # Check each command prefix
-        for prefix, handler in self.commands.items():
-            if message_content.startswith(prefix.lower()):
-                args = message.content.replace(prefix, "", 1)
-                if args != "" and not args[0].isspace():
-                    continue  # We don't say there's a command to be ran if there's no space between the command name and args
-                logger.debug(f"Command detected: {prefix}")
-
-                # Generate response using the command handler, if we don't get an error
-                try:
-                    args = await parse_args(
-                        handler, args.strip(), message, self.connection_state
+        match = self._command_index.match(message.content)
+        if match is None:
+            # No commands were ran, so return false (we didn't run a command)
+            return False
+        prefix, handler, args = match
+        logger.debug(f"Command detected: {prefix}")
+        spec = self._command_specs[handler]
+
+        # Generate response using the command handler, if we don't get an error
+        metrics = self.metrics
+        labels = (("command", prefix),)
+        try:
+            if metrics is None:
+                args = await spec.binder.bind(
+                    args.strip(), message, self.connection_state
+                )
+            else:
+                started = time.perf_counter()
+                args = await spec.binder.bind(
+                    args.strip(), message, self.connection_state
+                )
+                metrics.observe(
+                    "corvy_command_parse_seconds", time.perf_counter() - started, labels
+                )
+            # Only once the arguments parsed, so a typo doesn't use the cooldown up
+            spec.check_cooldowns(prefix, message.user.id, message.nest.id)
+            if spec.limiter is None:
+                response_content = await self._run_handler(prefix, spec, handler, args)
+            else:
+                async with spec.limiter:
+                    response_content = await self._run_handler(
+                        prefix, spec, handler, args
                     )
-                    response_content = await handler(*args)
-                except Exception as e:
-                    logger.exception(e)
-                    events = self.events.get("on_command_exception", [])
-                    for event in events:
-                        await event(prefix, message, e)
-                    return True  # a command did run, it just errored
-
-                # Send the response
-                # TODO: use the nest object when it has a send() func
-                await message.nest.send(response_content)
-
-                # Return true after first matching command
-                return True
-        # No commands were ran, so return false (we didn't run a command)
-        return False
+        except Exception as e:
+            if isinstance(e, CommandOnCooldown):
+                logger.debug(str(e))
+            else:
+                logger.exception(e)
+            if metrics is not None:
+                metrics.inc(
+                    "corvy_commands_total",
+                    labels=labels + (("outcome", _command_outcome(e)),),
+                )
+            await self._dispatch_event(Event.ON_COMMAND_EXCEPTION, prefix, message, e)
+            return True  # a command did run, it just errored
+
+        if metrics is not None:
+            metrics.inc("corvy_commands_total", labels=labels + (("outcome", "ok"),))
+        # Send the response
+        reply = await message.nest.send(response_content, SendPriority.REPLY)
+        reply.add_done_callback(functools.partial(_log_undelivered_reply, prefix))
+
+        return True
+
+    async def _run_handler(
+        self, prefix: str, spec: CommandSpec, handler: Callable, args: list
+    ):
+        timeout = spec.timeout
+        if spec.execution == "async":
+            if self.loop_lag is None:
+                call = handler(*args)
+            else:
+                call = self._tracked(handler, args)
+        else:
+            if timeout is None:
+                timeout = self.executor_timeout
+            # On timeout the call is cancelled if it hasn't started yet. A running
+            # thread or process can't be interrupted, it's just no longer waited on.
+            call = asyncio.get_running_loop().run_in_executor(
+                self._get_executor(spec.execution), functools.partial(handler, *args)
+            )
+        if timeout is not None:
+            call = asyncio.wait_for(call, timeout)
+        if self.profiler is not None:
+            call = self.profiler.run(
+                "command", prefix, args, call, capture=spec.execution == "async"
+            )
+        started = time.perf_counter()
+        try:
+            return await call
+        except asyncio.TimeoutError as e:
+            # Timeouts raised by the handler itself, e.g. waiting for a reply, pass through
+            if timeout is None or time.perf_counter() - started < timeout:
+                raise
+            raise CommandTimeoutError(prefix, timeout) from e
+        finally:
+            if self.metrics is not None:
+                self.metrics.observe(
+                    "corvy_command_seconds",
+                    time.perf_counter() - started,
+                    (("command", prefix),),
+                )
+
+    async def _tracked(self, handler: Callable, args: list):
+        name = getattr(handler, "__name__", repr(handler))
+        self.loop_lag.enter(name)
+        try:
+            return await handler(*args)
+        finally:
+            self.loop_lag.exit(name)
+
+    def _get_executor(self, execution: str) -> Executor:
+        executor = self._executors.get(execution)
+        if executor is None:
+            size = self.executor_sizes[execution]
+            if execution == "process":
+                executor = ProcessPoolExecutor(size)
+            else:
+                executor = ThreadPoolExecutor(size, thread_name_prefix="corvy_command")
+            self._executors[execution] = executor
+        return executor
 
     async def send_message(self, flock_id: int, nest_id: int, content: str):
         """Use nest.send() instead. Deprecated"""
         try:
             logger.debug(f'Sending message: "{content}"')
 
-            async with self.connection_state.client_session.post(
-                f"{self.api_path}/flocks/{flock_id}/nests/{nest_id}/messages",
-                json={"content": content},
-            ) as response:
-                response.raise_for_status()
+            async def _post(content: str):
+                started = time.perf_counter()
+                try:
+                    async with self.connection_state.client_session.post(
+                        f"{self.api_path}/flocks/{flock_id}/nests/{nest_id}/messages",
+                        json={"content": content},
+                    ) as response:
+                        response.raise_for_status()
+                finally:
+                    if self.metrics is not None:
+                        self.metrics.observe(
+                            "corvy_rest_request_seconds",
+                            time.perf_counter() - started,
+                            (
+                                ("method", "POST"),
+                                (
+                                    "endpoint",
+                                    f"{self.api_path}/flocks/:id/nests/:id/messages",
+                                ),
+                            ),
+                        )
+
+            if self.send_scheduler is None:
+                await _post(content)
+            else:
+                await self.send_scheduler.submit(
+                    nest_id, content, _post, coalescible=False
+                )
 
         except Exception as e:
             logger.exception(f"Failed to send message: {str(e)}")
@@ -353,6 +843,14 @@ class CorvyBot:
         """Get all flocks your bot is in."""
         return await Flock._get_all(self.connection_state)
 
+    async def get_topology(self, concurrency: int = 8) -> Topology:
+        """Get every flock your bot is in along with all of their nests.
+
+        Args:
+            concurrency: How many flocks to fetch nests for at once.
+        """
+        return await Topology._discover(self.connection_state, concurrency)
+
     def _handle_shutdown_stub(self, sig, frame):
         try:
             loop = asyncio.get_running_loop()
@@ -363,6 +861,18 @@ class CorvyBot:
     async def _handle_shutdown(self, sig, frame):
         """Handle graceful shutdown"""
         logger.info("Bot shutting down...")
+        if self.worker_pool is not None:
+            await self.worker_pool.stop()
+        if self.send_scheduler is not None:
+            await self.send_scheduler.stop()
+        if self.store is not None:
+            await self.store.close()
+        if self.loop_lag is not None:
+            await self.loop_lag.stop()
+        if self.metrics is not None:
+            await self.metrics.close()
+        for executor in self._executors.values():
+            executor.shutdown(wait=False, cancel_futures=True)
         await self.connection_state.client_session.close()
         await self.connection_state.websocket.close(1000, "Bot shutting down")
         try:
@@ -370,3 +880,17 @@ class CorvyBot:
         except RuntimeError:
             pass
         sys.exit(0)
+
+
+def _log_undelivered_reply(prefix: str, reply: asyncio.Future):
+    # Nothing else awaits a command's reply, so a rejected or lost one would go unnoticed
+    if not reply.cancelled() and reply.exception() is not None:
+        logger.warning(f"Reply to {prefix} wasn't delivered: {reply.exception()}")
+
+
+def _command_outcome(error: Exception) -> str:
+    if isinstance(error, CommandTimeoutError):
+        return "timeout"
+    if isinstance(error, CommandOnCooldown):
+        return "cooldown"
+    return "error"
@@ -0,0 +1,377 @@
+from __future__ import annotations
+import asyncio
+from collections.abc import MutableMapping, MutableSequence
+from dataclasses import dataclass
+from enum import Enum
+import itertools
+import re
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Iterable
+from .default_logger import get_pretty_logger
+
+if TYPE_CHECKING:
+    from .messages import Message
+
+logger = get_pretty_logger("corvy_sdk")
+
+
+class Event(str, Enum):
+    """The events a bot dispatches. Plain strings work anywhere these do."""
+
+    PRESTART = "prestart"
+    START = "start"
+    ON_MESSAGE_RAW = "on_message_raw"
+    ON_MESSAGE = "on_message"
+    ON_COMMAND_EXCEPTION = "on_command_exception"
+    ON_EVENT_EXCEPTION = "on_event_exception"
+    ON_SLOW_HANDLER = "on_slow_handler"
+
+    def __str__(self) -> str:
+        return self.value
+
+    # Hash like the plain string, so either can be used to look listeners up
+    __hash__ = str.__hash__
+
+
+# Where the Message is in each event's arguments, for events that can be filtered
+MESSAGE_ARGUMENT = {
+    Event.ON_MESSAGE_RAW: 0,
+    Event.ON_MESSAGE: 0,
+    Event.ON_COMMAND_EXCEPTION: 1,
+}
+
+
+def _id_set(ids: int | Iterable[int] | None) -> frozenset[int] | None:
+    if ids is None:
+        return None
+    if isinstance(ids, int):
+        return frozenset((ids,))
+    return frozenset(ids)
+
+
+@dataclass(slots=True)
+class MessageFilter:
+    """Conditions a message has to meet for a listener to be called. None matches anything."""
+
+    nest_ids: frozenset[int] | None = None
+    flock_ids: frozenset[int] | None = None
+    user_ids: frozenset[int] | None = None
+    prefix: str | None = None
+    pattern: re.Pattern | None = None
+
+    @classmethod
+    def build(
+        cls,
+        nests: int | Iterable[int] | None = None,
+        flocks: int | Iterable[int] | None = None,
+        users: int | Iterable[int] | None = None,
+        prefix: str | None = None,
+        pattern: str | re.Pattern | None = None,
+    ) -> MessageFilter | None:
+        """Build a filter, or return None if there's nothing to filter on."""
+        if nests is flocks is users is prefix is pattern is None:
+            return None
+        return cls(
+            _id_set(nests),
+            _id_set(flocks),
+            _id_set(users),
+            prefix,
+            re.compile(pattern) if isinstance(pattern, str) else pattern,
+        )
+
+    def matches(self, message: Message) -> bool:
+        if self.nest_ids is not None and message.nest.id not in self.nest_ids:
+            return False
+        if self.flock_ids is not None and message.flock.id not in self.flock_ids:
+            return False
+        if self.user_ids is not None and message.user.id not in self.user_ids:
+            return False
+        if self.prefix is not None and not message.content.startswith(self.prefix):
+            return False
+        if self.pattern is not None and self.pattern.search(message.content) is None:
+            return False
+        return True
+
+
+@dataclass(slots=True)
+class Listener:
+    func: Callable[..., Awaitable]
+    ordered: bool = False
+    filter: MessageFilter | None = None
+    order: int = 0  # Registration order
+
+    @property
+    def name(self) -> str:
+        return getattr(self.func, "__name__", repr(self.func))
+
+
+class FilterIndex:
+    """
+    Filtered listeners of one event, indexed by the ids they filter on.
+
+    Each listener is filed under one id it requires (its nest ids if it has any,
+    then user ids, then flock ids), so a message only has its filters checked
+    against the listeners filed under its own nest, user and flock, plus those
+    filtering on content alone.
+    """
+
+    def __init__(self):
+        self.by_nest: dict[int, list[Listener]] = {}
+        self.by_user: dict[int, list[Listener]] = {}
+        self.by_flock: dict[int, list[Listener]] = {}
+        self.unindexed: list[Listener] = []
+
+    def __len__(self) -> int:
+        return len(self.listeners())
+
+    def listeners(self) -> list[Listener]:
+        found = {id(l): l for l in self.unindexed}
+        for table in (self.by_nest, self.by_user, self.by_flock):
+            for listeners in table.values():
+                found.update((id(l), l) for l in listeners)
+        return list(found.values())
+
+    def add(self, listener: Listener):
+        f = listener.filter
+        for ids, table in (
+            (f.nest_ids, self.by_nest),
+            (f.user_ids, self.by_user),
+            (f.flock_ids, self.by_flock),
+        ):
+            if ids is not None:
+                for key in ids:
+                    table.setdefault(key, []).append(listener)
+                return
+        self.unindexed.append(listener)
+
+    def remove(self, func: Callable[..., Awaitable]):
+        self.unindexed = [l for l in self.unindexed if l.func is not func]
+        for table in (self.by_nest, self.by_user, self.by_flock):
+            for key in list(table):
+                table[key] = [l for l in table[key] if l.func is not func]
+                if not table[key]:
+                    del table[key]
+
+    def match(self, message: Message) -> list[Listener]:
+        """Find the listeners whose filters match a message."""
+        candidates = self.unindexed
+        for table, key in (
+            (self.by_nest, message.nest.id),
+            (self.by_user, message.user.id),
+            (self.by_flock, message.flock.id),
+        ):
+            found = table.get(key)
+            if found:
+                candidates = candidates + found
+        return [l for l in candidates if l.filter.matches(message)]
+
+
+# Wraps a single listener call, e.g. to time it: (event, listener, args) -> awaitable
+ListenerRunner = Callable[[str, Listener, tuple], Awaitable]
+
+
+class ListenerList(MutableSequence):
+    """
+    A live list of the functions listening to one event.
+
+    This is what `bot.events[event]` used to be, so appending to it or removing
+    from it still registers and unregisters listeners. Functions added this way
+    are plain concurrent listeners; ones already registered keep their options.
+    """
+
+    def __init__(self, bus: EventBus, event: str):
+        self._bus = bus
+        self._event = event
+
+    def _funcs(self) -> list[Callable[..., Awaitable]]:
+        return [listener.func for listener in self._bus._listeners.get(self._event, ())]
+
+    def __getitem__(self, index):
+        return self._funcs()[index]
+
+    def __len__(self) -> int:
+        return len(self._bus._listeners.get(self._event, ()))
+
+    def __setitem__(self, index, func):
+        funcs = self._funcs()
+        funcs[index] = func
+        self._bus[self._event] = funcs
+
+    def __delitem__(self, index):
+        funcs = self._funcs()
+        del funcs[index]
+        self._bus[self._event] = funcs
+
+    def insert(self, index: int, func: Callable[..., Awaitable]):
+        funcs = self._funcs()
+        funcs.insert(index, func)
+        self._bus[self._event] = funcs
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (list, ListenerList)):
+            return self._funcs() == list(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return repr(self._funcs())
+
+
+class EventBus(MutableMapping):
+    """
+    Event listeners, and the dispatcher that runs them.
+
+    Ordered listeners run one at a time in the order they were registered, then
+    the others all run concurrently. A listener that raises doesn't stop the rest:
+    the error is logged and passed to `on_error`. Events with no listeners return
+    without creating any coroutines, and listeners with a MessageFilter are kept
+    in a FilterIndex so only the ones matching a message are called.
+
+    It's also a mapping of event name to a live list of listening functions, like
+    the plain dict bots used to keep in `bot.events`.
+    """
+
+    def __init__(
+        self, on_error: Callable[[str, Listener, Exception], Any] | None = None
+    ):
+        self.on_error = on_error
+        self._listeners: dict[str, list[Listener]] = {}
+        self._ordered: dict[str, list[Listener]] = {}
+        self._concurrent: dict[str, list[Listener]] = {}
+        self._filtered: dict[str, FilterIndex] = {}
+        self._order = itertools.count()
+
+    def __contains__(self, event: object) -> bool:
+        return event in self._listeners
+
+    def __getitem__(self, event: str) -> ListenerList:
+        event = str(event)
+        if event not in self._listeners:
+            raise KeyError(event)
+        return ListenerList(self, event)
+
+    def __setitem__(self, event: str, funcs: Iterable[Callable[..., Awaitable]]):
+        """Replace an event's listeners. Functions already listening keep their options."""
+        event = str(event)
+        funcs = list(funcs)
+        existing: dict[int, Listener] = {}
+        for listener in self._listeners.get(event, ()):
+            existing.setdefault(id(listener.func), listener)
+        self._clear(event)
+        # Like a dict, the event stays a key even with no listeners, so it can be appended to
+        self._listeners[event] = []
+        for func in funcs:
+            listener = existing.get(id(func))
+            if listener is None:
+                self.add(event, func)
+            else:
+                self.add(event, func, listener.ordered, listener.filter)
+
+    def __delitem__(self, event: str):
+        event = str(event)
+        if event not in self._listeners:
+            raise KeyError(event)
+        self._clear(event)
+
+    def __iter__(self):
+        return iter(self._listeners)
+
+    def __len__(self) -> int:
+        return len(self._listeners)
+
+    def setdefault(self, event: str, default: Iterable = ()) -> ListenerList:
+        if event not in self:
+            self[event] = default
+        return ListenerList(self, str(event))
+
+    def _clear(self, event: str):
+        for table in (self._listeners, self._ordered, self._concurrent):
+            table.pop(event, None)
+        self._filtered.pop(event, None)
+
+    def add(
+        self,
+        event: str,
+        func: Callable[..., Awaitable],
+        ordered: bool = False,
+        message_filter: MessageFilter | None = None,
+    ) -> Listener:
+        """Register a listener for an event."""
+        event = str(event)
+        if message_filter is not None and event not in MESSAGE_ARGUMENT:
+            raise ValueError(f"The {event} event has no message to filter on")
+        listener = Listener(func, ordered, message_filter, next(self._order))
+        self._listeners.setdefault(event, []).append(listener)
+        if message_filter is not None:
+            self._filtered.setdefault(event, FilterIndex()).add(listener)
+        else:
+            target = self._ordered if ordered else self._concurrent
+            target.setdefault(event, []).append(listener)
+        return listener
+
+    def remove(self, event: str, func: Callable[..., Awaitable]):
+        """Unregister every listener for an event that calls `func`."""
+        event = str(event)
+        for table in (self._listeners, self._ordered, self._concurrent):
+            listeners = [l for l in table.get(event, []) if l.func is not func]
+            if listeners:
+                table[event] = listeners
+            else:
+                table.pop(event, None)
+        index = self._filtered.get(event)
+        if index is not None:
+            index.remove(func)
+            if not len(index):
+                del self._filtered[event]
+
+    def get(self, event: str, default: Any = None) -> ListenerList | Any:
+        """Get the functions listening to an event."""
+        if event not in self._listeners:
+            return default
+        return ListenerList(self, str(event))
+
+    async def dispatch(
+        self, event: str, args: tuple, runner: ListenerRunner | None = None
+    ):
+        """Run an event's listeners with `args`, and wait for all of them to finish."""
+        if event not in self._listeners:
+            return
+        ordered = self._ordered.get(event, ())
+        concurrent = self._concurrent.get(event)
+        index = self._filtered.get(event)
+        if index is not None:
+            matched = index.match(args[MESSAGE_ARGUMENT[event]])
+            if matched:
+                if any(l.ordered for l in matched):
+                    ordered = sorted(
+                        [*ordered, *(l for l in matched if l.ordered)],
+                        key=lambda l: l.order,
+                    )
+                concurrent = [
+                    *(concurrent or ()),
+                    *(l for l in matched if not l.ordered),
+                ]
+        for listener in ordered:
+            await self._run(event, listener, args, runner)
+        if not concurrent:
+            return
+        if len(concurrent) == 1:
+            await self._run(event, concurrent[0], args, runner)
+        else:
+            await asyncio.gather(
+                *(self._run(event, listener, args, runner) for listener in concurrent)
+            )
+
+    async def _run(
+        self, event: str, listener: Listener, args: tuple, runner: ListenerRunner | None
+    ):
+        try:
+            if runner is None:
+                await listener.func(*args)
+            else:
+                await runner(event, listener, args)
+        except Exception as e:
+            logger.exception(f"Error in {event} listener {listener.name}: {str(e)}")
+            if self.on_error is not None:
+                try:
+                    await self.on_error(event, listener, e)
+                except Exception as e:
+                    logger.exception(f"Error handling an event error: {str(e)}")
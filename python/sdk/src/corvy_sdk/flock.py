@@ -1,17 +1,21 @@
 # flock.py
 from __future__ import annotations
-from dataclasses import dataclass
-from datetime import datetime, timezone
+from dataclasses import dataclass, field
+from datetime import datetime
 from typing import TYPE_CHECKING
 from .state import ConnectionState
+from .timestamps import parse_timestamp
 
 if TYPE_CHECKING:
     from .nest import Nest
 
 
-@dataclass
+@dataclass(slots=True)
 class PartialFlock:
     id: int
+    _connection_state: ConnectionState | None = field(
+        default=None, init=False, repr=False, compare=False
+    )
 
     def attach_state(self, state: ConnectionState) -> PartialFlock:
         self._connection_state = state
@@ -21,11 +25,13 @@ class PartialFlock:
         """
         Fetch a complete Flock from a PartialFlock.
         """
+        cache = self._connection_state.cache
+        if (cached := cache.flocks.get(self.id)) is not None:
+            return cached
         url = f"{self._connection_state.api_path}/flocks/{self.id}"
-        async with self._connection_state.client_session.get(url) as resp:
-            data = await resp.json()
-            if not data.get("success", False):
-                raise ValueError(data.get("error", data))
+        data = await self._connection_state.get_json(url)
+        if not data.get("success", False):
+            raise ValueError(data.get("error", data))
 
         f = data["flock"]
 
@@ -35,21 +41,19 @@ class PartialFlock:
             f.get("icon"),
             f["members_count"],
             f["nests_count"],
-            datetime.strptime(f["created_at"], "%Y-%m-%dT%H:%M:%SZ").replace(
-                tzinfo=timezone.utc
-            ),
+            parse_timestamp(f["created_at"]),
         )
 
         flock.attach_state(self._connection_state)
+        self._connection_state.remember_flock(flock)
         return flock
 
     async def get_nests(self) -> list["Nest"]:
         """Get all nests in this flock."""
         url = f"{self._connection_state.api_path}/flocks/{self.id}/nests"
-        async with self._connection_state.client_session.get(url) as resp:
-            data = await resp.json()
-            if not data.get("success", False):
-                raise ValueError(data.get("error", data))
+        data = await self._connection_state.get_json(url)
+        if not data.get("success", False):
+            raise ValueError(data.get("error", data))
 
         from .nest import Nest
 
@@ -60,19 +64,18 @@ class PartialFlock:
                 self,
                 n["name"],
                 n["position"],
-                datetime.strptime(n["created_at"], "%Y-%m-%dT%H:%M:%SZ").replace(
-                    tzinfo=timezone.utc
-                ),
+                parse_timestamp(n["created_at"]),
             )
-            if hasattr(self, "_connection_state"):
+            if self._connection_state is not None:
                 nest.attach_state(self._connection_state)
+                self._connection_state.remember_nest(nest)
             nests.append(nest)
 
         nests.sort(key=lambda x: x.id)
         return nests
 
 
-@dataclass
+@dataclass(slots=True)
 class Flock(PartialFlock):
     name: str
     icon: str | None
@@ -83,25 +86,22 @@ class Flock(PartialFlock):
     @staticmethod
     async def _get_all(state: ConnectionState) -> list[Flock]:
         url = f"{state.api_path}/flocks"
-        async with state.client_session.get(url) as resp:
-            data = await resp.json()
-            if not data.get("success", False):
-                raise ValueError(data.get("error", data))
+        data = await state.get_json(url)
+        if not data.get("success", False):
+            raise ValueError(data.get("error", data))
 
         flocks: list[Flock] = []
         for f in data["flocks"]:
-            print(f)
             flock = Flock(
                 f["id"],
                 f["name"],
                 f.get("icon"),
                 f["members_count"],
                 f["nests_count"],
-                datetime.strptime(f["created_at"], "%Y-%m-%dT%H:%M:%SZ").replace(
-                    tzinfo=timezone.utc
-                ),
+                parse_timestamp(f["created_at"]),
             )
             flock.attach_state(state)
+            state.remember_flock(flock)
             flocks.append(flock)
 
         # sort by id ascending
@@ -0,0 +1,94 @@
+import bisect
+import random
+from .replies import ReplyTracker
+
+DEFAULT_RTT_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """A fixed-bucket histogram, cumulative like Prometheus' when exported."""
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_RTT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # The last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def snapshot(self) -> dict:
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            cumulative += count
+            buckets[bound] = cumulative
+        return {"count": self.count, "sum": self.sum, "buckets": buckets}
+
+
+class ConnectionHealth:
+    """
+    Tracks heartbeat round trips and reconnects for the websocket.
+
+    Heartbeats are correlated with their `phx_reply` through their own
+    ReplyTracker. After `max_missed` heartbeats in a row go unanswered the
+    connection is considered dead. Reconnects are spaced out with exponential
+    backoff and full jitter, so many bots dropped at once don't retry in lockstep.
+    """
+
+    def __init__(
+        self,
+        heartbeat_interval: float = 30,
+        heartbeat_timeout: float = 10,
+        max_missed: int = 2,
+        backoff_base: float = 1,
+        backoff_max: float = 60,
+    ):
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self.max_missed = max_missed
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.heartbeats = ReplyTracker(heartbeat_timeout)
+        self.rtt = Histogram()
+        self.last_rtt: float | None = None
+        self.missed = 0
+        self.total_missed = 0
+        self.reconnects = 0
+        self.failed_reconnects = 0
+        self.last_reconnect_duration: float | None = None
+
+    @property
+    def dead(self) -> bool:
+        return self.missed >= self.max_missed
+
+    def heartbeat_replied(self, rtt: float):
+        self.last_rtt = rtt
+        self.rtt.observe(rtt)
+        self.missed = 0
+
+    def heartbeat_missed(self):
+        self.missed += 1
+        self.total_missed += 1
+
+    def backoff(self, attempt: int) -> float:
+        """Seconds to wait before reconnect attempt number `attempt` (starting at 0)."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+
+    def reconnected(self, duration: float):
+        self.reconnects += 1
+        self.last_reconnect_duration = duration
+        self.missed = 0
+
+    def stats(self) -> dict:
+        """Get heartbeat RTTs (in seconds), missed heartbeats and reconnect counts."""
+        return {
+            "rtt": self.rtt.snapshot(),
+            "last_rtt": self.last_rtt,
+            "missed_heartbeats": self.total_missed,
+            "reconnects": self.reconnects,
+            "failed_reconnects": self.failed_reconnects,
+            "last_reconnect_duration": self.last_reconnect_duration,
+        }
@@ -0,0 +1,80 @@
+import asyncio
+from collections import Counter
+import time
+from .default_logger import get_pretty_logger
+from .health import Histogram
+
+logger = get_pretty_logger("corvy_sdk")
+
+DEFAULT_LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+
+
+class LoopLagMonitor:
+    """
+    Measures how late the event loop wakes up from a periodic sleep.
+
+    Anything that blocks the loop (a synchronous call in an async handler, heavy
+    parsing, a CPU-bound loop) delays every other task, including the websocket
+    receive loop and heartbeats, and shows up here as lag. When the lag passes
+    `threshold`, a warning names the commands that ran since the last measurement, so
+    the handler that blocked can be found and moved to thread or process execution.
+    """
+
+    def __init__(self, interval: float = 0.5, threshold: float = 0.1):
+        self.interval = interval
+        self.threshold = threshold
+        self.lag = Histogram(DEFAULT_LAG_BUCKETS)
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.stalls = 0
+        self.running: Counter[str] = Counter()
+        self._ran: set[str] = set()  # Commands that ran since the last measurement
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._monitor())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def enter(self, name: str):
+        """Note that a command started running on the loop."""
+        self.running[name] += 1
+        self._ran.add(name)
+
+    def exit(self, name: str):
+        """Note that a command finished running on the loop."""
+        self.running[name] -= 1
+        if self.running[name] <= 0:
+            del self.running[name]
+
+    def stats(self) -> dict:
+        """Get the event loop lag (in seconds) and how often it passed the threshold."""
+        return {
+            "lag": self.lag.snapshot(),
+            "last_lag": self.last_lag,
+            "max_lag": self.max_lag,
+            "stalls": self.stalls,
+        }
+
+    def _observe(self, lag: float):
+        self.last_lag = lag
+        self.max_lag = max(self.max_lag, lag)
+        self.lag.observe(lag)
+        if lag >= self.threshold:
+            self.stalls += 1
+            suspects = ", ".join(sorted(self._ran)) or "no commands"
+            logger.warning(
+                f"Event loop was blocked for {lag:.3f}s (commands running: {suspects})."
+            )
+        self._ran = set(self.running)
+
+    async def _monitor(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            self._observe(max(0.0, time.monotonic() - expected))
@@ -1,27 +1,146 @@
 from dataclasses import dataclass
-import datetime
+from datetime import datetime
+from typing import Any
 
 from .state import ConnectionState
+from .timestamps import parse_timestamp
 from .nest import PartialNest
 from .flock import PartialFlock
 from .user import PartialUser
 
 
-@dataclass
+@dataclass(slots=True)
 class MessageUser(PartialUser):
     is_bot: bool
     avatar_url: str | None
 
 
-@dataclass
 class Message:
-    id: int
-    content: str
-    flock: PartialFlock
-    nest: PartialNest
-    created_at: datetime
-    user: MessageUser
+    """
+    A message in a nest.
+
+    Messages are created for every frame the bot receives, so they're slotted and
+    `created_at` is only parsed the first time it's read. They don't hold a
+    connection state of their own, but use the one of their (shared) nest.
+    """
+
+    __slots__ = (
+        "id",
+        "content",
+        "flock",
+        "nest",
+        "_created_at",
+        "user",
+    )
+
+    def __init__(
+        self,
+        id: int,
+        content: str,
+        flock: PartialFlock,
+        nest: PartialNest,
+        created_at: datetime | str,
+        user: MessageUser,
+    ):
+        self.id = id
+        self.content = content
+        self.flock = flock
+        self.nest = nest
+        self._created_at = created_at  # A raw timestamp until it's first read
+        self.user = user
+
+    @property
+    def created_at(self) -> datetime:
+        created_at = self._created_at
+        if isinstance(created_at, str):
+            created_at = self._created_at = parse_timestamp(created_at)
+        return created_at
+
+    @created_at.setter
+    def created_at(self, value: datetime | str):
+        self._created_at = value
+
+    @property
+    def _connection_state(self) -> ConnectionState | None:
+        return self.nest._connection_state
+
+    def __repr__(self) -> str:
+        return (
+            f"Message(id={self.id!r}, content={self.content!r}, flock={self.flock!r}, "
+            f"nest={self.nest!r}, created_at={self.created_at!r}, user={self.user!r})"
+        )
+
+    def __eq__(self, other: object) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return (
+            self.id,
+            self.content,
+            self.flock,
+            self.nest,
+            self.created_at,
+            self.user,
+        ) == (
+            other.id,
+            other.content,
+            other.flock,
+            other.nest,
+            other.created_at,
+            other.user,
+        )
+
+    __hash__ = None
 
     def attach_state(self, state: ConnectionState):
-        self._connection_state = state
+        if self.nest._connection_state is None:
+            self.nest.attach_state(state)
         return self
+
+
+def decode_message(
+    data: dict[str, Any],
+    state: ConnectionState,
+    flock: PartialFlock | None = None,
+    nest: PartialNest | None = None,
+) -> Message:
+    """Build a Message straight from its API/websocket payload.
+
+    The user, flock and nest are taken from the connection's entity cache when
+    they've been seen before, so most messages only allocate the Message itself.
+
+    Args:
+        data: The message payload.
+        state: The connection state to attach.
+        flock: The message's flock, if the caller already has it.
+        nest: The message's nest, if the caller already has it.
+    """
+    cache = state.cache
+    user_data = data["user"]
+    user = cache.message_users.get(user_data["id"])
+    avatar_url = user_data.get("photo_url", None)
+    if (
+        user is None
+        or user.username != user_data["username"]
+        or user.is_bot != user_data["is_bot"]
+        or user.avatar_url != avatar_url
+    ):
+        user = MessageUser(
+            user_data["id"], user_data["username"], user_data["is_bot"], avatar_url
+        ).attach_state(state)
+        cache.message_users.set(user.id, user)
+
+    if flock is None:
+        flock = cache.partial_flocks.get(data["flock_id"])
+        if flock is None:
+            flock = PartialFlock(data["flock_id"]).attach_state(state)
+            cache.partial_flocks.set(flock.id, flock)
+
+    if nest is None:
+        nest = cache.partial_nests.get(data["nest_id"])
+        if nest is None or nest.flock is not flock:
+            nest = PartialNest(data["nest_id"], flock).attach_state(state)
+            cache.partial_nests.set(nest.id, nest)
+
+    if nest._connection_state is None:
+        nest.attach_state(state)
+    return Message(data["id"], data["content"], flock, nest, data["created_at"], user)
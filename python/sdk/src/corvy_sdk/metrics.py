@@ -0,0 +1,172 @@
+import re
+from typing import Any, Protocol
+from aiohttp import web
+from .default_logger import get_pretty_logger
+from .health import Histogram
+
+logger = get_pretty_logger("corvy_sdk")
+
+LATENCY_BUCKETS = (
+    0.0001,
+    0.0005,
+    0.001,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    10.0,
+)
+
+Labels = tuple[tuple[str, str], ...]
+
+_ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+
+def endpoint_label(url: str) -> str:
+    """Turn a REST path into a low-cardinality label, e.g. /flocks/:id/nests."""
+    return _ID_SEGMENT.sub("/:id", url)
+
+
+class MetricsSink(Protocol):
+    """Receives every counter increment and histogram observation as it happens."""
+
+    def inc(self, name: str, value: float, labels: Labels): ...
+
+    def observe(self, name: str, value: float, labels: Labels): ...
+
+
+class Metrics:
+    """
+    Counters and latency histograms for the message pipeline.
+
+    Values are aggregated in memory (see `snapshot` and `render_prometheus`) and
+    also forwarded to any extra sinks, like OpenTelemetrySink. Recording is a dict
+    lookup and a few additions, cheap enough to leave on in production.
+    """
+
+    def __init__(self, sinks: list[MetricsSink] | None = None):
+        self.sinks = list(sinks or [])
+        self.counters: dict[tuple[str, Labels], float] = {}
+        self.histograms: dict[tuple[str, Labels], Histogram] = {}
+        self._runner: web.AppRunner | None = None
+
+    def inc(self, name: str, value: float = 1, labels: Labels = ()):
+        key = (name, labels)
+        self.counters[key] = self.counters.get(key, 0) + value
+        for sink in self.sinks:
+            sink.inc(name, value, labels)
+
+    def observe(self, name: str, value: float, labels: Labels = ()):
+        key = (name, labels)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram(LATENCY_BUCKETS)
+        histogram.observe(value)
+        for sink in self.sinks:
+            sink.observe(name, value, labels)
+
+    def snapshot(self) -> dict[str, Any]:
+        """Get every counter and histogram, keyed by name and then by labels."""
+        counters: dict[str, dict[Labels, float]] = {}
+        for (name, labels), value in self.counters.items():
+            counters.setdefault(name, {})[labels] = value
+        histograms: dict[str, dict[Labels, dict]] = {}
+        for (name, labels), histogram in self.histograms.items():
+            histograms.setdefault(name, {})[labels] = histogram.snapshot()
+        return {"counters": counters, "histograms": histograms}
+
+    def render_prometheus(self) -> str:
+        """Render the metrics in the Prometheus text exposition format."""
+        lines = []
+        typed = set()
+        for (name, labels), value in sorted(self.counters.items()):
+            if name not in typed:
+                lines.append(f"# TYPE {name} counter")
+                typed.add(name)
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+        for (name, labels), histogram in sorted(
+            self.histograms.items(), key=lambda item: item[0]
+        ):
+            if name not in typed:
+                lines.append(f"# TYPE {name} histogram")
+                typed.add(name)
+            snapshot = histogram.snapshot()
+            for bound, count in snapshot["buckets"].items():
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(
+                    f"{name}_bucket{_format_labels(labels + (('le', le),))} {count}"
+                )
+            lines.append(f"{name}_sum{_format_labels(labels)} {snapshot['sum']}")
+            lines.append(f"{name}_count{_format_labels(labels)} {snapshot['count']}")
+        return "\n".join(lines) + "\n"
+
+    async def serve_prometheus(self, port: int, host: str = "127.0.0.1"):
+        """Serve the metrics at http://host:port/metrics for Prometheus to scrape."""
+
+        async def _handle(request: web.Request) -> web.Response:
+            return web.Response(
+                text=self.render_prometheus(),
+                content_type="text/plain",
+                charset="utf-8",
+            )
+
+        app = web.Application()
+        app.router.add_get("/metrics", _handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        logger.info(f"Serving metrics on http://{host}:{port}/metrics")
+
+    async def close(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        (key, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for key, value in labels
+    )
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+
+class OpenTelemetrySink:
+    """
+    Forwards metrics to OpenTelemetry, as counters and histograms on a meter.
+
+    Needs the `opentelemetry-api` package, plus an SDK configured by the
+    application to actually export anything.
+    """
+
+    def __init__(self, meter: Any = None):
+        try:
+            from opentelemetry import metrics as otel_metrics
+        except ImportError as e:
+            raise ImportError(
+                "OpenTelemetrySink needs opentelemetry-api: pip install corvy_sdk[otel]"
+            ) from e
+        self.meter = meter or otel_metrics.get_meter("corvy_sdk")
+        self._counters: dict[str, Any] = {}
+        self._histograms: dict[str, Any] = {}
+
+    def inc(self, name: str, value: float, labels: Labels):
+        counter = self._counters.get(name)
+        if counter is None:
+            counter = self._counters[name] = self.meter.create_counter(name)
+        counter.add(value, dict(labels))
+
+    def observe(self, name: str, value: float, labels: Labels):
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            histogram = self._histograms[name] = self.meter.create_histogram(
+                name, unit="s"
+            )
+        histogram.record(value, dict(labels))
@@ -1,85 +1,185 @@
-from dataclasses import dataclass
-from datetime import datetime, timezone
-import json
-from typing import TYPE_CHECKING
+import asyncio
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import TYPE_CHECKING, AsyncIterator
 from .flock import PartialFlock
 from .state import ConnectionState
+from .timestamps import parse_timestamp
+from .outbound import SendPriority
 
 if TYPE_CHECKING:
     from .messages import Message
 
 
-@dataclass
+@dataclass(slots=True)
 class PartialNest:
     id: int
     flock: PartialFlock  # needed to fetch info
+    _connection_state: ConnectionState | None = field(
+        default=None, init=False, repr=False, compare=False
+    )
 
     def attach_state(self, state: ConnectionState):
         self._connection_state = state
         return self
 
     async def fetch(self) -> "Nest":
-        async with self._connection_state.client_session.get(
+        cache = self._connection_state.cache
+        if (cached := cache.nests.get(self.id)) is not None:
+            return cached
+        data = await self._connection_state.get_json(
             f"{self._connection_state.api_path}/flocks/{self.flock.id}/nests/{self.id}"
-        ) as response:
-            data = await response.json()
-            if err := data.get("error", False):
-                raise ValueError(err)
-            nest = Nest(
-                data["nest"]["id"],
-                self.flock,
-                data["nest"]["name"],
-                data["nest"]["position"],
-                datetime.strptime(
-                    data["nest"]["created_at"], "%Y-%m-%dT%H:%M:%SZ"
-                ).replace(tzinfo=timezone.utc),
-            )
-            if hasattr(self, "_connection_state"):
-                nest.attach_state(self._connection_state)
-            return nest
+        )
+        if err := data.get("error", False):
+            raise ValueError(err)
+        nest = Nest(
+            data["nest"]["id"],
+            self.flock,
+            data["nest"]["name"],
+            data["nest"]["position"],
+            parse_timestamp(data["nest"]["created_at"]),
+        )
+        if self._connection_state is not None:
+            nest.attach_state(self._connection_state)
+        self._connection_state.remember_nest(nest)
+        return nest
 
     async def get_messages(
         self, limit: int = 50, before_id: int | None = None
     ) -> list["Message"]:
+        from .messages import Message, decode_message
+
+        results: list[Message] = [
+            decode_message(item, self._connection_state, self.flock, self)
+            for item in await self._get_message_payloads(limit, before_id)
+        ]
+        results.sort(key=lambda m: m.id)
+
+        return results
+
+    async def _get_message_payloads(
+        self, limit: int = 50, before_id: int | None = None
+    ) -> list[dict]:
         params: dict[str, int] = {"limit": min(limit, 50)}
         if before_id is not None:
             params["before_id"] = before_id
 
         url = f"{self._connection_state.api_path}/flocks/{self.flock.id}/nests/{self.id}/messages"
 
-        async with self._connection_state.client_session.get(
-            url, params=params
-        ) as resp:
-            data = await resp.json()
-            if not data.get("success", False):
-                raise ValueError(data.get("error", data))
-
-        from .messages import Message, MessageUser
-
-        results: list[Message] = []
-        for item in data["messages"]:
-            u = item["user"]
-            user = MessageUser(u["id"], u["username"], u.get("photo_url"), u["is_bot"])
-            msg = Message(
-                item["id"],
-                item["content"],
-                self.flock,
-                self,
-                datetime.strptime(item["created_at"], "%Y-%m-%dT%H:%M:%SZ").replace(
-                    tzinfo=timezone.utc
-                ),
-                user,
-            )
-            if hasattr(self, "_connection_state"):
-                msg.attach_state(self._connection_state)
-            results.append(msg)
-        results.sort(key=lambda m: m.id)
+        data = await self._connection_state.get_json(url, params=params)
+        if not data.get("success", False):
+            raise ValueError(data.get("error", data))
+        return data["messages"]
 
-        return results
+    async def _get_payloads_after(self, after_id: int) -> list[dict]:
+        """Fetch the raw payloads of every message newer than `after_id`, oldest first."""
+        payloads: list[dict] = []
+        before_id = None
+        while True:
+            page = await self._get_message_payloads(50, before_id)
+            newer = [item for item in page if item["id"] > after_id]
+            for item in newer:
+                # Make them look like websocket payloads
+                item.setdefault("flock_id", self.flock.id)
+                item.setdefault("nest_id", self.id)
+            payloads.extend(newer)
+            if len(page) < 50 or len(newer) < len(page):
+                break
+            before_id = min(item["id"] for item in page)
+        payloads.sort(key=lambda item: item["id"])
+        return payloads
 
-    async def send(self, content: str):
-        await self._connection_state.websocket.send(
-            json.dumps(
+    async def history(
+        self,
+        limit: int | None = None,
+        before: int | None = None,
+        after: int | None = None,
+    ) -> AsyncIterator["Message"]:
+        """Iterate over the messages in this nest, newest first.
+
+        Pages are fetched with `get_messages`, and the next page is requested
+        while the current one is being consumed, so only about two pages are
+        held in memory at once.
+
+        Args:
+            limit: The most messages to yield. None walks the whole nest.
+            before: Only yield messages with an id lower than this.
+            after: Only yield messages with an id higher than this.
+        """
+        page_size = 50 if limit is None else min(50, limit)
+        if page_size <= 0:
+            return
+        remaining = limit
+        next_page = asyncio.ensure_future(self.get_messages(page_size, before))
+        try:
+            while next_page is not None:
+                page = await next_page
+                next_page = None
+                if not page:
+                    return
+                oldest = page[0].id
+                if len(page) >= page_size and (after is None or oldest > after):
+                    # Fetch the next page while this one is consumed
+                    next_page = asyncio.ensure_future(self.get_messages(50, oldest))
+                    page_size = 50
+                for message in reversed(page):
+                    if after is not None and message.id <= after:
+                        return
+                    yield message
+                    if remaining is not None:
+                        remaining -= 1
+                        if remaining <= 0:
+                            return
+        finally:
+            if next_page is not None:
+                next_page.cancel()
+
+    async def send(
+        self,
+        content: str,
+        priority: SendPriority = SendPriority.NORMAL,
+        wait: bool = False,
+        timeout: float | None = None,
+    ) -> "asyncio.Future[dict] | dict":
+        """Send a message to this nest.
+
+        If the bot paces outgoing messages, this waits until the message has actually been written.
+
+        Args:
+            content: The message to send.
+            priority: Which lane to queue the message in. Command replies use REPLY; use BULK for announcements.
+            wait: Wait for the server to acknowledge the message before returning.
+            timeout: Seconds to wait for the acknowledgement. Defaults to the bot's reply timeout.
+
+        Raises:
+            ValueError: If waiting and the server rejected the message.
+            TimeoutError: If waiting and the server didn't reply in time.
+
+        Returns:
+            The server's reply payload if waiting, otherwise a future that resolves to it.
+        """
+
+        async def _write(content: str) -> asyncio.Future:
+            return await self._write(content, timeout)
+
+        sender = self._connection_state.sender
+        if sender is None:
+            reply = await _write(content)
+        else:
+            reply = await sender.submit(self.id, content, _write, priority)
+        if wait:
+            # Shielded since a coalesced message shares its reply with others
+            return await asyncio.shield(reply)
+        return reply
+
+    async def _write(
+        self, content: str, timeout: float | None = None
+    ) -> asyncio.Future:
+        replies = self._connection_state.replies
+        ref = replies.next_ref()
+        reply = replies.expect(ref, timeout)
+        try:
+            await self._connection_state.send_frame(
                 {
                     "topic": self._connection_state.bot_channel,
                     "event": "send_message",
@@ -88,13 +188,16 @@ class PartialNest:
                         "nest_id": self.id,
                         "content": content,
                     },
-                    "ref": "_py_msg",
+                    "ref": ref,
                 }
             )
-        )
+        except BaseException:
+            replies.discard(ref)
+            raise
+        return reply
 
 
-@dataclass
+@dataclass(slots=True)
 class Nest(PartialNest):
     name: str
     position: int
@@ -0,0 +1,268 @@
+import asyncio
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from enum import IntEnum
+import time
+from typing import Awaitable, Callable
+
+
+class SendPriority(IntEnum):
+    """Lanes for outgoing messages. Lower values are sent first."""
+
+    REPLY = 0
+    NORMAL = 1
+    BULK = 2
+
+
+class TokenBucket:
+    """A token bucket allowing `rate` sends per second with bursts of up to `burst`."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until a token is available."""
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def full(self, now: float) -> bool:
+        """Whether the bucket has refilled completely, making it the same as a new one."""
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+    def consume(self, now: float):
+        self._refill(now)
+        self.tokens -= 1
+
+
+@dataclass
+class OutboundMessage:
+    nest_id: int
+    content: str
+    write: Callable[[str], Awaitable]
+    priority: SendPriority
+    future: asyncio.Future
+    coalescible: bool = True
+    enqueued_at: float = field(default_factory=time.monotonic)
+    order: int = 0
+
+
+class SendScheduler:
+    """
+    Paces outgoing messages with a global and a per-nest token bucket.
+
+    Messages wait in one lane per `SendPriority`, with a queue per nest in each
+    lane; the scheduler always sends the oldest message of the highest priority
+    lane whose nest isn't rate limited. When coalescing is enabled, consecutive
+    queued messages for the same nest and lane are joined with newlines into one
+    message, up to `coalesce_max_length`. Nest buckets that have refilled
+    completely are dropped, since they're no different from new ones.
+    """
+
+    def __init__(
+        self,
+        global_rate: float | None = None,
+        global_burst: int = 1,
+        nest_rate: float | None = None,
+        nest_burst: int = 1,
+        coalesce: bool = False,
+        coalesce_max_length: int = 2000,
+    ):
+        self.global_bucket = (
+            TokenBucket(global_rate, global_burst) if global_rate else None
+        )
+        self.nest_rate = nest_rate
+        self.nest_burst = nest_burst
+        self.coalesce = coalesce
+        self.coalesce_max_length = coalesce_max_length
+        self.sent = 0
+        self.coalesced = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self._nest_buckets: OrderedDict[int, TokenBucket] = OrderedDict()  # LRU
+        self._lanes: list[dict[int, deque[OutboundMessage]]] = [
+            {} for _ in SendPriority
+        ]
+        self._depth = 0
+        self._order = 0
+        self._in_flight: list[OutboundMessage] = []
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def depth(self) -> int:
+        """The number of messages waiting to be sent."""
+        return self._depth
+
+    def stats(self) -> dict[str, float]:
+        """Get the queue depth, send counts and send latency (in seconds)."""
+        return {
+            "depth": self.depth,
+            "sent": self.sent,
+            "coalesced": self.coalesced,
+            "avg_latency": self.total_latency / self.sent if self.sent else 0.0,
+            "max_latency": self.max_latency,
+        }
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop sending, cancelling the futures of every message that wasn't sent."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        pending = self._in_flight
+        for lane in self._lanes:
+            for queue in lane.values():
+                pending.extend(queue)
+            lane.clear()
+        for entry in pending:
+            entry.future.cancel()
+        self._in_flight = []
+        self._depth = 0
+
+    async def submit(
+        self,
+        nest_id: int,
+        content: str,
+        write: Callable[[str], Awaitable],
+        priority: SendPriority = SendPriority.NORMAL,
+        coalescible: bool = True,
+    ):
+        """Queue a message and wait until it has been written."""
+        future = asyncio.get_running_loop().create_future()
+        self._order += 1
+        lane = self._lanes[priority]
+        queue = lane.get(nest_id)
+        if queue is None:
+            queue = lane[nest_id] = deque()
+        queue.append(
+            OutboundMessage(
+                nest_id,
+                content,
+                write,
+                priority,
+                future,
+                coalescible,
+                order=self._order,
+            )
+        )
+        self._depth += 1
+        self._wakeup.set()
+        return await future
+
+    def _nest_bucket(self, nest_id: int) -> TokenBucket | None:
+        if not self.nest_rate:
+            return None
+        bucket = self._nest_buckets.get(nest_id)
+        if bucket is None:
+            self._evict_idle_buckets()
+            bucket = self._nest_buckets[nest_id] = TokenBucket(
+                self.nest_rate, self.nest_burst
+            )
+        else:
+            self._nest_buckets.move_to_end(nest_id)
+        return bucket
+
+    def _evict_idle_buckets(self):
+        now = time.monotonic()
+        while self._nest_buckets:
+            nest_id, bucket = next(iter(self._nest_buckets.items()))
+            if not bucket.full(now):
+                break
+            del self._nest_buckets[nest_id]
+
+    def _next_ready(self) -> tuple[OutboundMessage | None, float | None]:
+        """Find the next sendable message, or how long to wait for one."""
+        if not self.depth:
+            return None, None
+        now = time.monotonic()
+        if self.global_bucket is not None:
+            wait = self.global_bucket.wait_time(now)
+            if wait > 0:
+                return None, wait
+        shortest_wait: float | None = None
+        for lane in self._lanes:
+            # Only the head of each nest's queue can go next, to keep them in order
+            oldest: OutboundMessage | None = None
+            for nest_id, queue in lane.items():
+                entry = queue[0]
+                if oldest is not None and entry.order > oldest.order:
+                    continue
+                bucket = self._nest_bucket(nest_id)
+                wait = 0.0 if bucket is None else bucket.wait_time(now)
+                if wait == 0:
+                    oldest = entry
+                elif shortest_wait is None or wait < shortest_wait:
+                    shortest_wait = wait
+            if oldest is not None:
+                return oldest, None
+        return None, shortest_wait
+
+    def _take_batch(self, first: OutboundMessage) -> list[OutboundMessage]:
+        lane = self._lanes[first.priority]
+        queue = lane[first.nest_id]
+        queue.popleft()
+        batch = [first]
+        if self.coalesce and first.coalescible:
+            length = len(first.content)
+            while queue:
+                entry = queue[0]
+                length += len(entry.content) + 1
+                if not entry.coalescible or length > self.coalesce_max_length:
+                    break
+                batch.append(queue.popleft())
+        if not queue:
+            del lane[first.nest_id]
+        self._depth -= len(batch)
+        return batch
+
+    async def _run(self):
+        while True:
+            entry, wait = self._next_ready()
+            if entry is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            batch = self._in_flight = self._take_batch(entry)
+            now = time.monotonic()
+            if self.global_bucket is not None:
+                self.global_bucket.consume(now)
+            if (bucket := self._nest_bucket(entry.nest_id)) is not None:
+                bucket.consume(now)
+
+            try:
+                result = await entry.write("\n".join(e.content for e in batch))
+            except Exception as e:
+                self._in_flight = []
+                for queued in batch:
+                    if not queued.future.done():
+                        queued.future.set_exception(e)
+                continue
+            self._in_flight = []
+
+            done_at = time.monotonic()
+            self.sent += len(batch)
+            self.coalesced += len(batch) - 1
+            for queued in batch:
+                latency = done_at - queued.enqueued_at
+                self.total_latency += latency
+                self.max_latency = max(self.max_latency, latency)
+                if not queued.future.done():
+                    queued.future.set_result(result)
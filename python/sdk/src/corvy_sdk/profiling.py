@@ -0,0 +1,146 @@
+import cProfile
+from dataclasses import dataclass
+import heapq
+import itertools
+import os
+import pstats
+import re
+import reprlib
+import time
+from typing import Any, Awaitable, Callable
+from .default_logger import get_pretty_logger
+
+logger = get_pretty_logger("corvy_sdk")
+
+_args_repr = reprlib.Repr()
+_args_repr.maxstring = 60
+_args_repr.maxother = 60
+_args_repr.maxlist = _args_repr.maxtuple = 6
+
+
+@dataclass
+class HandlerTiming:
+    """One timed command or event handler invocation."""
+
+    kind: str  # "command" or "event"
+    name: str
+    duration: float
+    args: str
+    started_at: float  # Unix time
+    profile: pstats.Stats | None = None
+    profile_path: str | None = None
+
+
+class HandlerProfiler:
+    """
+    Times command and event handlers, keeping the slowest ones.
+
+    The `slowest` longest invocations are kept with a short summary of their
+    arguments. Invocations that take `threshold` seconds or more are reported to
+    `on_slow`. With `capture` on, async handlers also run under cProfile (one at a
+    time, since only one profiler can be active) and slow ones get the profile
+    attached, and dumped to `profile_dir` when set. Everything the event loop runs
+    while a handler is suspended ends up in its profile too, which is usually what
+    you want when looking for what blocked it.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.5,
+        slowest: int = 20,
+        capture: bool = False,
+        profile_dir: str | None = None,
+        on_slow: Callable[[HandlerTiming], Any] | None = None,
+    ):
+        self.threshold = threshold
+        self.max_slowest = slowest
+        self.capture = capture
+        self.profile_dir = profile_dir
+        self.on_slow = on_slow
+        self.calls = 0
+        self.slow_calls = 0
+        self._slowest: list[tuple[float, int, HandlerTiming]] = []  # min-heap
+        self._order = itertools.count()
+        self._profiling = False
+        if profile_dir is not None:
+            os.makedirs(profile_dir, exist_ok=True)
+
+    @property
+    def slowest(self) -> list[HandlerTiming]:
+        """The slowest invocations so far, slowest first."""
+        return [timing for _, _, timing in sorted(self._slowest, reverse=True)]
+
+    def reset(self):
+        self.calls = 0
+        self.slow_calls = 0
+        self._slowest = []
+
+    async def run(
+        self,
+        kind: str,
+        name: str,
+        args: tuple | list,
+        call: Awaitable,
+        capture: bool = True,
+    ) -> Any:
+        """Await a handler call, timing (and maybe profiling) it."""
+        profile = None
+        if capture and self.capture and not self._profiling:
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+                self._profiling = True
+            except ValueError:  # Another profiler is already active
+                profile = None
+        started_at = time.time()
+        started = time.perf_counter()
+        try:
+            return await call
+        finally:
+            duration = time.perf_counter() - started
+            if profile is not None:
+                profile.disable()
+                self._profiling = False
+            self._record(kind, name, args, duration, started_at, profile)
+
+    def _record(
+        self,
+        kind: str,
+        name: str,
+        args: tuple | list,
+        duration: float,
+        started_at: float,
+        profile: cProfile.Profile | None,
+    ):
+        self.calls += 1
+        timing = None
+        if len(self._slowest) < self.max_slowest or (
+            self._slowest and duration > self._slowest[0][0]
+        ):
+            timing = HandlerTiming(
+                kind, name, duration, _args_repr.repr(args), started_at
+            )
+            entry = (duration, next(self._order), timing)
+            if len(self._slowest) < self.max_slowest:
+                heapq.heappush(self._slowest, entry)
+            else:
+                heapq.heapreplace(self._slowest, entry)
+        if duration < self.threshold:
+            return
+        self.slow_calls += 1
+        if timing is None:
+            timing = HandlerTiming(
+                kind, name, duration, _args_repr.repr(args), started_at
+            )
+        if profile is not None:
+            timing.profile = pstats.Stats(profile)
+            if self.profile_dir is not None:
+                safe_name = re.sub(r"[^\w.-]", "_", name)
+                timing.profile_path = os.path.join(
+                    self.profile_dir,
+                    f"{kind}_{safe_name}_{int(started_at * 1000)}.prof",
+                )
+                profile.dump_stats(timing.profile_path)
+        logger.warning(f"Slow {kind} {name} took {duration:.3f}s (args: {timing.args})")
+        if self.on_slow is not None:
+            self.on_slow(timing)
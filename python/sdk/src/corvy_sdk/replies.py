@@ -0,0 +1,95 @@
+import asyncio
+import itertools
+import time
+from typing import Any
+
+
+class ReplyTracker:
+    """
+    Correlates outgoing Phoenix frames with their `phx_reply` by ref.
+
+    Every tracked frame gets a unique, monotonically increasing ref and a future
+    that resolves with the reply's response payload, or fails with a ValueError
+    if the server replied with an error, or a TimeoutError if no reply arrived in
+    time. Unanswered refs are dropped when they time out so the table can't grow
+    without bound.
+    """
+
+    def __init__(self, timeout: float = 10, ref_prefix: str = "_py_msg_"):
+        self.timeout = timeout
+        self.ref_prefix = ref_prefix
+        self.replies = 0
+        self.timeouts = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self._refs = itertools.count(1)
+        self._pending: dict[str, tuple[asyncio.Future, float, asyncio.TimerHandle]] = {}
+
+    @property
+    def pending(self) -> int:
+        """The number of frames still waiting on a reply."""
+        return len(self._pending)
+
+    def stats(self) -> dict[str, float]:
+        """Get the reply counts and round-trip latency (in seconds)."""
+        return {
+            "pending": self.pending,
+            "replies": self.replies,
+            "timeouts": self.timeouts,
+            "avg_latency": self.total_latency / self.replies if self.replies else 0.0,
+            "max_latency": self.max_latency,
+        }
+
+    def next_ref(self, prefix: str | None = None) -> str:
+        return f"{self.ref_prefix if prefix is None else prefix}{next(self._refs)}"
+
+    def expect(self, ref: str, timeout: float | None = None) -> asyncio.Future:
+        """Start waiting on a reply for `ref`. Call this before the frame is sent."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        # Don't complain about errors nobody is awaiting
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        timer = loop.call_later(
+            self.timeout if timeout is None else timeout, self._expire, ref
+        )
+        self._pending[ref] = (future, time.monotonic(), timer)
+        return future
+
+    def discard(self, ref: str):
+        """Stop waiting on a reply, e.g. because the frame couldn't be sent."""
+        entry = self._pending.pop(ref, None)
+        if entry is not None:
+            entry[2].cancel()
+            entry[0].cancel()
+
+    def resolve(self, frame: dict[str, Any]) -> bool:
+        """Resolve the future waiting on a `phx_reply` frame, if any.
+
+        Returns:
+            bool: Whether the reply was for a tracked ref.
+        """
+        entry = self._pending.pop(frame.get("ref"), None)
+        if entry is None:
+            return False
+        future, sent_at, timer = entry
+        timer.cancel()
+        latency = time.monotonic() - sent_at
+        self.replies += 1
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+        if future.done():
+            return True
+        payload = frame.get("payload") or {}
+        if payload.get("status", "ok") == "ok":
+            future.set_result(payload.get("response", {}))
+        else:
+            future.set_exception(ValueError(payload.get("response", payload)))
+        return True
+
+    def _expire(self, ref: str):
+        entry = self._pending.pop(ref, None)
+        if entry is None:
+            return
+        self.timeouts += 1
+        if not entry[0].done():
+            entry[0].set_exception(TimeoutError(f"No reply to {ref}"))
@@ -0,0 +1,340 @@
+from __future__ import annotations
+import asyncio
+import contextvars
+import multiprocessing
+import os
+import queue
+import signal
+from typing import TYPE_CHECKING, Any, Awaitable, Callable
+import aiohttp
+from .default_logger import get_pretty_logger
+from .outbound import SendPriority
+from .replies import ReplyTracker
+from .state import ConnectionState
+
+if TYPE_CHECKING:
+    from .corvybot import CorvyBot
+    from .flock import Flock
+    from .nest import Nest
+    from .user import User
+
+logger = get_pretty_logger("corvy_sdk")
+
+SHARD_REF_PREFIX = "_py_shard"
+
+# The shard this process runs, if it's a shard process
+_current_shard: int | None = None
+
+# The priority of the frame being sent, so the supervisor can schedule it the same way
+_frame_priority: contextvars.ContextVar[SendPriority] = contextvars.ContextVar(
+    "_frame_priority", default=SendPriority.NORMAL
+)
+
+
+def in_shard() -> bool:
+    """Whether this process is a shard started by run_sharded."""
+    return _current_shard is not None
+
+
+def _shard_ref_prefix(shard: int) -> str:
+    return f"{SHARD_REF_PREFIX}{shard}_msg_"
+
+
+class ShardSender:
+    """
+    Stands in for the send scheduler in a shard process.
+
+    Frames are written straight away, tagged with their priority, and the
+    supervisor's own scheduler paces them.
+    """
+
+    async def submit(
+        self,
+        nest_id: int,
+        content: str,
+        write: Callable[[str], Awaitable],
+        priority: SendPriority = SendPriority.NORMAL,
+        coalescible: bool = True,
+    ):
+        token = _frame_priority.set(priority)
+        try:
+            return await write(content)
+        finally:
+            _frame_priority.reset(token)
+
+
+class ShardStore:
+    """
+    Stands in for the message store in a shard process.
+
+    Only the supervisor opens the SQLite file, so shards forward what they'd
+    store to it. Entities lose their connection state when they're pickled.
+    """
+
+    def __init__(self, outbox: multiprocessing.Queue):
+        self.outbox = outbox
+
+    def save_user(self, user: User):
+        self.outbox.put(("store", "save_user", user))
+
+    def save_flock(self, flock: Flock):
+        self.outbox.put(("store", "save_flock", flock))
+
+    def save_nest(self, nest: Nest):
+        self.outbox.put(("store", "save_nest", nest))
+
+
+class ShardConnectionState(ConnectionState):
+    """
+    Connection state for a shard process.
+
+    REST calls use the shard's own HTTP session, but websocket frames are handed
+    to the supervisor, which owns the only websocket connection.
+    """
+
+    outbox: Any = None
+
+    async def send_frame(self, frame: dict[str, Any]):
+        nest_id = frame.get("payload", {}).get("nest_id")
+        self.outbox.put(
+            ("frame", nest_id, _frame_priority.get(), self.codec.dumps(frame))
+        )
+
+
+class ProcessShardPool:
+    """
+    Processes messages in a pool of worker processes, sharded by nest id.
+
+    Each process builds its own bot with `bot_factory` (so it has the same
+    commands and events) and handles the messages of the nests assigned to it in
+    order. Frames the shards send, like command replies, are written by the
+    supervisor process, through its send scheduler (at their original priority)
+    when it has one. Acknowledgements for those frames are routed back to the shard
+    that sent them. Only the supervisor opens the message store: it saves messages
+    before handing them out, and shards forward the entities they fetch to it.
+
+    This has the same interface as MessageWorkerPool, so the supervisor bot uses
+    it in place of one.
+    """
+
+    def __init__(
+        self,
+        bot: CorvyBot,
+        bot_factory: Callable[[], CorvyBot],
+        processes: int,
+        queue_size: int = 1000,
+    ):
+        if processes < 1:
+            raise ValueError("A shard pool needs at least one process")
+        self.bot = bot
+        self.bot_factory = bot_factory
+        self.processes = processes
+        # Forking a process with an event loop and threads running (the store's,
+        # aiohttp's) can deadlock the child, so shards always start fresh
+        context = multiprocessing.get_context("spawn")
+        shard_size = max(1, queue_size // processes)
+        self._inboxes = [context.Queue(shard_size) for _ in range(processes)]
+        self._outbox = context.Queue()
+        self._context = context
+        self._workers: list[multiprocessing.Process] = []
+        self._forwarder: asyncio.Task | None = None
+
+    @property
+    def depth(self) -> int:
+        """The number of messages waiting to be processed (approximate)."""
+        try:
+            return sum(inbox.qsize() for inbox in self._inboxes)
+        except NotImplementedError:  # macOS has no sem_getvalue
+            return 0
+
+    def start(self):
+        """Spawn the shard processes and start forwarding their frames."""
+        channel = self.bot.connection_state.bot_channel
+        for shard, inbox in enumerate(self._inboxes):
+            worker = self._context.Process(
+                target=_shard_main,
+                args=(self.bot_factory, shard, channel, inbox, self._outbox),
+                name=f"corvy_shard_{shard}",
+                daemon=True,
+            )
+            worker.start()
+            self._workers.append(worker)
+        self._forwarder = asyncio.create_task(self._forward_frames())
+
+    async def submit(self, message: dict):
+        """Queue a message on its nest's shard, waiting if that shard is full."""
+        if self.bot.store is not None:
+            self.bot.store.save_message(message)
+        await self._put(message["nest_id"] % self.processes, ("message", message))
+
+    def route_reply(self, frame: dict) -> bool:
+        """Hand a `phx_reply` for a frame a shard sent back to that shard."""
+        ref = frame.get("ref") or ""
+        if not ref.startswith(SHARD_REF_PREFIX):
+            return False
+        shard = int(ref[len(SHARD_REF_PREFIX) :].split("_", 1)[0])
+        asyncio.create_task(self._put(shard, ("reply", frame)))
+        return True
+
+    async def stop(self):
+        """Stop the shard processes. Queued messages are dropped."""
+        for inbox in self._inboxes:
+            try:
+                inbox.put_nowait(None)
+            except queue.Full:
+                pass
+        self._outbox.put(None)
+        if self._forwarder is not None:
+            await asyncio.gather(self._forwarder, return_exceptions=True)
+            self._forwarder = None
+        loop = asyncio.get_running_loop()
+        for worker in self._workers:
+            await loop.run_in_executor(None, worker.join, 5)
+            if worker.is_alive():
+                worker.terminate()
+        self._workers = []
+
+    async def _put(self, shard: int, item: tuple):
+        inbox = self._inboxes[shard]
+        try:
+            inbox.put_nowait(item)
+        except queue.Full:
+            # Backpressure: wait off the event loop until the shard catches up
+            await asyncio.get_running_loop().run_in_executor(None, inbox.put, item)
+
+    async def _forward_frames(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await loop.run_in_executor(None, self._outbox.get)
+            if item is None:
+                return
+            if item[0] == "store":
+                _, method, entity = item
+                if self.bot.store is not None:
+                    getattr(self.bot.store, method)(entity)
+                continue
+            _, nest_id, priority, data = item
+            try:
+                await self._write_frame(nest_id, priority, data)
+            except Exception as e:
+                logger.exception(f"Failed to forward a frame from a shard: {str(e)}")
+
+    async def _write_frame(
+        self, nest_id: int | None, priority: SendPriority, data: str | bytes
+    ):
+        state = self.bot.connection_state
+
+        async def _write(data: str | bytes):
+            if isinstance(data, bytes):
+                await state.websocket.send(data, text=True)
+            else:
+                await state.websocket.send(data)
+
+        sender = state.sender
+        if sender is None or nest_id is None:
+            await _write(data)
+        else:
+            task = asyncio.create_task(
+                sender.submit(nest_id, data, _write, priority, coalescible=False)
+            )
+            task.add_done_callback(_log_failed_send)
+
+
+def _log_failed_send(task: asyncio.Task):
+    if not task.cancelled() and (e := task.exception()) is not None:
+        logger.error(f"Failed to send a frame from a shard: {str(e)}")
+
+
+def _shard_main(
+    bot_factory: Callable[[], CorvyBot],
+    shard: int,
+    channel: str,
+    inbox: multiprocessing.Queue,
+    outbox: multiprocessing.Queue,
+):
+    global _current_shard
+    # The supervisor handles Ctrl+C and tells the shards to stop. Bots built in a
+    # shard see in_shard() and leave the handler alone, and don't open the store.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _current_shard = shard
+    bot = bot_factory()
+    asyncio.run(_run_shard(bot, shard, channel, inbox, outbox))
+
+
+async def _run_shard(
+    bot: CorvyBot,
+    shard: int,
+    channel: str,
+    inbox: multiprocessing.Queue,
+    outbox: multiprocessing.Queue,
+):
+    bot.replies = ReplyTracker(bot.replies.timeout, _shard_ref_prefix(shard))
+    bot.send_scheduler = None  # Frames are paced by the supervisor
+    state = ShardConnectionState(
+        aiohttp.ClientSession(
+            bot.api_base_url,
+            headers=bot.headers,
+            json_serialize=bot.codec.dumps_str,
+        ),
+        None,
+        channel,
+        bot.api_path,
+        bot.cache,
+        sender=ShardSender(),
+        replies=bot.replies,
+        codec=bot.codec,
+        store=ShardStore(outbox),
+        metrics=bot.metrics,
+    )
+    state.outbox = outbox
+    bot.connection_state = state
+    if bot.worker_pool is not None:
+        bot.worker_pool.start()
+    logger.debug(f"Shard {shard} started in process {os.getpid()}.")
+
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            item = await loop.run_in_executor(None, inbox.get)
+            if item is None:
+                break
+            kind, payload = item
+            if kind == "reply":
+                bot.replies.resolve(payload)
+            elif bot.worker_pool is not None:
+                await bot.worker_pool.submit(payload)
+            else:
+                try:
+                    await bot._process_message_raw(payload)
+                except Exception as e:
+                    logger.exception(f"Error processing message: {str(e)}")
+    finally:
+        if bot.worker_pool is not None:
+            await bot.worker_pool.stop()
+        await state.client_session.close()
+
+
+def run_sharded(bot_factory: Callable[[], CorvyBot], processes: int | None = None):
+    """Run a bot with its messages processed across several processes.
+
+    The calling process keeps the websocket connection and hands each message to
+    one of `processes` worker processes, chosen by nest id so each nest's messages
+    stay in order. Every process is spawned fresh and builds its own bot by calling
+    `bot_factory`, so it must be a module-level function, and the script must use
+    an `if __name__ == "__main__":` guard.
+
+    Each shard's bot keeps its own state, so per-bot limits apply per process:
+    user cooldowns and max_concurrency are enforced separately in every shard,
+    and the metrics of commands and handlers run in a shard stay in that shard's
+    `bot.metrics`. Only the supervisor's metrics (the connection, sends and the
+    message pipeline up to handing messages out) are served on `metrics_port`.
+
+    Args:
+        bot_factory: Creates the bot, with its commands and events registered.
+        processes: How many worker processes to use. Defaults to the CPU count.
+    """
+    bot = bot_factory()
+    bot.worker_pool = ProcessShardPool(
+        bot, bot_factory, processes or os.cpu_count() or 1
+    )
+    bot.start()
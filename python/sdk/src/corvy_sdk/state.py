@@ -1,6 +1,20 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+import time
+from typing import TYPE_CHECKING, Any
 import aiohttp
 from websockets.asyncio.client import ClientConnection
+from .cache import EntityCache
+from .single_flight import SingleFlight
+from .outbound import SendScheduler
+from .replies import ReplyTracker
+from .codec import JSONCodec
+from .store import MessageStore
+from .metrics import Metrics, endpoint_label
+
+if TYPE_CHECKING:
+    from .flock import Flock
+    from .nest import Nest
+    from .user import User
 
 
 @dataclass
@@ -9,3 +23,70 @@ class ConnectionState:
     websocket: ClientConnection
     bot_channel: str
     api_path: str
+    cache: EntityCache = field(default_factory=EntityCache)
+    requests: SingleFlight = field(default_factory=SingleFlight)
+    sender: SendScheduler | None = None
+    replies: ReplyTracker = field(default_factory=ReplyTracker)
+    codec: JSONCodec = field(default_factory=JSONCodec)
+    store: MessageStore | None = None
+    metrics: Metrics | None = None
+
+    def __reduce__(self):
+        # Sessions and sockets can't cross processes, so entities sent to another process arrive detached
+        return (type(None), ())
+
+    async def get_json(self, url: str, params: dict[str, Any] | None = None) -> Any:
+        """GET a JSON document, sharing the request with identical concurrent GETs."""
+        key = (url, tuple(sorted(params.items())) if params else ())
+
+        async def _get():
+            if self.metrics is None:
+                async with self.client_session.get(url, params=params) as response:
+                    return await response.json(loads=self.codec.loads)
+            started = time.perf_counter()
+            status = "error"
+            try:
+                async with self.client_session.get(url, params=params) as response:
+                    status = str(response.status)
+                    return await response.json(loads=self.codec.loads)
+            finally:
+                labels = (("method", "GET"), ("endpoint", endpoint_label(url)))
+                self.metrics.observe(
+                    "corvy_rest_request_seconds", time.perf_counter() - started, labels
+                )
+                self.metrics.inc(
+                    "corvy_rest_requests_total", labels=labels + (("status", status),)
+                )
+
+        return await self.requests.do(key, _get)
+
+    def remember_user(self, user: "User"):
+        """Record a fetched user in the cache and the local store."""
+        self.cache.store_user(user)
+        if self.store is not None:
+            self.store.save_user(user)
+
+    def remember_flock(self, flock: "Flock"):
+        """Record a fetched flock in the cache and the local store."""
+        self.cache.flocks.set(flock.id, flock)
+        if self.store is not None:
+            self.store.save_flock(flock)
+
+    def remember_nest(self, nest: "Nest"):
+        """Record a fetched nest in the cache and the local store."""
+        self.cache.nests.set(nest.id, nest)
+        if self.store is not None:
+            self.store.save_nest(nest)
+
+    async def send_frame(self, frame: dict[str, Any]):
+        """Send a frame over the websocket."""
+        if self.metrics is None:
+            await self.codec.send_frame(self.websocket, frame)
+            return
+        started = time.perf_counter()
+        await self.codec.send_frame(self.websocket, frame)
+        labels = (("event", frame["event"]),)
+        self.metrics.observe(
+            "corvy_frame_send_seconds", time.perf_counter() - started, labels
+        )
+        self.metrics.inc("corvy_frames_sent_total", labels=labels)
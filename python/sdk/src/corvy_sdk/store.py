@@ -0,0 +1,331 @@
+from __future__ import annotations
+import asyncio
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
+import sqlite3
+from typing import TYPE_CHECKING, Any, Callable
+from .default_logger import get_pretty_logger
+from .timestamps import parse_timestamp
+
+if TYPE_CHECKING:
+    from .flock import Flock
+    from .nest import Nest
+    from .user import User
+    from .state import ConnectionState
+
+logger = get_pretty_logger("corvy_sdk")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY,
+    flock_id INTEGER NOT NULL,
+    nest_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    content TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    created_ts REAL
+);
+CREATE INDEX IF NOT EXISTS messages_nest ON messages (nest_id, id);
+CREATE INDEX IF NOT EXISTS messages_user ON messages (user_id, id);
+CREATE INDEX IF NOT EXISTS messages_created_ts ON messages (created_ts);
+
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY,
+    username TEXT NOT NULL,
+    is_bot INTEGER NOT NULL,
+    avatar_url TEXT
+);
+CREATE INDEX IF NOT EXISTS users_username ON users (username);
+
+CREATE TABLE IF NOT EXISTS flocks (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    icon TEXT,
+    member_count INTEGER,
+    nest_count INTEGER,
+    created_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS nests (
+    id INTEGER PRIMARY KEY,
+    flock_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    position INTEGER,
+    created_at TEXT
+);
+CREATE INDEX IF NOT EXISTS nests_flock ON nests (flock_id);
+
+CREATE TABLE IF NOT EXISTS nest_cursors (
+    nest_id INTEGER PRIMARY KEY,
+    flock_id INTEGER NOT NULL,
+    last_message_id INTEGER NOT NULL
+);
+"""
+
+
+def _format_timestamp(value: datetime | str | None) -> str | None:
+    if value is None or isinstance(value, str):
+        return value
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _epoch(value: datetime | str) -> float:
+    """Turn a timestamp into Unix time, so differently formatted ones compare correctly."""
+    if isinstance(value, str):
+        value = parse_timestamp(value)
+    return value.timestamp()
+
+
+class MessageStore:
+    """
+    A local SQLite store of messages, users, flocks and nests.
+
+    Messages are append-only. The highest message id seen in each nest is kept
+    so that after a restart only the messages sent while the bot was offline need
+    to be fetched. Writes are committed in batches every `flush_interval` seconds.
+
+    The database is only touched from one background thread, so the event loop
+    never waits on SQLite: writes are queued to it without waiting, and queries
+    are awaited. Since the thread runs everything in order, queries see every
+    write queued before them.
+    """
+
+    def __init__(self, path: str, flush_interval: float = 1.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._executor = ThreadPoolExecutor(1, thread_name_prefix="corvy-store")
+        self._db: sqlite3.Connection = self._executor.submit(self._open).result()
+        self._flush_task: asyncio.Task | None = None
+
+    def _open(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.path)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.executescript(SCHEMA)
+        db.commit()
+        return db
+
+    def _write(self, func: Callable, *args):
+        self._executor.submit(func, *args).add_done_callback(self._log_write_error)
+
+    @staticmethod
+    def _log_write_error(future: Future):
+        if not future.cancelled() and future.exception() is not None:
+            logger.error(f"Failed to write to the message store: {future.exception()}")
+
+    async def _run(self, func: Callable, *args) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, func, *args
+        )
+
+    def start(self):
+        """Start committing writes periodically."""
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def flush(self):
+        """Commit every write queued so far."""
+        await self._run(self._db.commit)
+
+    async def close(self):
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+            self._flush_task = None
+        await self._run(self._close)
+        self._executor.shutdown()
+
+    def _close(self):
+        self._db.commit()
+        self._db.close()
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except sqlite3.Error as e:
+                logger.exception(f"Failed to flush the message store: {str(e)}")
+
+    def save_message(self, message: dict[str, Any]):
+        """Queue a raw message payload to be recorded, as received from the API or websocket."""
+        self._write(self._save_message, message)
+
+    def _save_message(self, message: dict[str, Any]):
+        user = message["user"]
+        self._db.execute(
+            "INSERT OR IGNORE INTO messages "
+            "(id, flock_id, nest_id, user_id, content, created_at, created_ts) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                message["id"],
+                message["flock_id"],
+                message["nest_id"],
+                user["id"],
+                message["content"],
+                message["created_at"],
+                _epoch(message["created_at"]),
+            ),
+        )
+        self._db.execute(
+            "INSERT INTO users VALUES (?, ?, ?, ?) ON CONFLICT (id) DO UPDATE SET "
+            "username = excluded.username, is_bot = excluded.is_bot, avatar_url = excluded.avatar_url",
+            (user["id"], user["username"], user["is_bot"], user.get("photo_url")),
+        )
+        self._db.execute(
+            "INSERT INTO nest_cursors VALUES (?, ?, ?) ON CONFLICT (nest_id) DO UPDATE SET "
+            "last_message_id = max(last_message_id, excluded.last_message_id)",
+            (message["nest_id"], message["flock_id"], message["id"]),
+        )
+
+    def save_user(self, user: User):
+        self._write(
+            self._db.execute,
+            "INSERT OR REPLACE INTO users VALUES (?, ?, ?, ?)",
+            (user.id, user.username, user.is_bot, user.avatar_url),
+        )
+
+    def save_flock(self, flock: Flock):
+        self._write(
+            self._db.execute,
+            "INSERT OR REPLACE INTO flocks VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                flock.id,
+                flock.name,
+                flock.icon,
+                flock.member_count,
+                flock.nest_count,
+                _format_timestamp(flock.created_at),
+            ),
+        )
+
+    def save_nest(self, nest: Nest):
+        self._write(
+            self._db.execute,
+            "INSERT OR REPLACE INTO nests VALUES (?, ?, ?, ?, ?)",
+            (
+                nest.id,
+                nest.flock.id,
+                nest.name,
+                nest.position,
+                _format_timestamp(nest.created_at),
+            ),
+        )
+
+    async def last_message_ids(self) -> dict[int, tuple[int, int]]:
+        """Get the last message id seen in each nest, as nest id -> (flock id, message id)."""
+        rows = await self._run(
+            self._fetch_all,
+            "SELECT nest_id, flock_id, last_message_id FROM nest_cursors",
+            (),
+        )
+        return {
+            nest_id: (flock_id, message_id) for nest_id, flock_id, message_id in rows
+        }
+
+    def _fetch_all(self, sql: str, params) -> list[tuple]:
+        return self._db.execute(sql, params).fetchall()
+
+    async def query_messages(
+        self,
+        nest_id: int | None = None,
+        user_id: int | None = None,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        limit: int | None = 100,
+    ) -> list[dict[str, Any]]:
+        """Find stored messages, newest first.
+
+        Messages are returned as payloads in the same shape the API uses, so they
+        can be turned back into Message objects with `decode_message`.
+
+        Args:
+            nest_id: Only messages in this nest.
+            user_id: Only messages by this user.
+            since: Only messages created at or after this time.
+            until: Only messages created before this time.
+            limit: The most messages to return. None returns all of them.
+        """
+        conditions = []
+        params: list[Any] = []
+        if nest_id is not None:
+            conditions.append("m.nest_id = ?")
+            params.append(nest_id)
+        if user_id is not None:
+            conditions.append("m.user_id = ?")
+            params.append(user_id)
+        if since is not None:
+            conditions.append("m.created_ts >= ?")
+            params.append(_epoch(since))
+        if until is not None:
+            conditions.append("m.created_ts < ?")
+            params.append(_epoch(until))
+        sql = (
+            "SELECT m.id, m.flock_id, m.nest_id, m.content, m.created_at, "
+            "u.id, u.username, u.is_bot, u.avatar_url "
+            "FROM messages m JOIN users u ON u.id = m.user_id"
+        )
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY m.id DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [
+            {
+                "id": row[0],
+                "flock_id": row[1],
+                "nest_id": row[2],
+                "content": row[3],
+                "created_at": row[4],
+                "user": {
+                    "id": row[5],
+                    "username": row[6],
+                    "is_bot": bool(row[7]),
+                    "photo_url": row[8],
+                },
+            }
+            for row in await self._run(self._fetch_all, sql, params)
+        ]
+
+    async def sync(self, state: ConnectionState, concurrency: int = 4) -> int:
+        """Fetch and store the messages sent since the last one seen in each known nest.
+
+        Args:
+            state: The connection state to fetch with.
+            concurrency: How many nests to sync at once.
+
+        Returns:
+            int: How many messages were stored.
+        """
+        from .flock import PartialFlock
+        from .nest import PartialNest
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def _sync_nest(nest_id: int, flock_id: int, last_id: int) -> int:
+            nest = PartialNest(nest_id, PartialFlock(flock_id).attach_state(state))
+            nest.attach_state(state)
+            async with semaphore:
+                payloads = await nest._get_payloads_after(last_id)
+            for payload in payloads:
+                self.save_message(payload)
+            return len(payloads)
+
+        counts = await asyncio.gather(
+            *(
+                _sync_nest(nest_id, flock_id, last_id)
+                for nest_id, (flock_id, last_id) in (
+                    await self.last_message_ids()
+                ).items()
+            ),
+            return_exceptions=True,
+        )
+        await self.flush()
+        synced = 0
+        for count in counts:
+            if isinstance(count, BaseException):
+                logger.warning(f"Failed to sync a nest: {count}")
+            else:
+                synced += count
+        return synced
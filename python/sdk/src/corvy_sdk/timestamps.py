@@ -0,0 +1,28 @@
+from datetime import datetime, timezone
+from functools import lru_cache
+
+
+@lru_cache(maxsize=1024)
+def parse_timestamp(raw: str) -> datetime:
+    """Parse an API timestamp such as "2025-01-01T12:00:00Z" into an aware UTC datetime.
+
+    The API's fixed format is sliced directly instead of going through strptime;
+    anything else falls back to `datetime.fromisoformat`. Results are memoized,
+    since messages sent within the same second share a timestamp.
+    """
+    if len(raw) == 20 and raw[19] == "Z" and raw[10] == "T":
+        return datetime(
+            int(raw[0:4]),
+            int(raw[5:7]),
+            int(raw[8:10]),
+            int(raw[11:13]),
+            int(raw[14:16]),
+            int(raw[17:19]),
+            tzinfo=timezone.utc,
+        )
+    if raw.endswith("Z"):
+        raw = raw[:-1] + "+00:00"  # fromisoformat only understands Z from 3.11
+    parsed = datetime.fromisoformat(raw)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
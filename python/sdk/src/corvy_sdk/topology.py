@@ -0,0 +1,51 @@
+from __future__ import annotations
+import asyncio
+from dataclasses import dataclass, field
+from .default_logger import get_pretty_logger
+from .flock import Flock
+from .nest import Nest
+from .state import ConnectionState
+
+logger = get_pretty_logger("corvy_sdk")
+
+
+@dataclass
+class Topology:
+    """
+    A snapshot of every flock the bot is in and their nests.
+
+    Flocks whose nests couldn't be fetched are still listed in `flocks`, with
+    the error in `failed` instead of an entry in `flock_nests`.
+    """
+
+    flocks: dict[int, Flock] = field(default_factory=dict)
+    nests: dict[int, Nest] = field(default_factory=dict)
+    flock_nests: dict[int, list[Nest]] = field(default_factory=dict)
+    failed: dict[int, Exception] = field(default_factory=dict)
+
+    @staticmethod
+    async def _discover(state: ConnectionState, concurrency: int = 8) -> Topology:
+        if concurrency < 1:
+            raise ValueError("Concurrency must be at least 1")
+        topology = Topology()
+        flocks = await Flock._get_all(state)
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def _get_nests(flock: Flock) -> list[Nest] | Exception:
+            async with semaphore:
+                try:
+                    return await flock.get_nests()
+                except Exception as e:
+                    logger.warning(f"Failed to get nests of flock {flock.id}: {str(e)}")
+                    return e
+
+        nest_lists = await asyncio.gather(*(_get_nests(flock) for flock in flocks))
+        for flock, nests in zip(flocks, nest_lists):
+            topology.flocks[flock.id] = flock
+            if isinstance(nests, Exception):
+                topology.failed[flock.id] = nests
+                continue
+            topology.flock_nests[flock.id] = nests
+            for nest in nests:
+                topology.nests[nest.id] = nest
+        return topology
@@ -0,0 +1,282 @@
+import re
+from typing import Any, Awaitable, Callable, Iterable
+from .default_logger import get_pretty_logger
+
+logger = get_pretty_logger("corvy_sdk")
+
+TriggerHandler = Callable[..., Awaitable]
+
+_GLOBAL_FLAGS = re.compile(r"^\(\?[aiLmsux]+\)")
+# Numbered or named backreferences and conditionals point at groups by number or
+# name, which change when the pattern is put in a combined regex
+_GROUP_REFERENCE = re.compile(r"\\[1-9]|\\g<|\(\?P=|\(\?\(")
+_FLAG_LETTERS = (
+    (re.ASCII, "a"),
+    (re.IGNORECASE, "i"),
+    (re.MULTILINE, "m"),
+    (re.DOTALL, "s"),
+    (re.VERBOSE, "x"),
+)
+
+
+def _trie_regex(terms: Iterable[str]) -> str:
+    """Build a regex matching any of `terms`, shaped like a trie so it's scanned in one pass."""
+    trie: dict = {}
+    for term in terms:
+        node = trie
+        for char in term:
+            node = node.setdefault(char, {})
+        node[""] = True
+
+    def _build(node: dict) -> str:
+        branches = [
+            re.escape(char) + _build(child)
+            for char, child in sorted(node.items())
+            if char
+        ]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if "" in node:
+            return f"(?:{body})?"  # Greedy, so longer terms win
+        return body
+
+    return _build(trie)
+
+
+class KeywordMatcher:
+    """
+    Finds every occurrence of a set of literal keywords in one pass.
+
+    Uses an Aho-Corasick automaton from `pyahocorasick` when it's installed, or
+    else one trie-shaped regex evaluated at every position.
+    """
+
+    def __init__(
+        self,
+        keywords: Iterable[str],
+        case_sensitive: bool = False,
+        whole_word: bool = True,
+    ):
+        self.case_sensitive = case_sensitive
+        self.whole_word = whole_word
+        keywords = {
+            keyword if case_sensitive else keyword.lower()
+            for keyword in keywords
+            if keyword
+        }
+        self._automaton = None
+        self._regex = None
+        if not keywords:
+            return
+        try:
+            import ahocorasick
+
+            self._automaton = ahocorasick.Automaton()
+            for keyword in keywords:
+                self._automaton.add_word(keyword, keyword)
+            self._automaton.make_automaton()
+        except ImportError:
+            # The regex finds the longest keyword at each position, so the shorter
+            # keywords it's hiding (its prefixes) are looked up separately.
+            self._prefixes = {
+                keyword: [
+                    keyword[:i]
+                    for i in range(1, len(keyword))
+                    if keyword[:i] in keywords
+                ]
+                for keyword in keywords
+            }
+            trie = _trie_regex(keywords)
+            if whole_word:
+                self._regex = re.compile(rf"(?<!\w)(?=({trie})(?!\w))")
+            else:
+                self._regex = re.compile(f"(?=({trie}))")
+
+    def find(self, content: str) -> list[str]:
+        """Get the keywords found in `content`, in order of first appearance."""
+        if not self.case_sensitive:
+            content = content.lower()
+        found: dict[str, None] = {}
+        if self._automaton is None and self._regex is None:
+            return []
+        if self._automaton is not None:
+            for end, keyword in self._automaton.iter(content):
+                if self.whole_word:
+                    start = end - len(keyword) + 1
+                    if (start > 0 and _is_word(content[start - 1])) or (
+                        end + 1 < len(content) and _is_word(content[end + 1])
+                    ):
+                        continue
+                found[keyword] = None
+            return list(found)
+        for match in self._regex.finditer(content):
+            keyword = match.group(1)
+            found[keyword] = None
+            for prefix in self._prefixes[keyword]:
+                end = match.start() + len(prefix)
+                if (
+                    not self.whole_word
+                    or end == len(content)
+                    or not _is_word(content[end])
+                ):
+                    found[prefix] = None
+        return list(found)
+
+
+def _is_word(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+class PatternMatcher:
+    """
+    Matches a set of regexes against a message, with one combined regex finding
+    where any of them match.
+
+    Every pattern becomes an alternative of one alternation inside a lookahead,
+    which finds the first position where any of them matches, in one scan of a
+    message that matches none. No pattern can match before that position, so each
+    one is then searched for from there on its own. The alternatives aren't
+    capturing groups, since the regex engine resets every group at each attempt
+    and that would make matching quadratic in the number of patterns. Patterns that
+    can't be combined (ones with backreferences or conditionals, or reusing a group
+    name) are searched for separately.
+    """
+
+    def __init__(self, patterns: Iterable[re.Pattern] = ()):
+        self.patterns: list[re.Pattern] = []
+        self._combined: list[re.Pattern] = []
+        self._separate: list[re.Pattern] = []
+        self._parts: list[str] = []
+        self._group_names: set[str] = set()
+        self._regex: re.Pattern | None = None
+        for pattern in patterns:
+            self.add(pattern)
+
+    def add(self, pattern: re.Pattern):
+        self.patterns.append(pattern)
+        part = self._combinable(pattern)
+        if part is None:
+            self._separate.append(pattern)
+            return
+        self._combined.append(pattern)
+        self._parts.append(part)
+        self._group_names.update(pattern.groupindex)
+        self._regex = None
+
+    def _combinable(self, pattern: re.Pattern) -> str | None:
+        """Get the pattern's part of the combined regex, or None if it has to be matched alone."""
+        if not isinstance(pattern.pattern, str):
+            return None
+        if _GROUP_REFERENCE.search(pattern.pattern) or not self._group_names.isdisjoint(
+            pattern.groupindex
+        ):
+            return None
+        flags = "".join(
+            letter for flag, letter in _FLAG_LETTERS if pattern.flags & flag
+        )
+        # Leading global flags are already in pattern.flags, and can't appear mid-regex
+        source = _GLOBAL_FLAGS.sub("", pattern.pattern)
+        part = f"(?{flags}:{source})" if flags else f"(?:{source})"
+        try:
+            re.compile(f"(?={part})")
+        except re.error:
+            return None  # E.g. a verbose pattern ending in a comment
+        return part
+
+    def _compile(self) -> re.Pattern | None:
+        if self._regex is None and self._parts:
+            try:
+                self._regex = re.compile("(?=" + "|".join(self._parts) + ")")
+            except re.error as e:
+                logger.warning(f"Matching trigger patterns one by one: {str(e)}")
+                self._separate = self.patterns.copy()
+                self._combined = []
+                self._parts = []
+        return self._regex
+
+    def find(self, content: str) -> list[re.Match]:
+        """Get the first match of each pattern that matches `content`."""
+        matches: list[re.Match] = []
+        regex = self._compile()
+        if regex is not None:
+            first = regex.search(content)
+            if first is not None:
+                start = first.start()
+                for pattern in self._combined:
+                    # None of them match earlier, and each gets a match of its own
+                    match = pattern.search(content, start)
+                    if match is not None:
+                        matches.append(match)
+        for pattern in self._separate:
+            match = pattern.search(content)
+            if match is not None:
+                matches.append(match)
+        return matches
+
+
+class TriggerRegistry:
+    """
+    Keyword and pattern triggers, compiled into as few matchers as possible.
+
+    Literal keywords are grouped by their matching options into KeywordMatchers,
+    and all patterns share one PatternMatcher, so checking a message costs about
+    the same no matter how many triggers are registered. Keyword matchers are
+    rebuilt lazily after keywords are added.
+    """
+
+    def __init__(self):
+        self._keywords: dict[tuple[bool, bool], dict[str, list[TriggerHandler]]] = {}
+        self._patterns: dict[re.Pattern, list[TriggerHandler]] = {}
+        self._keyword_matchers: (
+            list[tuple[KeywordMatcher, dict[str, list[TriggerHandler]]]] | None
+        ) = None
+        self._pattern_matcher = PatternMatcher()
+
+    def __len__(self) -> int:
+        return sum(len(keywords) for keywords in self._keywords.values()) + len(
+            self._patterns
+        )
+
+    def add_keywords(
+        self,
+        keywords: Iterable[str],
+        handler: TriggerHandler,
+        case_sensitive: bool = False,
+        whole_word: bool = True,
+    ):
+        table = self._keywords.setdefault((case_sensitive, whole_word), {})
+        for keyword in keywords:
+            key = keyword if case_sensitive else keyword.lower()
+            table.setdefault(key, []).append(handler)
+        self._keyword_matchers = None
+
+    def add_pattern(
+        self, pattern: str | re.Pattern, handler: TriggerHandler, flags: int = 0
+    ):
+        if isinstance(pattern, str):
+            pattern = re.compile(pattern, flags)
+        if pattern not in self._patterns:
+            self._pattern_matcher.add(pattern)
+        self._patterns.setdefault(pattern, []).append(handler)
+
+    def match(self, content: str) -> list[tuple[TriggerHandler, Any]]:
+        """Find the handlers triggered by a message's content.
+
+        Returns:
+            (handler, keyword or re.Match) pairs, with each handler at most once.
+        """
+        if self._keyword_matchers is None:
+            self._keyword_matchers = [
+                (KeywordMatcher(table, case_sensitive, whole_word), table)
+                for (case_sensitive, whole_word), table in self._keywords.items()
+            ]
+        triggered: dict[TriggerHandler, Any] = {}
+        for matcher, table in self._keyword_matchers:
+            for keyword in matcher.find(content):
+                for handler in table[keyword]:
+                    triggered.setdefault(handler, keyword)
+        for match in self._pattern_matcher.find(content):
+            for handler in self._patterns[match.re]:
+                triggered.setdefault(handler, match)
+        return list(triggered.items())
@@ -1,57 +1,66 @@
 from .state import ConnectionState
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 import urllib.parse
 
 
-@dataclass
+@dataclass(slots=True)
 class PartialUser:
     id: int | None
     username: str | None
+    _connection_state: ConnectionState | None = field(
+        default=None, init=False, repr=False, compare=False
+    )
 
     def attach_state(self, state: ConnectionState):
         self._connection_state = state
         return self
 
     async def fetch(self) -> "User":
-        async with self._connection_state.client_session.get(
+        cache = self._connection_state.cache
+        if (cached := cache.users.get(self.id)) is not None:
+            return cached
+        data = await self._connection_state.get_json(
             f"{self._connection_state.api_path}/users/{self.id}"
-        ) as response:
-            data = await response.json()
-            if err := data.get("error", False):
-                raise ValueError(err)
-            user = User(
-                data["user"]["id"],
-                data["user"]["username"],
-                data["user"]["is_bot"],
-                data["user"]["available_badges"],
-                data["user"].get("photo_url", None),
-                data["user"].get("badge", None),
-            )
-            if hasattr(self, "_connection_state"):
-                user.attach_state(self._connection_state)
-            return user
+        )
+        if err := data.get("error", False):
+            raise ValueError(err)
+        user = User(
+            data["user"]["id"],
+            data["user"]["username"],
+            data["user"]["is_bot"],
+            data["user"]["available_badges"],
+            data["user"].get("photo_url", None),
+            data["user"].get("badge", None),
+        )
+        if self._connection_state is not None:
+            user.attach_state(self._connection_state)
+        self._connection_state.remember_user(user)
+        return user
 
     async def fetch_by_username(self) -> "User":
-        async with self._connection_state.client_session.get(
+        cache = self._connection_state.cache
+        if (cached := cache.users_by_username.get(self.username)) is not None:
+            return cached
+        data = await self._connection_state.get_json(
             f"{self._connection_state.api_path}/users/by-username/{urllib.parse.quote_plus(self.username)}"
-        ) as response:
-            data = await response.json()
-            if err := data.get("error", False):
-                raise ValueError(err)
-            user = User(
-                data["user"]["id"],
-                data["user"]["username"],
-                data["user"]["is_bot"],
-                data["user"]["available_badges"],
-                data["user"].get("photo_url", None),
-                data["user"].get("badge", None),
-            )
-            if hasattr(self, "_connection_state"):
-                user.attach_state(self._connection_state)
-            return user
+        )
+        if err := data.get("error", False):
+            raise ValueError(err)
+        user = User(
+            data["user"]["id"],
+            data["user"]["username"],
+            data["user"]["is_bot"],
+            data["user"]["available_badges"],
+            data["user"].get("photo_url", None),
+            data["user"].get("badge", None),
+        )
+        if self._connection_state is not None:
+            user.attach_state(self._connection_state)
+        self._connection_state.remember_user(user)
+        return user
 
 
-@dataclass
+@dataclass(slots=True)
 class User(PartialUser):
     is_bot: bool
     available_badges: list[str]
@@ -0,0 +1,85 @@
+import asyncio
+from typing import Any, Awaitable, Callable
+from .default_logger import get_pretty_logger
+
+logger = get_pretty_logger("corvy_sdk")
+
+ORDERING_KEYS: dict[str | None, Callable[[dict], Any] | None] = {
+    "nest": lambda message: message["nest_id"],
+    "user": lambda message: message["user"]["id"],
+    None: None,
+}
+
+
+class MessageWorkerPool:
+    """
+    A fixed set of worker tasks that process raw websocket messages concurrently.
+
+    With an ordering key, every worker owns its own queue and messages are sharded
+    onto them by that key, so messages sharing a key are still handled in the order
+    they arrived. Without one, all workers pull from a single shared queue. Queues
+    are bounded, so `submit` waits (and the websocket stops being read) once the
+    pool is saturated.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[dict], Awaitable],
+        workers: int,
+        queue_size: int = 1000,
+        ordering: str | None = "nest",
+    ):
+        if workers < 1:
+            raise ValueError("A worker pool needs at least one worker")
+        if ordering not in ORDERING_KEYS:
+            raise ValueError(f"Unknown message ordering: {ordering!r}")
+        self.handler = handler
+        self.workers = workers
+        self.ordering = ordering
+        self._key = ORDERING_KEYS[ordering]
+        shard_count = workers if self._key else 1
+        shard_size = max(1, queue_size // shard_count)
+        self._queues: list[asyncio.Queue] = [
+            asyncio.Queue(shard_size) for _ in range(shard_count)
+        ]
+        self._tasks: list[asyncio.Task] = []
+
+    @property
+    def depth(self) -> int:
+        """The number of messages waiting to be processed."""
+        return sum(queue.qsize() for queue in self._queues)
+
+    def start(self):
+        """Spawn the worker tasks."""
+        for i in range(self.workers):
+            queue = self._queues[i % len(self._queues)]
+            self._tasks.append(asyncio.create_task(self._worker(queue)))
+
+    async def submit(self, message: dict):
+        """Queue a message, waiting if its queue is full."""
+        if self._key is None:
+            queue = self._queues[0]
+        else:
+            queue = self._queues[hash(self._key(message)) % len(self._queues)]
+        await queue.put(message)
+
+    def route_reply(self, frame: dict) -> bool:
+        """Workers share the bot's connection, so replies never need routing."""
+        return False
+
+    async def stop(self):
+        """Cancel the worker tasks. Queued messages are dropped."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _worker(self, queue: asyncio.Queue):
+        while True:
+            message = await queue.get()
+            try:
+                await self.handler(message)
+            except Exception as e:
+                logger.exception(f"Error processing message: {str(e)}")
+            finally:
+                queue.task_done()
@@ -0,0 +1,36 @@
+from corvy_sdk import CorvyBot, Message
+from corvy_sdk.messages import decode_message
+
+
+class FakeWebsocket:
+    """Records the frames sent to it, as text."""
+
+    def __init__(self):
+        self.sent: list[str] = []
+
+    async def send(self, data, text: bool = False):
+        self.sent.append(data.decode() if isinstance(data, bytes) else data)
+
+
+def payload(
+    message_id: int,
+    content: str | None = None,
+    nest_id: int = 7,
+    flock_id: int = 5,
+    user_id: int = 1,
+    created_at: str = "2025-01-01T12:00:00Z",
+) -> dict:
+    """Build a message payload like the ones the websocket delivers."""
+    return {
+        "id": message_id,
+        "content": f"message {message_id}" if content is None else content,
+        "flock_id": flock_id,
+        "nest_id": nest_id,
+        "created_at": created_at,
+        "user": {"id": user_id, "username": f"user{user_id}", "is_bot": False},
+    }
+
+
+def message(bot: CorvyBot, content: str, user_id: int = 1) -> Message:
+    """Build a message sent to `bot`."""
+    return decode_message(payload(1, content, user_id=user_id), bot.connection_state)
@@ -0,0 +1,84 @@
+import asyncio
+
+from corvy_sdk.catchup import MessageTracker
+from corvy_sdk.state import ConnectionState
+from conftest import payload
+
+
+def test_seen_drops_duplicates_and_tracks_the_newest_id():
+    tracker = MessageTracker()
+    assert not tracker.seen(payload(3, nest_id=7))
+    assert not tracker.seen(payload(1, nest_id=7))  # Late, but not seen yet
+    assert not tracker.seen(payload(2, nest_id=8))
+    assert tracker.seen(payload(3, nest_id=7))
+    assert tracker.duplicates == 1
+    assert tracker.last_ids == {7: (5, 3), 8: (5, 2)}
+
+
+def test_only_recent_ids_are_remembered():
+    tracker = MessageTracker(window=2)
+    for message_id in (1, 2, 3):
+        tracker.seen(payload(message_id))
+    assert not tracker.seen(payload(1))
+    assert tracker.seen(payload(3))
+
+
+def fake_state(nests: dict[int, list[int]], failing: tuple[int, ...] = ()):
+    """A connection state serving the message history of `nests`."""
+    state = ConnectionState(None, None, "bot", "/api/v2")
+    requests = []
+
+    async def get_json(url: str, params: dict | None = None):
+        nest_id = int(url.split("/nests/")[1].split("/")[0])
+        requests.append((nest_id, params.get("before_id")))
+        if nest_id in failing:
+            return {"success": False, "error": "not found"}
+        before_id = params.get("before_id")
+        ids = [i for i in nests[nest_id] if before_id is None or i < before_id]
+        page = ids[-params["limit"] :]
+        return {
+            "success": True,
+            "messages": [payload(i, nest_id=nest_id) for i in reversed(page)],
+        }
+
+    state.get_json = get_json
+    return state, requests
+
+
+def test_catch_up_replays_missed_messages_oldest_first():
+    async def main():
+        tracker = MessageTracker()
+        for message in (payload(10, nest_id=7), payload(3, nest_id=8)):
+            tracker.seen(message)
+        state, requests = fake_state({7: list(range(1, 81)), 8: [1, 2, 3]})
+        replayed = []
+
+        async def process(message: dict):
+            if not tracker.seen(message):
+                replayed.append((message["nest_id"], message["id"]))
+
+        # The websocket already delivered 80 after reconnecting
+        tracker.seen(payload(80, nest_id=7))
+        count = await tracker.catch_up(state, process, {7: (5, 10), 8: (5, 3)})
+        return tracker, requests, replayed, count
+
+    tracker, requests, replayed, count = asyncio.run(main())
+    assert replayed == [(7, i) for i in range(11, 80)]
+    assert count == 70  # Including the duplicate, which process dropped
+    assert sorted(requests, key=str) == [(7, 31), (7, None), (8, None)]
+    assert tracker.last_ids == {7: (5, 80), 8: (5, 3)}
+
+
+def test_a_failing_nest_doesnt_stop_the_others():
+    async def main():
+        tracker = MessageTracker()
+        state, _ = fake_state({7: [1, 2, 3], 8: [1, 2]}, failing=(8,))
+        replayed = []
+
+        async def process(message: dict):
+            replayed.append(message["id"])
+
+        count = await tracker.catch_up(state, process, {7: (5, 1), 8: (5, 1)})
+        return replayed, count
+
+    assert asyncio.run(main()) == ([2, 3], 2)
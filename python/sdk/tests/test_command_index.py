@@ -0,0 +1,29 @@
+from corvy_sdk.command_index import CommandIndex
+
+
+async def handler():
+    pass
+
+
+def test_match_is_case_insensitive():
+    index = CommandIndex()
+    index.add("!ping", handler)
+    assert index.match("!PING 1 2") == ("!ping", handler, " 1 2")
+    assert index.match("!pingx") is None
+    assert index.match("hello") is None
+
+
+def test_longest_prefix_wins():
+    index = CommandIndex()
+    other = lambda: None
+    index.add("!cfg", handler)
+    index.add("!cfg set", other)
+    assert index.match("!cfg set a b") == ("!cfg set", other, " a b")
+    assert index.match("!cfg get a") == ("!cfg", handler, " get a")
+
+
+def test_arguments_keep_their_offset_with_non_ascii_case():
+    # "İ".lower() is two characters long, which used to shift the arguments
+    index = CommandIndex()
+    index.add("!İ", handler)
+    assert index.match("!İ abc") == ("!İ", handler, " abc")
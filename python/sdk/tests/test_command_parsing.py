@@ -0,0 +1,123 @@
+import asyncio
+from typing import Annotated
+
+import pytest
+
+from corvy_sdk.command_parsing import (
+    Greedy,
+    compile_args,
+    simple_tokenize,
+    tokenize_spans,
+    unquote,
+)
+
+
+def legacy_tokenize(text: str) -> list[str]:
+    # The character-by-character tokenizer the fast paths have to agree with
+    tokens = []
+    current = []
+    in_quotes = False
+    escape = False
+    for char in text:
+        if escape:
+            current.append(char)
+            escape = False
+        elif char == "\\":
+            escape = True
+        elif char == '"':
+            in_quotes = not in_quotes
+        elif char.isspace() and not in_quotes:
+            if current:
+                tokens.append("".join(current))
+                current = []
+        else:
+            current.append(char)
+    if current:
+        tokens.append("".join(current))
+    return tokens
+
+
+INPUTS = [
+    "",
+    "   ",
+    "42 hello",
+    "a  b\tc\nd",
+    'say "hello there" to "everyone"',
+    'say "hello there" to \\"everyone\\" in "the nest"',
+    'say  "hello\tthere"  to \\"everyone\\"\n in "the nest"',
+    'empty "" tokens ""',
+    'an "unclosed quote  runs to the end',
+    "trailing backslash \\",
+    "escaped\\ space and \\\\ backslash",
+    'mid"dle quo"tes',
+    '\\"\\\\"\\"',
+    "a\0b \1c",
+    'note "' + 'a quoted \\"note\\" with spaces ' * 10 + '"',
+]
+
+
+@pytest.mark.parametrize("text", INPUTS)
+def test_tokenize_matches_the_character_loop(text):
+    assert simple_tokenize(text) == legacy_tokenize(text)
+
+
+@pytest.mark.parametrize("text", INPUTS)
+def test_spans_point_at_the_typed_tokens(text):
+    spans = tokenize_spans(text)
+    assert [value for value, _, _ in spans] == legacy_tokenize(text)
+    for value, start, end in spans:
+        assert unquote(text[start:end]) == value
+
+
+async def _note(first: str, rest: Annotated[str, Greedy]):
+    pass
+
+
+async def _middle(first: str, rest: Annotated[str, Greedy], last: str):
+    pass
+
+
+async def _listed(first: list[str], rest: Annotated[str, Greedy]):
+    pass
+
+
+def bind(func, text: str) -> list:
+    return asyncio.run(compile_args(func).bind(text, None, None))
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("note keep   these\tspaces ", "keep   these\tspaces"),
+        ('note "quoted" words', "quoted words"),
+        ('note "two  spaces" kept', "two  spaces kept"),
+        ('note a \\"b\\"  c', 'a "b"  c'),
+        ('note "an unclosed   quote', "an unclosed   quote"),
+        ('"first word" then   the rest', "then   the rest"),
+        ('note "a\\\\" b', "a\\ b"),
+        ("note", ""),
+        ('note ""', ""),
+    ],
+)
+def test_greedy_last_argument_keeps_its_text(text, expected):
+    assert bind(_note, text)[1] == expected
+
+
+def test_greedy_argument_before_another():
+    assert bind(_middle, "a b  c d") == ["a", "b  c", "d"]
+    assert bind(_middle, 'a "b  c" d "e f"') == ["a", "b  c d", "e f"]
+    assert bind(_middle, "a b") == ["a", "", "b"]
+
+
+def test_greedy_argument_after_a_list():
+    assert bind(_listed, 'x y "z  w"') == [["x", "y"], "z  w"]
+
+
+@pytest.mark.parametrize("text", INPUTS)
+def test_greedy_argument_matches_slicing(text):
+    tokens = legacy_tokenize(text)
+    if not tokens:
+        return
+    spans = tokenize_spans(text)
+    expected = unquote(text[spans[1][1] : spans[-1][2]]) if len(spans) > 1 else ""
+    assert bind(_note, text) == [tokens[0], expected]
@@ -0,0 +1,110 @@
+import asyncio
+
+import pytest
+
+from corvy_sdk import CommandOnCooldown, CommandTimeoutError, CorvyBot, Message
+from corvy_sdk import corvybot
+from corvy_sdk.state import ConnectionState
+from conftest import FakeWebsocket, message
+
+
+def make_bot():
+    bot = CorvyBot("token", loop_lag_interval=None, metrics=False)
+    bot.connection_state = ConnectionState(None, FakeWebsocket(), "bot:test", "/api")
+    errors = []
+
+    @bot.event()
+    async def on_command_exception(command: str, message: Message, exception):
+        errors.append(exception)
+
+    return bot, errors
+
+
+def test_slow_commands_time_out():
+    async def main():
+        bot, errors = make_bot()
+
+        @bot.command(timeout=0.05)
+        async def slow(message: Message):
+            await asyncio.sleep(5)
+
+        assert await bot._handle_command(message(bot, "!slow"))
+        return errors
+
+    (error,) = asyncio.run(main())
+    assert isinstance(error, CommandTimeoutError) and error.timeout == 0.05
+
+
+def test_handler_timeouts_are_not_command_timeouts():
+    async def main():
+        bot, errors = make_bot()
+
+        @bot.command(timeout=5)
+        async def waits(message: Message):
+            await asyncio.wait_for(asyncio.sleep(5), 0.01)
+
+        await bot._handle_command(message(bot, "!waits"))
+        return errors
+
+    (error,) = asyncio.run(main())
+    assert isinstance(error, TimeoutError)
+    assert not isinstance(error, CommandTimeoutError)
+
+
+def test_cooldown_is_only_used_by_valid_invocations():
+    async def main():
+        bot, errors = make_bot()
+        calls = []
+
+        @bot.command(user_cooldown=60)
+        async def roll(message: Message, sides: int):
+            calls.append(sides)
+            return str(sides)
+
+        await bot._handle_command(message(bot, "!roll many"))  # Doesn't parse
+        await bot._handle_command(message(bot, "!roll 6"))
+        await bot._handle_command(message(bot, "!roll 20"))  # On cooldown
+        await bot._handle_command(message(bot, "!roll 8", user_id=2))
+        return calls, errors
+
+    calls, errors = asyncio.run(main())
+    assert calls == [6, 8]
+    assert isinstance(errors[0], ValueError)
+    assert isinstance(errors[1], CommandOnCooldown)
+    assert errors[1].retry_after == pytest.approx(60, abs=1)
+
+
+def test_undelivered_replies_are_logged(monkeypatch):
+    warnings = []
+    monkeypatch.setattr(corvybot.logger, "warning", warnings.append)
+
+    async def main():
+        bot, errors = make_bot()
+        replies = bot.connection_state.replies
+
+        @bot.command()
+        async def ping(message: Message):
+            return "pong"
+
+        await bot._handle_command(message(bot, "!ping"))
+        (ref,) = replies._pending
+        replies.resolve(
+            {"ref": ref, "payload": {"status": "error", "response": "too long"}}
+        )
+        await asyncio.sleep(0)
+        return errors
+
+    assert asyncio.run(main()) == []
+    assert warnings == ["Reply to !ping wasn't delivered: too long"]
+
+
+def test_commands_are_read_only():
+    bot, _ = make_bot()
+
+    @bot.command(aliases=["p"])
+    async def ping(message: Message):
+        return "pong"
+
+    assert dict(bot.commands) == {"!ping": ping, "!p": ping}
+    with pytest.raises(TypeError):
+        bot.commands["!other"] = ping
@@ -0,0 +1,102 @@
+import asyncio
+
+from corvy_sdk.events import Event, EventBus, MessageFilter
+
+
+def test_listeners_run_concurrently_and_errors_are_isolated():
+    async def main():
+        errors = []
+
+        async def on_error(event, listener, error):
+            errors.append((event, listener.name, str(error)))
+
+        bus = EventBus(on_error)
+        calls = []
+
+        async def first(value):
+            calls.append(("first", value))
+
+        async def slow(value):
+            await asyncio.sleep(0.05)
+            calls.append(("slow", value))
+
+        async def broken(value):
+            raise RuntimeError("boom")
+
+        bus.add("on_message", first, ordered=True)
+        for listener in (slow, slow, broken):
+            bus.add(Event.ON_MESSAGE, listener)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        await bus.dispatch("on_message", (1,))
+        return loop.time() - started, calls, errors
+
+    elapsed, calls, errors = asyncio.run(main())
+    assert elapsed < 0.09
+    assert calls == [("first", 1), ("slow", 1), ("slow", 1)]
+    assert errors == [("on_message", "broken", "boom")]
+
+
+def test_events_is_still_a_dict_of_lists():
+    bus = EventBus()
+
+    async def one(message):
+        pass
+
+    async def two(message):
+        pass
+
+    bus.add("on_message", one, ordered=True)
+    assert "on_message" in bus and Event.ON_MESSAGE in bus
+    assert bus["on_message"] == [one]
+    assert list(bus) == ["on_message"]
+
+    bus["on_message"].append(two)
+    assert bus.get("on_message") == [one, two]
+    assert bus._ordered["on_message"][0].func is one  # Kept its options
+
+    bus.setdefault("start", []).append(two)
+    assert dict(bus.items()) == {"on_message": [one, two], "start": [two]}
+
+    bus["on_message"].remove(one)
+    assert bus["on_message"] == [two] and "on_message" not in bus._ordered
+
+    del bus["start"]
+    assert bus.get("start") is None
+    bus["on_message"] = []
+    assert bus["on_message"] == [] and "on_message" not in bus._concurrent
+
+    bus["on_error"] = []
+    bus["on_error"].append(one)
+    assert bus["on_error"] == [one] and bus._concurrent["on_error"][0].func is one
+
+
+def test_filtered_listeners_only_see_matching_messages():
+    class Entity:
+        def __init__(self, id):
+            self.id = id
+
+    class FakeMessage:
+        def __init__(self, nest_id, content):
+            self.nest = Entity(nest_id)
+            self.flock = Entity(1)
+            self.user = Entity(1)
+            self.content = content
+
+    async def main():
+        bus = EventBus()
+        seen = []
+
+        async def in_nest(message):
+            seen.append(("nest", message.content))
+
+        async def hello(message):
+            seen.append(("hello", message.content))
+
+        bus.add("on_message", in_nest, message_filter=MessageFilter.build(nests=5))
+        bus.add("on_message", hello, message_filter=MessageFilter.build(prefix="hi"))
+        for nest_id, content in ((5, "yo"), (6, "hi there"), (6, "nothing")):
+            await bus.dispatch("on_message", (FakeMessage(nest_id, content),))
+        return seen
+
+    assert asyncio.run(main()) == [("nest", "yo"), ("hello", "hi there")]
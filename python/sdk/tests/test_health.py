@@ -0,0 +1,41 @@
+import random
+
+import pytest
+
+from corvy_sdk.health import ConnectionHealth, Histogram
+
+
+def test_missed_heartbeats_in_a_row_mean_the_connection_is_dead():
+    health = ConnectionHealth(max_missed=2)
+    health.heartbeat_missed()
+    assert not health.dead
+    health.heartbeat_replied(0.02)  # A reply resets the count
+    health.heartbeat_missed()
+    assert not health.dead
+    health.heartbeat_missed()
+    assert health.dead
+    health.reconnected(0.5)
+    assert not health.dead
+    stats = health.stats()
+    assert stats["missed_heartbeats"] == 3 and stats["reconnects"] == 1
+    assert stats["last_rtt"] == 0.02 and stats["rtt"]["count"] == 1
+
+
+def test_backoff_grows_up_to_the_limit():
+    random.seed(1)
+    health = ConnectionHealth(backoff_base=1, backoff_max=60)
+    for attempt in range(20):
+        ceiling = min(60, 2**attempt)
+        delays = [health.backoff(attempt) for _ in range(200)]
+        assert all(0 <= delay <= ceiling for delay in delays)
+        # Full jitter spreads retries over the whole range
+        assert max(delays) > ceiling * 0.9 and min(delays) < ceiling * 0.1
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram((0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value)
+    snapshot = histogram.snapshot()
+    assert snapshot["buckets"] == {0.1: 2, 1.0: 3, float("inf"): 4}
+    assert snapshot["count"] == 4 and snapshot["sum"] == pytest.approx(3.65)
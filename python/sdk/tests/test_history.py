@@ -0,0 +1,67 @@
+import asyncio
+from types import SimpleNamespace
+
+from corvy_sdk.flock import PartialFlock
+from corvy_sdk.nest import PartialNest
+
+
+class FakeNest(PartialNest):
+    """A nest holding messages 1 to `count`, fetched in pages like the API's."""
+
+    def __init__(self, count: int, delay: float = 0):
+        super().__init__(7, PartialFlock(5))
+        self.ids = list(range(1, count + 1))
+        self.delay = delay
+        self.calls: list[tuple[int, int | None]] = []
+        self.cancelled = 0
+
+    async def get_messages(self, limit: int = 50, before_id: int | None = None):
+        self.calls.append((limit, before_id))
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        ids = [i for i in self.ids if before_id is None or i < before_id]
+        return [SimpleNamespace(id=i) for i in ids[-min(limit, 50) :]]
+
+
+def collect(nest: FakeNest, **kwargs) -> list[int]:
+    async def main():
+        return [message.id async for message in nest.history(**kwargs)]
+
+    return asyncio.run(main())
+
+
+def test_history_walks_the_whole_nest_newest_first():
+    nest = FakeNest(120)
+    assert collect(nest) == list(range(120, 0, -1))
+    assert nest.calls == [(50, None), (50, 71), (50, 21)]
+
+
+def test_history_stops_at_the_limit():
+    nest = FakeNest(120)
+    assert collect(nest, limit=5) == [120, 119, 118, 117, 116]
+    assert nest.calls == [(5, None)]  # Nothing fetched past the limit
+
+
+def test_history_between_before_and_after():
+    nest = FakeNest(120)
+    assert collect(nest, before=100, after=90) == list(range(99, 90, -1))
+    assert nest.calls == [(50, 100)]  # The page already reaches past `after`
+
+
+def test_prefetch_is_cancelled_when_iteration_stops():
+    async def main():
+        nest = FakeNest(120, delay=0.01)
+        messages = nest.history()
+        async for message in messages:
+            await asyncio.sleep(0)  # Let the next page's fetch start
+            break
+        await messages.aclose()
+        return nest, message
+
+    nest, message = asyncio.run(main())
+    assert message.id == 120
+    assert nest.calls == [(50, None), (50, 71)]
+    assert nest.cancelled == 1
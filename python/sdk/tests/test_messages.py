@@ -0,0 +1,33 @@
+from datetime import datetime, timezone
+
+from corvy_sdk.messages import Message, decode_message
+from corvy_sdk.state import ConnectionState
+from conftest import payload
+
+
+def test_messages_share_their_entities_and_state():
+    state = ConnectionState(None, None, "bot", "/api/v2")
+    first = decode_message(payload(1), state)
+    second = decode_message(payload(2), state)
+    assert first.nest is second.nest and first.flock is second.flock
+    assert first.user is second.user
+    assert first._connection_state is state
+    assert not hasattr(first, "__dict__")
+    assert "_connection_state" not in Message.__slots__
+
+
+def test_created_at_is_parsed_on_first_read():
+    state = ConnectionState(None, None, "bot", "/api/v2")
+    message = decode_message(payload(1), state)
+    assert message._created_at == "2025-01-01T12:00:00Z"
+    assert message.created_at == datetime(2025, 1, 1, 12, tzinfo=timezone.utc)
+    assert isinstance(message._created_at, datetime)
+
+
+def test_changed_user_details_are_refreshed():
+    state = ConnectionState(None, None, "bot", "/api/v2")
+    first = decode_message(payload(1), state)
+    data = payload(2)
+    data["user"]["username"] = "renamed"
+    second = decode_message(data, state)
+    assert second.user is not first.user and second.user.username == "renamed"
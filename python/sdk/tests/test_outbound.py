@@ -0,0 +1,160 @@
+import asyncio
+import time
+
+import pytest
+
+from corvy_sdk.outbound import SendPriority, SendScheduler, TokenBucket
+
+
+class Recorder:
+    def __init__(self, delay: float = 0):
+        self.sent: list[str] = []
+        self.delay = delay
+
+    async def write(self, content: str):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.sent.append(content)
+        return content
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_higher_priority_lanes_go_first():
+    async def main():
+        scheduler = SendScheduler()
+        out = Recorder()
+        sends = [
+            asyncio.create_task(
+                scheduler.submit(1, "bulk", out.write, SendPriority.BULK)
+            ),
+            asyncio.create_task(scheduler.submit(2, "normal", out.write)),
+            asyncio.create_task(
+                scheduler.submit(3, "reply", out.write, SendPriority.REPLY)
+            ),
+        ]
+        await asyncio.sleep(0)
+        scheduler.start()
+        await asyncio.gather(*sends)
+        await scheduler.stop()
+        return out.sent
+
+    assert run(main()) == ["reply", "normal", "bulk"]
+
+
+def test_oldest_message_goes_first_across_nests():
+    async def main():
+        scheduler = SendScheduler()
+        out = Recorder()
+        sends = [
+            asyncio.create_task(scheduler.submit(nest_id, str(i), out.write))
+            for i, nest_id in enumerate([1, 2, 1, 3, 2])
+        ]
+        await asyncio.sleep(0)
+        scheduler.start()
+        await asyncio.gather(*sends)
+        await scheduler.stop()
+        return out.sent
+
+    assert run(main()) == ["0", "1", "2", "3", "4"]
+
+
+def test_coalesces_consecutive_messages_to_one_nest():
+    async def main():
+        scheduler = SendScheduler(coalesce=True, coalesce_max_length=7)
+        out = Recorder()
+        sends = [
+            asyncio.create_task(scheduler.submit(1, text, out.write))
+            for text in ["a", "b", "c", "dddd"]
+        ]
+        sends.append(
+            asyncio.create_task(scheduler.submit(1, "e", out.write, coalescible=False))
+        )
+        await asyncio.sleep(0)
+        scheduler.start()
+        results = await asyncio.gather(*sends)
+        await scheduler.stop()
+        return out.sent, results, scheduler.stats()
+
+    sent, results, stats = run(main())
+    assert sent == ["a\nb\nc", "dddd", "e"]
+    assert results[0] == results[2] == "a\nb\nc"
+    assert stats["sent"] == 5 and stats["coalesced"] == 2 and stats["depth"] == 0
+
+
+def test_many_queued_sends_drain():
+    async def main():
+        scheduler = SendScheduler()
+        out = Recorder()
+        sends = [
+            asyncio.create_task(scheduler.submit(i % 7, str(i), out.write))
+            for i in range(20_000)
+        ]
+        await asyncio.sleep(0)
+        assert scheduler.depth == 20_000
+        scheduler.start()
+        await asyncio.gather(*sends)
+        await scheduler.stop()
+        return out.sent
+
+    sent = run(main())
+    assert sent == [str(i) for i in range(20_000)]
+
+
+def test_stop_cancels_unsent_messages():
+    async def main():
+        scheduler = SendScheduler()
+        out = Recorder(delay=10)
+        scheduler.start()
+        in_flight = asyncio.create_task(scheduler.submit(1, "slow", out.write))
+        queued = asyncio.create_task(scheduler.submit(2, "queued", out.write))
+        await asyncio.sleep(0.01)
+        await scheduler.stop()
+        for task in (in_flight, queued):
+            with pytest.raises(asyncio.CancelledError):
+                await asyncio.wait_for(task, 1)
+        return scheduler.depth
+
+    assert run(main()) == 0
+
+
+def test_nest_rate_limit_paces_sends():
+    async def main():
+        scheduler = SendScheduler(nest_rate=20, nest_burst=1)
+        out = Recorder()
+        scheduler.start()
+        started = time.monotonic()
+        await asyncio.gather(
+            *(scheduler.submit(1, str(i), out.write) for i in range(3))
+        )
+        elapsed = time.monotonic() - started
+        await scheduler.stop()
+        return elapsed
+
+    assert run(main()) >= 0.09
+
+
+def test_idle_nest_buckets_are_evicted():
+    async def main():
+        scheduler = SendScheduler(nest_rate=1000, nest_burst=1)
+        out = Recorder()
+        scheduler.start()
+        for nest_id in range(50):
+            await scheduler.submit(nest_id, "x", out.write)
+            await asyncio.sleep(0.002)  # Long enough for the last bucket to refill
+        await scheduler.stop()
+        return len(scheduler._nest_buckets)
+
+    assert run(main()) <= 2
+
+
+def test_token_bucket_refills():
+    bucket = TokenBucket(rate=10, burst=2)
+    now = bucket.updated
+    bucket.consume(now)
+    bucket.consume(now)
+    assert bucket.wait_time(now) == pytest.approx(0.1)
+    assert not bucket.full(now + 0.15)
+    assert bucket.full(now + 0.25)
@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+
+from corvy_sdk.replies import ReplyTracker
+
+
+def test_replies_resolve_by_ref():
+    async def main():
+        replies = ReplyTracker()
+        first, second = replies.next_ref(), replies.next_ref()
+        first_reply = replies.expect(first)
+        second_reply = replies.expect(second)
+        assert replies.resolve(
+            {"ref": second, "payload": {"status": "ok", "response": {"id": 2}}}
+        )
+        assert not replies.resolve({"ref": "unknown", "payload": {}})
+        assert not first_reply.done()
+        result = await second_reply
+        replies.discard(first)
+        return replies, first, second, first_reply, result
+
+    replies, first, second, first_reply, result = asyncio.run(main())
+    assert first != second and first.startswith("_py_msg_")
+    assert result == {"id": 2}
+    assert first_reply.cancelled()
+    assert replies.pending == 0 and replies.stats()["replies"] == 1
+
+
+def test_error_replies_raise():
+    async def main():
+        replies = ReplyTracker()
+        ref = replies.next_ref()
+        reply = replies.expect(ref)
+        replies.resolve(
+            {"ref": ref, "payload": {"status": "error", "response": "rate limited"}}
+        )
+        with pytest.raises(ValueError, match="rate limited"):
+            await reply
+
+    asyncio.run(main())
+
+
+def test_unanswered_refs_time_out():
+    async def main():
+        replies = ReplyTracker(timeout=5)
+        ref = replies.next_ref()
+        reply = replies.expect(ref, timeout=0.01)
+        with pytest.raises(TimeoutError):
+            await reply
+        # A late reply is no longer tracked
+        assert not replies.resolve({"ref": ref, "payload": {"status": "ok"}})
+        return replies
+
+    replies = asyncio.run(main())
+    assert replies.pending == 0 and replies.timeouts == 1
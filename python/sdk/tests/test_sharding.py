@@ -0,0 +1,79 @@
+import asyncio
+import os
+import signal
+
+from corvy_sdk import CorvyBot, Message, SendPriority
+from corvy_sdk.sharding import ProcessShardPool, in_shard
+from corvy_sdk.state import ConnectionState
+from conftest import FakeWebsocket, payload
+
+
+def make_bot() -> CorvyBot:
+    # Module level, so shard processes can import it when they're spawned
+    bot = CorvyBot(
+        "token",
+        store_path=os.environ["CORVY_TEST_STORE"],
+        nest_send_rate=1000,
+        loop_lag_interval=None,
+        metrics=False,
+    )
+
+    @bot.command()
+    async def ping(message: Message):
+        assert in_shard() and bot.store is None
+        return f"pong {message.id}"
+
+    return bot
+
+
+def test_shards_reply_through_the_supervisor(tmp_path, monkeypatch):
+    monkeypatch.setenv("CORVY_TEST_STORE", str(tmp_path / "store.db"))
+    original_handler = signal.getsignal(signal.SIGINT)
+
+    async def main():
+        bot = make_bot()
+        websocket = FakeWebsocket()
+        priorities = []
+        scheduler = bot.send_scheduler
+        submit = scheduler.submit
+
+        async def record_submit(nest_id, content, write, priority, coalescible):
+            priorities.append(priority)
+            return await submit(nest_id, content, write, priority, coalescible)
+
+        scheduler.submit = record_submit
+        scheduler.start()
+        bot.connection_state = ConnectionState(
+            None, websocket, "bot:test", "/api/v2", sender=scheduler, store=bot.store
+        )
+        pool = bot.worker_pool = ProcessShardPool(bot, make_bot, 2)
+        pool.start()
+        try:
+            for i in range(1, 7):
+                await pool.submit(payload(i, "!ping", nest_id=10 + i % 3))
+            for _ in range(500):
+                if len(websocket.sent) >= 6:
+                    break
+                await asyncio.sleep(0.02)
+
+            # Ctrl+C is for the supervisor; the shards ignore it
+            worker = pool._workers[0]
+            os.kill(worker.pid, signal.SIGINT)
+            await asyncio.sleep(0.2)
+            alive_after_sigint = worker.is_alive()
+        finally:
+            workers = list(pool._workers)
+            await pool.stop()
+            await scheduler.stop()
+        stored = await bot.store.query_messages()
+        await bot.store.close()
+        return websocket.sent, priorities, alive_after_sigint, workers, stored
+
+    sent, priorities, alive_after_sigint, workers, stored = asyncio.run(main())
+    signal.signal(signal.SIGINT, original_handler)
+    replies = sorted(frame for frame in sent if "pong" in frame)
+    assert len(replies) == 6
+    assert set(priorities) == {SendPriority.REPLY}
+    assert alive_after_sigint
+    assert not any(worker.is_alive() for worker in workers)
+    assert sorted(m["id"] for m in stored) == [1, 2, 3, 4, 5, 6]
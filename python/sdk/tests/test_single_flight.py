@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+
+from corvy_sdk.single_flight import SingleFlight
+
+
+def test_concurrent_calls_share_one_call():
+    async def main():
+        flight = SingleFlight()
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {"id": 1}
+
+        results = await asyncio.gather(*(flight.do("user:1", fetch) for _ in range(5)))
+        other = await flight.do("user:2", fetch)
+        again = await flight.do("user:1", fetch)  # The first call has finished
+        return flight, calls, results, other, again
+
+    flight, calls, results, other, again = asyncio.run(main())
+    assert len(calls) == 3
+    assert all(result is results[0] for result in results)
+    assert other == again == {"id": 1}
+    assert (flight.calls, flight.coalesced) == (3, 4)
+    assert not flight._in_flight
+
+
+def test_every_caller_gets_the_error():
+    async def main():
+        flight = SingleFlight()
+
+        async def fetch():
+            await asyncio.sleep(0.01)
+            raise ValueError("not found")
+
+        return await asyncio.gather(
+            flight.do("user:1", fetch),
+            flight.do("user:1", fetch),
+            return_exceptions=True,
+        )
+
+    errors = asyncio.run(main())
+    assert [type(e) for e in errors] == [ValueError, ValueError]
+
+
+def test_a_cancelled_caller_doesnt_cancel_the_others():
+    async def main():
+        flight = SingleFlight()
+
+        async def fetch():
+            await asyncio.sleep(0.02)
+            return "done"
+
+        first = asyncio.create_task(flight.do("user:1", fetch))
+        second = asyncio.create_task(flight.do("user:1", fetch))
+        await asyncio.sleep(0.005)
+        first.cancel()
+        result = await second
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return flight, result
+
+    flight, result = asyncio.run(main())
+    assert result == "done"
+    assert (flight.calls, flight.coalesced) == (1, 1)
@@ -0,0 +1,45 @@
+import asyncio
+from datetime import datetime, timezone
+
+from corvy_sdk.store import MessageStore
+from conftest import payload
+
+
+def test_queries_compare_times_not_strings(tmp_path):
+    async def main():
+        store = MessageStore(str(tmp_path / "store.db"))
+        # Same instant or later, but sorting before "12:00:00Z" as text
+        store.save_message(payload(1, created_at="2025-01-01T11:59:59Z"))
+        store.save_message(payload(2, created_at="2025-01-01T12:00:00.500000Z"))
+        store.save_message(payload(3, created_at="2025-01-01T13:00:00+01:00"))
+        store.save_message(payload(4, nest_id=8, created_at="2025-01-01T12:30:00Z"))
+        since = datetime(2025, 1, 1, 12, tzinfo=timezone.utc)
+        found = await store.query_messages(since=since)
+        in_nest = await store.query_messages(nest_id=7, until=since)
+        cursors = await store.last_message_ids()
+        await store.close()
+        return found, in_nest, cursors
+
+    found, in_nest, cursors = asyncio.run(main())
+    assert [m["id"] for m in found] == [4, 3, 2]
+    assert found[1]["created_at"] == "2025-01-01T13:00:00+01:00"
+    assert [m["id"] for m in in_nest] == [1]
+    assert cursors == {7: (5, 3), 8: (5, 4)}
+
+
+def test_store_survives_a_restart(tmp_path):
+    path = str(tmp_path / "store.db")
+
+    async def write():
+        store = MessageStore(path)
+        store.save_message(payload(1))
+        await store.close()
+
+    async def read():
+        store = MessageStore(path)
+        messages = await store.query_messages()
+        await store.close()
+        return messages
+
+    asyncio.run(write())
+    assert [m["id"] for m in asyncio.run(read())] == [1]
@@ -0,0 +1,27 @@
+import asyncio
+
+from corvy_sdk.flock import Flock
+from corvy_sdk.nest import Nest
+from corvy_sdk.state import ConnectionState
+from corvy_sdk.topology import Topology
+
+
+def test_one_failing_flock_keeps_the_others(monkeypatch):
+    state = ConnectionState(None, None, "bot", "/api/v2")
+    flocks = [Flock(i, f"flock{i}", None, 1, 1, None) for i in (1, 2, 3)]
+
+    async def get_all(state):
+        return flocks
+
+    async def get_nests(self):
+        if self.id == 2:
+            raise ValueError("Flock not found")
+        return [Nest(self.id * 10, self, "general", 0, None)]
+
+    monkeypatch.setattr(Flock, "_get_all", staticmethod(get_all))
+    monkeypatch.setattr(Flock, "get_nests", get_nests)
+    topology = asyncio.run(Topology._discover(state))
+    assert list(topology.flocks) == [1, 2, 3]
+    assert list(topology.flock_nests) == [1, 3]
+    assert sorted(topology.nests) == [10, 30]
+    assert isinstance(topology.failed[2], ValueError)
@@ -0,0 +1,82 @@
+import re
+
+from corvy_sdk.triggers import KeywordMatcher, PatternMatcher, TriggerRegistry
+
+
+async def hello(message, match):
+    pass
+
+
+async def hel(message, match):
+    pass
+
+
+def handlers(registry: TriggerRegistry, content: str) -> set:
+    return {handler.__name__ for handler, _ in registry.match(content)}
+
+
+def test_every_pattern_matching_at_a_position_triggers():
+    registry = TriggerRegistry()
+    registry.add_pattern("hello", hello)
+    registry.add_pattern("hel", hel)
+    assert handlers(registry, "hello world") == {"hello", "hel"}
+
+    registry = TriggerRegistry()
+    registry.add_pattern(r"\bfoo\b", hello)
+    registry.add_pattern("foo bar", hel)
+    assert handlers(registry, "say foo bar") == {"hello", "hel"}
+    assert handlers(registry, "foo baz") == {"hello"}
+
+
+def test_patterns_get_their_own_first_match():
+    matcher = PatternMatcher(
+        [re.compile(r"(\d+) apples"), re.compile(r"\d+"), re.compile("pears")]
+    )
+    matches = {m.re.pattern: m for m in matcher.find("1 pear, 22 apples, 3 pears")}
+    assert matches[r"(\d+) apples"].group(1) == "22"
+    assert matches[r"\d+"].group() == "1"
+    assert matches["pears"].start() == 21
+
+
+def test_patterns_that_cant_be_combined_still_match():
+    registry = TriggerRegistry()
+    registry.add_pattern(r"(a)\1", hello)
+    registry.add_pattern(r"(?P<w>foo)", hel)
+
+    async def bar(message, match):
+        pass
+
+    async def verbose(message, match):
+        pass
+
+    registry.add_pattern(r"(?P<w>bar)", bar)
+    registry.add_pattern(re.compile("ba z  # a comment", re.VERBOSE), verbose)
+    assert handlers(registry, "aa") == {"hello"}
+    assert handlers(registry, "ab") == set()
+    assert handlers(registry, "foo bar baz") == {"hel", "bar", "verbose"}
+    (match,) = [m for h, m in registry.match("x bar") if h is bar]
+    assert match.group("w") == "bar"
+
+
+def test_pattern_flags_are_kept():
+    matcher = PatternMatcher(
+        [re.compile("(?i)HELLO"), re.compile(r"\w+", re.ASCII), re.compile("^x")]
+    )
+    found = {m.re.pattern: m.group() for m in matcher.find("héllo hello xx")}
+    assert found == {"(?i)HELLO": "hello", r"\w+": "h"}
+
+
+def test_keywords_match_whole_words_and_overlaps():
+    matcher = KeywordMatcher(["cat", "cats", "dog"])
+    assert matcher.find("Cats and a dog, no concatenation") == ["cats", "dog"]
+    matcher = KeywordMatcher(["cat", "cats"], whole_word=False)
+    assert matcher.find("concatenation cats") == ["cat", "cats"]
+    assert KeywordMatcher([]).find("anything") == []
+
+
+def test_handlers_fire_once_per_message():
+    registry = TriggerRegistry()
+    registry.add_keywords(["ping", "pong"], hello)
+    registry.add_pattern("pi", hello)
+    assert [h for h, _ in registry.match("ping pong")] == [hello]
+    assert len(registry) == 3
@@ -0,0 +1,79 @@
+import asyncio
+import random
+
+from corvy_sdk.worker_pool import MessageWorkerPool
+from conftest import payload
+
+
+def test_messages_in_a_nest_stay_in_order():
+    async def main():
+        handled: dict[int, list[int]] = {}
+
+        async def handle(message: dict):
+            await asyncio.sleep(random.random() / 500)
+            handled.setdefault(message["nest_id"], []).append(message["id"])
+
+        pool = MessageWorkerPool(handle, 4)
+        pool.start()
+        for i in range(200):
+            await pool.submit(payload(i, nest_id=i % 7))
+        while pool.depth or sum(map(len, handled.values())) < 200:
+            await asyncio.sleep(0.01)
+        await pool.stop()
+        return handled
+
+    handled = asyncio.run(main())
+    assert len(handled) == 7
+    for nest_id, ids in handled.items():
+        assert ids == list(range(nest_id, 200, 7))
+
+
+def test_submit_waits_while_the_pool_is_full():
+    async def main():
+        release = asyncio.Event()
+        started = []
+
+        async def handle(message: dict):
+            started.append(message["id"])
+            await release.wait()
+
+        pool = MessageWorkerPool(handle, 1, queue_size=2)
+        pool.start()
+        await pool.submit(payload(1))
+        await asyncio.sleep(0)  # The worker takes it off the queue
+        await pool.submit(payload(2))
+        await pool.submit(payload(3))
+        blocked = asyncio.create_task(pool.submit(payload(4)))
+        await asyncio.sleep(0.01)
+        waiting = not blocked.done()
+        release.set()
+        await asyncio.wait_for(blocked, 1)
+        while len(started) < 4:
+            await asyncio.sleep(0.01)
+        await pool.stop()
+        return waiting, started
+
+    waiting, started = asyncio.run(main())
+    assert waiting
+    assert started == [1, 2, 3, 4]
+
+
+def test_a_failing_handler_doesnt_stop_its_worker():
+    async def main():
+        handled = []
+
+        async def handle(message: dict):
+            if message["id"] == 1:
+                raise RuntimeError("boom")
+            handled.append(message["id"])
+
+        pool = MessageWorkerPool(handle, 1, ordering=None)
+        pool.start()
+        for i in range(1, 4):
+            await pool.submit(payload(i))
+        while len(handled) < 2:
+            await asyncio.sleep(0.01)
+        await pool.stop()
+        return handled
+
+    assert asyncio.run(main()) == [2, 3]